@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from analysis.its_batch import its_design_matrix, fit_ols_batch
+from analysis.study_periods import VACCINATION_START
+
+
+def _active_span(series):
+    months = series.index[series.to_numpy() > 0]
+    return months.min(), months.max()
+
+
+def leave_one_country_out(country_frame, treated='France', intervention_start=VACCINATION_START):
+    """
+    ITS and difference-in-differences estimates with each control country
+    dropped from the pooled control group in turn.
+
+    country_frame holds zero-filled monthly series with one column per
+    country (monthly_series_frame(cube, by='Country')). Each leave-one-out
+    control is the pooled total minus that country's column, so no events
+    are re-filtered, and the treated series, the pooled control and every
+    leave-one-out control are fitted in one batch. All fits use the
+    months where the treated series and the full pooled control overlap,
+    as in ITSAnalysis, so the first row reproduces the main estimate.
+
+    Returns one row per control group: the dropped country (None for the
+    full pool), its share of the pooled control outbreaks, the control
+    level and slope changes, the DiD level effect and its shift from the
+    full pool.
+    """
+    treated_series = country_frame[treated]
+    countries = [c for c in country_frame.columns if c != treated]
+    if not countries:
+        raise ValueError("No control countries to leave out")
+    pooled = country_frame[countries].sum(axis=1)
+
+    (treated_first, treated_last), (pooled_first, pooled_last) = (
+        _active_span(treated_series), _active_span(pooled))
+    months = slice(max(treated_first, pooled_first), min(treated_last, pooled_last))
+    by_country = country_frame.loc[months, countries].to_numpy(dtype=float)
+    pooled_values = by_country.sum(axis=1)
+
+    # treated, full pool, then the pool minus each country
+    Y = np.column_stack([treated_series[months].to_numpy(dtype=float), pooled_values,
+                         pooled_values[:, None] - by_country])
+    fit = fit_ols_batch(its_design_matrix(treated_series[months].index, intervention_start), Y)
+    params, pvalues = fit['params'], fit['pvalues']
+
+    did = params[0, 2] - params[1:, 2]
+    return pd.DataFrame({
+        'dropped_country': [None] + countries,
+        'dropped_share': np.concatenate([[0.0], by_country.sum(axis=0) / by_country.sum()]),
+        'control_level_change': params[1:, 2],
+        'control_level_p': pvalues[1:, 2],
+        'control_slope_change': params[1:, 3],
+        'control_slope_p': pvalues[1:, 3],
+        'did_effect': did,
+        'did_shift': did - did[0],
+    })
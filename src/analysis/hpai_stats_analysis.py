@@ -1,37 +1,36 @@
 import pandas as pd
 import numpy as np
-from scipy import stats
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime
 import os
+import sys
+
+# scipy and matplotlib are loaded inside the methods that need them
 
 # Define paths using the same structure as your visualization script
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
+
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src'))
+from data_processing.aggregate_pyramid import treated_and_control_series
+from data_processing.period_accumulators import ensure_store
+from analysis.study_periods import VACCINATION_START, VACCINATION_END, period_masks
+
 DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
 RESULTS_DIR = os.path.join(PROJECT_ROOT, 'results')
 OUTPUT_DIR = os.path.join(RESULTS_DIR, 'analysis')
 
-VACCINATION_START = pd.Timestamp('2023-10-01').tz_localize('UTC')
-VACCINATION_END = pd.Timestamp('2024-10-01').tz_localize('UTC')
-
 class OutbreakAnalysis:
-    def __init__(self, france_data_path, control_data_path):
-        """Initialize the analysis with data paths and load the data."""
-        # Read the data
-        self.france_df = pd.read_csv(france_data_path, parse_dates=['observation date'])
-        self.control_df = pd.read_csv(control_data_path, parse_dates=['observation date'])
-        
-        # Ensure observation dates have UTC timezone
-        if self.france_df['observation date'].dt.tz is None:
-            self.france_df['observation date'] = self.france_df['observation date'].dt.tz_localize('UTC')
-        if self.control_df['observation date'].dt.tz is None:
-            self.control_df['observation date'] = self.control_df['observation date'].dt.tz_localize('UTC')
-        
-        # Create monthly aggregations
-        self.france_monthly = self.france_df.set_index('observation date').resample('ME').size()
-        self.control_monthly = self.control_df.set_index('observation date').resample('ME').size()
+    def __init__(self, france_data_path, control_data_path, freq='month'):
+        """
+        Initialize the analysis with data paths and load the data.
+        freq selects the resolution ('day', 'week', 'month' or 'season');
+        the *_monthly series then hold counts at that resolution.
+        """
+        # Aggregations come from the persisted cube / pyramid, which are only
+        # rebuilt when one of the processed event files changes
+        self.event_files = [france_data_path, control_data_path]
+        self.freq = freq
+        self.france_monthly, self.control_monthly = treated_and_control_series(self.event_files, freq)
         
         # Find the overlapping date range
         start_date = max(self.france_monthly.index.min(), self.control_monthly.index.min())
@@ -53,9 +52,10 @@ class OutbreakAnalysis:
         print(f"Control data points: {len(self.control_monthly)}")
         
         # Create period masks for the aligned data
-        self.pre_vac_mask = self.france_monthly.index < VACCINATION_START
-        self.vac_mask = (self.france_monthly.index >= VACCINATION_START) & (self.france_monthly.index < VACCINATION_END)
-        self.post_vac_mask = self.france_monthly.index >= VACCINATION_END
+        masks = period_masks(self.france_monthly.index)
+        self.pre_vac_mask = masks['pre']
+        self.vac_mask = masks['during']
+        self.post_vac_mask = masks['post']
         
         # Print period coverage
         print("\nPeriod coverage:")
@@ -97,6 +97,14 @@ class OutbreakAnalysis:
                                      for j in stats_dict[i].keys()},
                                      orient='index')
 
+    def streaming_period_statistics(self):
+        """
+        The calculate_period_statistics table read from the persisted
+        per-period accumulators, which ingestion keeps up to date.
+        """
+        store = ensure_store(VACCINATION_START, VACCINATION_END, self.event_files)
+        return store.table()
+
     def perform_statistical_tests(self):
         """Perform statistical tests to compare periods and regions."""
         # Compare France before and during vaccination
@@ -104,6 +112,7 @@ class OutbreakAnalysis:
         france_during = self.france_monthly[self.vac_mask]
         
         # Mann-Whitney U test (non-parametric test for comparing distributions)
+        from scipy import stats
         statistic, pvalue = stats.mannwhitneyu(
             france_before, france_during, alternative='two-sided')
         
@@ -139,6 +148,7 @@ class OutbreakAnalysis:
 
     def create_seasonal_comparison_plot(self, save_path=None):
         """Create a plot comparing seasonal patterns before and during vaccination."""
+        import matplotlib.pyplot as plt
         seasonal_data = self.analyze_seasonal_patterns()
         
         plt.figure(figsize=(15, 8))
@@ -169,26 +179,31 @@ class OutbreakAnalysis:
             plt.savefig(save_path)
         plt.close()
 
+def run_period_statistics(france_data_path, control_data_path, output_dir=OUTPUT_DIR):
+    """Compute the period statistics table and save it. Errors are raised to the caller."""
+    # Create output directory
+    os.makedirs(output_dir, exist_ok=True)
+    
+    print("\nInitializing analysis...")
+    analysis = OutbreakAnalysis(france_data_path, control_data_path)
+    
+    print("\nCalculating period statistics...")
+    stats_df = analysis.calculate_period_statistics()
+    stats_path = os.path.join(output_dir, 'period_statistics.csv')
+    stats_df.to_csv(stats_path)
+    print(f"Statistics saved to: {stats_path}")
+    
+    print("\nAnalysis complete!")
+    return stats_df
+
 def main():
     """Run the complete analysis and save results."""
     try:
-        # Create output directory
-        os.makedirs(OUTPUT_DIR, exist_ok=True)
-        
-        print("\nInitializing analysis...")
-        analysis = OutbreakAnalysis(
+        run_period_statistics(
             os.path.join(DATA_DIR, 'processed', 'france_hpai_outbreaks.csv'),
             os.path.join(DATA_DIR, 'processed', 'europe_control_group.csv')
         )
         
-        print("\nCalculating period statistics...")
-        stats_df = analysis.calculate_period_statistics()
-        stats_path = os.path.join(OUTPUT_DIR, 'period_statistics.csv')
-        stats_df.to_csv(stats_path)
-        print(f"Statistics saved to: {stats_path}")
-        
-        print("\nAnalysis complete!")
-        
     except Exception as e:
         print(f"\nAn error occurred: {str(e)}")
         print("\nDebug information:")
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+COEFFICIENT_NAMES = ['intercept', 'trend', 'level_change', 'slope_change']
+
+
+def its_design_matrix(index, intervention_start):
+    """
+    Segmented-regression design matrix used by ITSAnalysis: intercept,
+    baseline trend, level change and slope change at intervention_start.
+    """
+    time = np.arange(len(index))
+    intervention = (index >= intervention_start).astype(int)
+    if not intervention.any():
+        raise ValueError(f"No observations on or after intervention start {intervention_start}")
+    intervention_start_idx = np.argmax(intervention)
+    time_since_intervention = np.where(intervention, time - intervention_start_idx, 0)
+
+    return np.column_stack([
+        np.ones(len(time)),         # Intercept
+        time,                       # Baseline trend
+        intervention,               # Level change
+        time_since_intervention     # Slope change
+    ]).astype(float)
+
+
+def fit_ols_batch(X, Y):
+    """
+    Fit y = X b by OLS for every column of Y with one QR factorisation of X.
+
+    Returns a dict of arrays with one row per series: params, bse, tvalues
+    and pvalues (k x p), fittedvalues and resid (k x n), plus sigma2 (k,)
+    and df_resid. Matches statsmodels' OLS estimates column by column.
+    """
+    from scipy.special import stdtr
+
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    if Y.ndim == 1:
+        Y = Y[:, None]
+    n, p = X.shape
+    if Y.shape[0] != n:
+        raise ValueError(f"Design matrix has {n} rows but outcomes have {Y.shape[0]}")
+    df_resid = n - p
+    if df_resid <= 0:
+        raise ValueError("Not enough observations to fit the model")
+
+    Q, R = np.linalg.qr(X)
+    R_inv = np.linalg.inv(R)
+    params = R_inv @ (Q.T @ Y)                      # p x k
+
+    fitted = X @ params
+    resid = Y - fitted
+    sigma2 = np.einsum('ij,ij->j', resid, resid) / df_resid
+
+    # diag((X'X)^-1) = squared row norms of R^-1
+    xtx_inv_diag = np.einsum('ij,ij->i', R_inv, R_inv)
+    bse = np.sqrt(np.outer(xtx_inv_diag, sigma2))   # p x k
+    with np.errstate(divide='ignore', invalid='ignore'):
+        tvalues = params / bse
+    pvalues = 2 * stdtr(df_resid, -np.abs(tvalues))
+
+    return {
+        'params': params.T,
+        'bse': bse.T,
+        'tvalues': tvalues.T,
+        'pvalues': pvalues.T,
+        'fittedvalues': fitted.T,
+        'resid': resid.T,
+        'sigma2': sigma2,
+        'df_resid': df_resid,
+    }
+
+
+def fit_its_batch(series_frame, intervention_start):
+    """
+    Fit the ITS model to every column of a frame of aligned series (e.g. one
+    column per country, species group or region) sharing one time index.
+
+    Returns a tidy DataFrame with one row per series and coefficient.
+    """
+    X = its_design_matrix(series_frame.index, intervention_start)
+    fit = fit_ols_batch(X, series_frame.to_numpy(dtype=float))
+
+    k, p = fit['params'].shape
+    return pd.DataFrame({
+        'series': np.repeat(np.asarray(series_frame.columns, dtype=object), p),
+        'term': np.tile(COEFFICIENT_NAMES, k),
+        'coef': fit['params'].ravel(),
+        'std_err': fit['bse'].ravel(),
+        't_value': fit['tvalues'].ravel(),
+        'p_value': fit['pvalues'].ravel(),
+    })
+
+
+def monthly_series_frame(cube, by='Country', start=None, end=None):
+    """
+    Pivot the monthly aggregate cube into a zero-filled month-end frame with
+    one column per value of ``by`` (Country, species_group or serotype),
+    ready for fit_its_batch.
+    """
+    counts = cube.groupby(['month', by], observed=True)['outbreak_count'].sum().unstack(fill_value=0)
+    counts.index = pd.PeriodIndex(counts.index, freq='M').to_timestamp(how='end').normalize().tz_localize('UTC')
+    full_range = pd.date_range(start or counts.index.min(), end or counts.index.max(), freq='ME', tz='UTC')
+    return counts.reindex(full_range, fill_value=0)
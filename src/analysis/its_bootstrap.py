@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from analysis.its_batch import COEFFICIENT_NAMES, fit_ols_batch
+
+
+def block_indices(rng, n_boot, n, block_length):
+    """
+    Moving-block resampling indices, shape (n_boot, n): each row is a
+    concatenation of randomly started blocks of consecutive positions,
+    truncated to n.
+    """
+    n_blocks = -(-n // block_length)
+    starts = rng.integers(0, n - block_length + 1, size=(n_boot, n_blocks))
+    idx = starts[:, :, None] + np.arange(block_length)
+    return idx.reshape(n_boot, -1)[:, :n]
+
+
+def _bootstrap_chunk(args):
+    """
+    Refit every replicate in a chunk with one matrix product: the design is
+    fixed, so the estimates are pinv(X) @ (fitted + resampled residuals).
+    """
+    X_pinv, fitted, resid, n_boot, block_length, seed = args
+    rng = np.random.default_rng(seed)
+    idx = block_indices(rng, n_boot, resid.shape[0], block_length)
+    # the same blocks are drawn for every series, keeping their cross-correlation
+    Y_star = fitted[None, :, :] + resid[idx]                    # R x n x k
+    return np.einsum('pn,rnk->rkp', X_pinv, Y_star)             # R x k x p
+
+
+def block_bootstrap(X, Y, n_boot=2000, block_length=None, seed=0, processes=1, chunk_size=500):
+    """
+    Moving-block residual bootstrap of the OLS coefficients of every column
+    of Y on the design X.
+
+    Replicates are generated in fixed-size chunks, each with its own child of
+    SeedSequence(seed), so results are identical whatever the number of
+    worker processes. Returns the replicate estimates, shape (n_boot, k, p),
+    and the block length used (default: n ** (1/3), rounded up).
+    """
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    if Y.ndim == 1:
+        Y = Y[:, None]
+    n = X.shape[0]
+    block_length = block_length or int(np.ceil(n ** (1 / 3)))
+    if not 1 <= block_length <= n:
+        raise ValueError(f"Block length must be between 1 and {n}")
+
+    fit = fit_ols_batch(X, Y)
+    fitted, resid = fit['fittedvalues'].T, fit['resid'].T       # n x k
+    X_pinv = np.linalg.pinv(X)
+
+    sizes = [min(chunk_size, n_boot - i) for i in range(0, n_boot, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(X_pinv, fitted, resid, size, block_length, s) for size, s in zip(sizes, seeds)]
+    if processes == 1 or len(jobs) == 1:
+        parts = [_bootstrap_chunk(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            parts = list(pool.map(_bootstrap_chunk, jobs))
+    return np.concatenate(parts), block_length
+
+
+def bootstrap_confidence_intervals(X, Y, series_names, n_boot=2000, block_length=None,
+                                   alpha=0.05, seed=0, processes=1):
+    """
+    Percentile confidence intervals for every ITS coefficient of every
+    series and, with two or more series, for the difference-in-differences
+    level effect (first series minus second).
+
+    Returns a tidy DataFrame with one row per series and term.
+    """
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    if Y.ndim == 1:
+        Y = Y[:, None]
+    point = fit_ols_batch(X, Y)['params']                      # k x p
+    replicates, block_length = block_bootstrap(X, Y, n_boot=n_boot, block_length=block_length,
+                                               seed=seed, processes=processes)
+
+    series = np.repeat(np.asarray(series_names, dtype=object), len(COEFFICIENT_NAMES))
+    terms = np.tile(COEFFICIENT_NAMES, len(series_names))
+    estimates = point.ravel()
+    draws = replicates.reshape(n_boot, -1)
+
+    level = COEFFICIENT_NAMES.index('level_change')
+    if Y.shape[1] >= 2:
+        series = np.append(series, 'DiD')
+        terms = np.append(terms, 'level_change')
+        estimates = np.append(estimates, point[0, level] - point[1, level])
+        draws = np.column_stack([draws, replicates[:, 0, level] - replicates[:, 1, level]])
+
+    lower, upper = np.quantile(draws, [alpha / 2, 1 - alpha / 2], axis=0)
+    return pd.DataFrame({
+        'series': series,
+        'term': terms,
+        'coef': estimates,
+        'boot_se': draws.std(axis=0, ddof=1),
+        'ci_lower': lower,
+        'ci_upper': upper,
+        'n_boot': n_boot,
+        'block_length': block_length,
+    })
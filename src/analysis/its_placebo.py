@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from analysis.its_batch import COEFFICIENT_NAMES
+
+
+def design_stack(n, break_indices):
+    """
+    Stack of ITS design matrices, one per candidate break index: shape
+    (breaks, n, 4) with the same columns as its_design_matrix.
+    """
+    time = np.arange(n)
+    breaks = np.asarray(break_indices)[:, None]
+    intervention = (time[None, :] >= breaks).astype(float)
+    time_since = np.where(intervention > 0, time[None, :] - breaks, 0).astype(float)
+    ones = np.ones_like(intervention)
+    return np.stack([ones, np.broadcast_to(time, intervention.shape).astype(float),
+                     intervention, time_since], axis=-1)
+
+
+def fit_break_grid(Y, break_indices):
+    """
+    Fit the ITS model at every candidate break for every series in one
+    vectorized pass.
+
+    Y is (n, k). Returns params, bse and tvalues of shape (breaks, k, 4).
+    """
+    Y = np.asarray(Y, dtype=float)
+    if Y.ndim == 1:
+        Y = Y[:, None]
+    n = Y.shape[0]
+    X = design_stack(n, break_indices)                     # B x n x p
+    df_resid = n - X.shape[2]
+
+    xtx_inv = np.linalg.inv(np.einsum('bni,bnj->bij', X, X))   # B x p x p
+    params = xtx_inv @ np.einsum('bni,nk->bik', X, Y)          # B x p x k
+    resid = Y[None, :, :] - X @ params                         # B x n x k
+    sigma2 = np.einsum('bnk,bnk->bk', resid, resid) / df_resid # B x k
+
+    diag = np.diagonal(xtx_inv, axis1=1, axis2=2)              # B x p
+    bse = np.sqrt(diag[:, :, None] * sigma2[:, None, :])       # B x p x k
+    return {
+        'params': params.transpose(0, 2, 1),
+        'bse': bse.transpose(0, 2, 1),
+        'tvalues': (params / bse).transpose(0, 2, 1),
+        'df_resid': df_resid,
+    }
+
+
+def _fit_chunk(args):
+    Y, break_indices = args
+    return fit_break_grid(Y, break_indices)
+
+
+def placebo_in_time(series_frame, actual_break, min_pre=6, min_post=6, processes=1, chunk_size=64):
+    """
+    Evaluate the ITS level and slope effects at every feasible break month
+    and rank the actual intervention among them.
+
+    series_frame holds aligned monthly series (e.g. France and Control)
+    as columns. With two or more columns, a difference-in-differences
+    level effect (first column minus second) is also reported. Large grids
+    can be split into chunks and fitted in a process pool (processes > 1).
+
+    Returns (table, summary): one table row per candidate break, and a
+    summary with the actual break's effect, its rank by absolute size and
+    the share of breaks with an effect at least as large (placebo p-value).
+    """
+    index = series_frame.index
+    n = len(index)
+    candidates = np.arange(min_pre, n - min_post + 1)
+    if len(candidates) == 0:
+        raise ValueError("Series too short for the requested min_pre/min_post")
+
+    actual_idx = int(np.argmax(index >= actual_break))
+    if index[actual_idx] < actual_break:
+        raise ValueError(f"Actual break {actual_break} is after the last observation")
+    if actual_idx not in candidates:
+        candidates = np.sort(np.append(candidates, actual_idx))
+
+    Y = series_frame.to_numpy(dtype=float)
+    if processes == 1 or len(candidates) <= chunk_size:
+        fit = fit_break_grid(Y, candidates)
+    else:
+        chunks = [candidates[i:i + chunk_size] for i in range(0, len(candidates), chunk_size)]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            parts = list(pool.map(_fit_chunk, [(Y, c) for c in chunks]))
+        fit = {key: np.concatenate([p[key] for p in parts]) for key in ('params', 'bse', 'tvalues')}
+
+    level = COEFFICIENT_NAMES.index('level_change')
+    slope = COEFFICIENT_NAMES.index('slope_change')
+
+    table = pd.DataFrame({'break_date': index[candidates], 'break_index': candidates})
+    for j, name in enumerate(series_frame.columns):
+        table[f'{name}_level_change'] = fit['params'][:, j, level]
+        table[f'{name}_level_t'] = fit['tvalues'][:, j, level]
+        table[f'{name}_slope_change'] = fit['params'][:, j, slope]
+        table[f'{name}_slope_t'] = fit['tvalues'][:, j, slope]
+
+    if series_frame.shape[1] >= 2:
+        table['did_effect'] = fit['params'][:, 0, level] - fit['params'][:, 1, level]
+        effect_col = 'did_effect'
+    else:
+        effect_col = f'{series_frame.columns[0]}_level_change'
+
+    is_actual = table['break_index'] == actual_idx
+    actual_effect = table.loc[is_actual, effect_col].iloc[0]
+    magnitude = table[effect_col].abs()
+    table['rank'] = magnitude.rank(ascending=False, method='min').astype(int)
+    table['is_actual'] = is_actual
+
+    summary = {
+        'actual_break': index[actual_idx],
+        'effect': effect_col,
+        'actual_effect': actual_effect,
+        'rank': int(table.loc[is_actual, 'rank'].iloc[0]),
+        'n_breaks': len(table),
+        'placebo_p_value': float((magnitude >= abs(actual_effect)).mean()),
+    }
+    return table, summary
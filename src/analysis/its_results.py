@@ -0,0 +1,139 @@
+import hashlib
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from analysis.its_batch import COEFFICIENT_NAMES, its_design_matrix, fit_ols_batch
+from analysis.study_periods import period_masks
+
+SERIES_NAMES = ('France', 'Control')
+
+# results by input/parameter hash, shared by every ITSAnalysis in the process
+_RESULTS_CACHE = {}
+
+
+@dataclass(frozen=True)
+class PeriodSummary:
+    series: str
+    period: str
+    mean: float
+    std: float
+    n_months: int
+
+
+@dataclass(frozen=True)
+class ITSResults:
+    """
+    Everything derived from one France/control ITS fit: the design matrix,
+    coefficients, fitted values and per-period summaries. Arrays are
+    read-only; coefficient arrays are indexed [series, term] with
+    series 0 = France, 1 = control.
+    """
+    key: str
+    index: pd.DatetimeIndex
+    intervention_start: pd.Timestamp
+    intervention_end: pd.Timestamp
+    design: np.ndarray
+    observed: np.ndarray
+    params: np.ndarray
+    bse: np.ndarray
+    pvalues: np.ndarray
+    fittedvalues: np.ndarray
+    did_effect: float
+    periods: tuple
+
+    def period(self, series, name):
+        for summary in self.periods:
+            if summary.series == series and summary.period == name:
+                return summary
+        raise KeyError(f"No {name} period summary for {series}")
+
+    def reduction_percent(self, series='France'):
+        """
+        Percentage drop in mean monthly outbreaks from the pre-vaccination
+        period to the vaccination period.
+        """
+        pre = self.period(series, 'pre').mean
+        return (pre - self.period(series, 'during').mean) / pre * 100
+
+    def coefficient_table(self):
+        rows = []
+        for s, series in enumerate(SERIES_NAMES):
+            for i, name in enumerate(COEFFICIENT_NAMES):
+                rows.append({'series': series, 'term': name, 'coef': self.params[s, i],
+                             'std_err': self.bse[s, i], 'p_value': self.pvalues[s, i]})
+        return pd.DataFrame(rows)
+
+    def to_dict(self):
+        """
+        JSON-serialisable view for exports.
+        """
+        return {
+            'its_coefficients': self.coefficient_table().to_dict('records'),
+            'did_effect': float(self.did_effect),
+            'period_summaries': [{'series': p.series, 'period': p.period, 'mean': float(p.mean),
+                                  'std': float(p.std), 'n_months': p.n_months}
+                                 for p in self.periods],
+        }
+
+
+def results_key(france_data, control_data, intervention_start, intervention_end):
+    """
+    Hash of the aligned series values, their dates and the intervention dates.
+    """
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(france_data.index.asi8).tobytes())
+    digest.update(np.ascontiguousarray(france_data.to_numpy(dtype=float)).tobytes())
+    digest.update(np.ascontiguousarray(control_data.to_numpy(dtype=float)).tobytes())
+    digest.update(f"{intervention_start}|{intervention_end}".encode())
+    return digest.hexdigest()
+
+
+def _read_only(array):
+    array = np.array(array, dtype=float)
+    array.flags.writeable = False
+    return array
+
+
+def _period_summaries(series_by_name, index, intervention_start, intervention_end):
+    masks = period_masks(index, intervention_start, intervention_end)
+    return tuple(
+        PeriodSummary(series=name, period=period, mean=data[mask].mean(),
+                      std=data[mask].std(), n_months=int(mask.sum()))
+        for name, data in series_by_name.items()
+        for period, mask in masks.items()
+    )
+
+
+def fit_its_results(france_data, control_data, intervention_start, intervention_end):
+    """
+    Fit the France and control ITS models once and summarise each period,
+    returning the memoized ITSResults for identical inputs.
+    """
+    key = results_key(france_data, control_data, intervention_start, intervention_end)
+    if key in _RESULTS_CACHE:
+        return _RESULTS_CACHE[key]
+
+    index = france_data.index
+    X = its_design_matrix(index, intervention_start)
+    Y = np.column_stack([france_data.to_numpy(dtype=float), control_data.to_numpy(dtype=float)])
+    fit = fit_ols_batch(X, Y)
+
+    results = ITSResults(
+        key=key,
+        index=index,
+        intervention_start=intervention_start,
+        intervention_end=intervention_end,
+        design=_read_only(X),
+        observed=_read_only(Y.T),
+        params=_read_only(fit['params']),
+        bse=_read_only(fit['bse']),
+        pvalues=_read_only(fit['pvalues']),
+        fittedvalues=_read_only(fit['fittedvalues']),
+        did_effect=float(fit['params'][0, 2] - fit['params'][1, 2]),
+        periods=_period_summaries(dict(zip(SERIES_NAMES, (france_data, control_data))),
+                                  index, intervention_start, intervention_end),
+    )
+    _RESULTS_CACHE[key] = results
+    return results
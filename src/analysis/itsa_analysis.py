@@ -1,23 +1,30 @@
-import statsmodels.api as sm
 import numpy as np
 import pandas as pd
-from scipy import stats
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
+import sys
 from datetime import datetime
 
+# statsmodels and matplotlib take seconds to import, so they are only
+# pulled in by the methods that fit models or draw figures
+
 # Define paths
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.abspath(os.path.join(SCRIPT_DIR, '..', '..'))
+
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src'))
+from data_processing.aggregate_pyramid import treated_and_control_series
+from analysis.its_batch import fit_ols_batch
+from analysis.its_placebo import placebo_in_time
+from analysis.its_bootstrap import bootstrap_confidence_intervals
+from analysis.its_results import fit_its_results
+from analysis.its_count import count_design_matrix, fit_count_batch
+from analysis.study_periods import VACCINATION_START, VACCINATION_END
+from analysis.reporting_delay import nowcast_treated_and_control
+
 DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
 RESULTS_DIR = os.path.join(PROJECT_ROOT, 'results')
 ANALYSIS_DIR = os.path.join(RESULTS_DIR, 'analysis')
 
-# Define vaccination period
-VACCINATION_START = pd.Timestamp('2023-10-01').tz_localize('UTC')
-VACCINATION_END = pd.Timestamp('2024-10-01').tz_localize('UTC')
-
 class ITSAnalysis:
     """
     Performs Interrupted Time Series Analysis on HPAI outbreak data.
@@ -89,6 +96,7 @@ class ITSAnalysis:
         ])
         
         # Fit models
+        import statsmodels.api as sm
         france_model = sm.OLS(self.france_data.values, X).fit()
         control_model = sm.OLS(self.control_data.values, X).fit()
         
@@ -101,11 +109,71 @@ class ITSAnalysis:
             'did_effect': did_effect
         }
 
+    def perform_batch_analysis(self):
+        """
+        Same model as perform_analysis, fitted for France and control in one
+        batched least-squares solve without statsmodels. Coefficient arrays
+        are indexed [series, term] with series 0 = France, 1 = control.
+        """
+        results = self.results()
+        fit = fit_ols_batch(results.design, results.observed.T)
+        fit['did_effect'] = fit['params'][0, 2] - fit['params'][1, 2]
+        return fit
+
+    def perform_count_analysis(self, family='negbin', harmonics=2):
+        """
+        Seasonal Poisson / negative binomial ITS for France and control in
+        one batched IRLS fit. Coefficients are on the log scale, so the DiD
+        level effect is a log rate ratio (France relative to control).
+        """
+        X, terms = count_design_matrix(self.france_data.index, VACCINATION_START, harmonics)
+        Y = np.column_stack([self.france_data.values, self.control_data.values])
+        fit = fit_count_batch(X, Y, family=family)
+        fit['terms'] = terms
+        fit['did_effect'] = fit['params'][0, 2] - fit['params'][1, 2]
+        return fit
+
+    def results(self):
+        """
+        The fitted France/control models and period summaries as an
+        immutable ITSResults, fitted once per distinct input and shared by
+        the figure, the report and exports.
+        """
+        return fit_its_results(self.france_data, self.control_data,
+                               VACCINATION_START, VACCINATION_END)
+
+    def placebo_in_time(self, min_pre=6, min_post=6, processes=1):
+        """
+        Refit the model with the break at every feasible month in one
+        vectorized pass and rank the real vaccination start among them.
+        Returns (table, summary); see its_placebo.placebo_in_time.
+        """
+        frame = pd.DataFrame({'France': self.france_data, 'Control': self.control_data})
+        return placebo_in_time(frame, VACCINATION_START, min_pre=min_pre,
+                               min_post=min_post, processes=processes)
+
+    def bootstrap_confidence_intervals(self, n_boot=2000, block_length=None, alpha=0.05,
+                                       seed=0, processes=1):
+        """
+        Moving-block bootstrap confidence intervals for the France and
+        control coefficients and the DiD level effect. Reproducible for a
+        given seed regardless of the number of processes.
+        """
+        results = self.results()
+        return bootstrap_confidence_intervals(results.design, results.observed.T,
+                                              ['France', 'Control'], n_boot=n_boot,
+                                              block_length=block_length, alpha=alpha,
+                                              seed=seed, processes=processes)
+
     def create_analysis_visualizations(self):
         """
         Creates comprehensive visualizations showing the impact of vaccination.
         Includes trend lines, confidence intervals, and key statistics.
         """
+        import matplotlib.pyplot as plt
+
+        results = self.results()
+        
         fig = plt.figure(figsize=(15, 10))
         
         # Create main time series plot
@@ -117,40 +185,20 @@ class ITSAnalysis:
         ax.plot(self.control_data.index, self.control_data.values, 
                 'g.', label='Control (observed)', alpha=0.5)
         
-        # Prepare design matrix for predictions
-        X = np.column_stack([
-            np.ones(len(self.time)),
-            self.time,
-            self.intervention,
-            self.time_since_intervention
-        ])
-        
-        # Fit models and get predictions
-        france_model = sm.OLS(self.france_data.values, X).fit()
-        control_model = sm.OLS(self.control_data.values, X).fit()
-        
         # Add trend lines
-        ax.plot(self.france_data.index, france_model.fittedvalues, 
+        ax.plot(self.france_data.index, results.fittedvalues[0], 
                 'b-', label='France (predicted)', linewidth=2)
-        ax.plot(self.control_data.index, control_model.fittedvalues, 
+        ax.plot(self.control_data.index, results.fittedvalues[1], 
                 'g-', label='Control (predicted)', linewidth=2)
         
         # Add vaccination period shading
         ax.axvspan(VACCINATION_START, VACCINATION_END, 
                    color='yellow', alpha=0.2, label='Vaccination Period')
         
-        # Calculate key statistics for annotation
-        pre_vac_mask = self.france_data.index < VACCINATION_START
-        during_vac_mask = (self.france_data.index >= VACCINATION_START) & (self.france_data.index < VACCINATION_END)
-        
-        reduction = ((self.france_data[pre_vac_mask].mean() - 
-                     self.france_data[during_vac_mask].mean()) / 
-                    self.france_data[pre_vac_mask].mean() * 100)
-        
         # Add statistical annotations
         ax.text(0.02, 0.98, 
-                f'Reduction in French outbreaks: {reduction:.1f}%\n' +
-                f'p-value: {france_model.pvalues[2]:.4f}',
+                f'Reduction in French outbreaks: {results.reduction_percent():.1f}%\n' +
+                f'p-value: {results.pvalues[0, 2]:.4f}',
                 transform=ax.transAxes, verticalalignment='top',
                 bbox=dict(facecolor='white', alpha=0.8))
         
@@ -168,84 +216,85 @@ class ITSAnalysis:
         """
         Generates a comprehensive statistical report of the analysis findings.
         """
-        # Calculate statistics for each period
-        pre_vac = self.france_data[self.france_data.index < VACCINATION_START]
-        during_vac = self.france_data[(self.france_data.index >= VACCINATION_START) & 
-                                    (self.france_data.index < VACCINATION_END)]
-        post_vac = self.france_data[self.france_data.index >= VACCINATION_END]
+        results = self.results()
         
         # Prepare report sections
         report = []
         report.append("HPAI Vaccination Impact Analysis Report")
         report.append("=====================================")
         
-        report.append("\nPre-Vaccination Period Statistics:")
-        report.append(f"Average monthly outbreaks: {pre_vac.mean():.2f}")
-        report.append(f"Standard deviation: {pre_vac.std():.2f}")
-        report.append(f"Number of months: {len(pre_vac)}")
-        
-        report.append("\nVaccination Period Statistics:")
-        report.append(f"Average monthly outbreaks: {during_vac.mean():.2f}")
-        report.append(f"Standard deviation: {during_vac.std():.2f}")
-        report.append(f"Number of months: {len(during_vac)}")
-        
-        report.append("\nPost-Vaccination Period Statistics:")
-        report.append(f"Average monthly outbreaks: {post_vac.mean():.2f}")
-        report.append(f"Standard deviation: {post_vac.std():.2f}")
-        report.append(f"Number of months: {len(post_vac)}")
+        for period, heading in (('pre', 'Pre-Vaccination Period Statistics:'),
+                                ('during', 'Vaccination Period Statistics:'),
+                                ('post', 'Post-Vaccination Period Statistics:')):
+            summary = results.period('France', period)
+            report.append(f"\n{heading}")
+            report.append(f"Average monthly outbreaks: {summary.mean:.2f}")
+            report.append(f"Standard deviation: {summary.std:.2f}")
+            report.append(f"Number of months: {summary.n_months}")
         
         return "\n".join(report)
 
+def run_its_analysis(france_data_path, control_data_path, output_dir=ANALYSIS_DIR, freq='month',
+                     nowcast=False):
+    """
+    Run the ITS analysis end to end, write the figure and report and
+    return the shared ITSResults (one fit for all outputs). Errors are
+    raised to the caller.
+
+    Nowcasting is opt-in: with nowcast here, or --nowcast on the CLI's
+    ITS commands, the trailing months are corrected for reporting delay
+    (monthly series only). The pipeline's ITS stage fits the observed
+    counts; its nowcast stage only writes the delay and nowcast tables.
+    """
+    # Create output directory
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # Load counts from the aggregate cube (monthly) or pyramid (other resolutions)
+    print("Loading data...")
+    if nowcast:
+        if freq != 'month':
+            raise ValueError("Nowcasting is only available for monthly series")
+        france_monthly, control_monthly, _ = nowcast_treated_and_control(
+            [france_data_path, control_data_path])
+    else:
+        france_monthly, control_monthly = treated_and_control_series(
+            [france_data_path, control_data_path], freq)
+    
+    # Initialize and run analysis
+    print("\nPerforming interrupted time series analysis...")
+    analysis = ITSAnalysis(france_monthly, control_monthly)
+    results = analysis.results()
+    
+    # Generate visualizations
+    print("\nCreating analysis visualizations...")
+    figure_path = os.path.join(output_dir, 'vaccination_impact.png')
+    fig = analysis.create_analysis_visualizations()
+    fig.savefig(figure_path)
+    import matplotlib.pyplot as plt
+    plt.close(fig)
+    
+    # Generate and save statistical report
+    print("\nGenerating statistical report...")
+    report_path = os.path.join(output_dir, 'statistical_report.txt')
+    report = analysis.generate_statistical_report()
+    with open(report_path, 'w') as f:
+        f.write(report)
+    
+    print("\nAnalysis complete! Results saved to:")
+    print(f"- Visualization: {figure_path}")
+    print(f"- Statistical Report: {report_path}")
+    return results
+
 def main():
     """
     Main function to run the analysis with data loading and error checking.
     """
     try:
-        # Create output directory
-        os.makedirs(ANALYSIS_DIR, exist_ok=True)
-        
-        # Load data
-        print("Loading data...")
-        france_data = pd.read_csv(
+        run_its_analysis(
             os.path.join(DATA_DIR, 'processed', 'france_hpai_outbreaks.csv'),
-            parse_dates=['observation date']
-        )
-        control_data = pd.read_csv(
-            os.path.join(DATA_DIR, 'processed', 'europe_control_group.csv'),
-            parse_dates=['observation date']
+            os.path.join(DATA_DIR, 'processed', 'europe_control_group.csv')
         )
         
-        # Ensure dates have UTC timezone
-        if france_data['observation date'].dt.tz is None:
-            france_data['observation date'] = france_data['observation date'].dt.tz_localize('UTC')
-        if control_data['observation date'].dt.tz is None:
-            control_data['observation date'] = control_data['observation date'].dt.tz_localize('UTC')
-        
-        # Prepare monthly data
-        france_monthly = france_data.set_index('observation date').resample('ME').size()
-        control_monthly = control_data.set_index('observation date').resample('ME').size()
-        
-        # Initialize and run analysis
-        print("\nPerforming interrupted time series analysis...")
-        analysis = ITSAnalysis(france_monthly, control_monthly)
-        results = analysis.perform_analysis()
-        
-        # Generate visualizations
-        print("\nCreating analysis visualizations...")
-        fig = analysis.create_analysis_visualizations()
-        fig.savefig(os.path.join(ANALYSIS_DIR, 'vaccination_impact.png'))
-        plt.close(fig)
-        
-        # Generate and save statistical report
-        print("\nGenerating statistical report...")
-        report = analysis.generate_statistical_report()
-        with open(os.path.join(ANALYSIS_DIR, 'statistical_report.txt'), 'w') as f:
-            f.write(report)
-        
-        print("\nAnalysis complete! Results saved to:")
-        print(f"- Visualization: {os.path.join(ANALYSIS_DIR, 'vaccination_impact.png')}")
-        print(f"- Statistical Report: {os.path.join(ANALYSIS_DIR, 'statistical_report.txt')}")
-        
     except Exception as e:
         print(f"\nAn error occurred: {str(e)}")
         print("\nDebug information:")
@@ -0,0 +1,216 @@
+import numpy as np
+import pandas as pd
+import os
+
+from analysis.its_batch import monthly_series_frame
+from analysis.study_periods import VACCINATION_START, VACCINATION_END, period_masks
+from data_processing.aggregate_cube import ensure_cube
+from data_processing.outbreak_cache import read_events
+
+DELAY_COLUMNS = ['Country', 'observation date', 'report date']
+PERIODS = ('pre', 'during', 'post')
+MAX_DELAY_DAYS = 180
+# groups with fewer events borrow the pooled distribution of their period
+MIN_EVENTS = 30
+# months less complete than this are too uncertain to correct and are dropped
+MIN_COMPLETENESS = 0.2
+
+
+def delay_cdfs(delays, ages, groups, n_groups, max_delay=MAX_DELAY_DAYS):
+    """
+    Right-truncation-corrected CDF of the reporting delay for every group
+    at once, shape (n_groups, max_delay + 1).
+
+    Events observed recently can only have been reported with a short
+    delay, so a plain histogram of the delays seen so far is biased low.
+    The reverse-time hazard estimator (Lagakos et al., 1988) only compares
+    each delay with events old enough to have had it:
+    P(D = d | D <= d) is estimated from events with delay <= d <= age, and
+    F(d) / F(max_delay) is the product of (1 - that hazard) above d.
+    Every count is built with one scatter-add per array.
+    """
+    delays = np.asarray(delays, dtype=np.intp)
+    ages = np.minimum(np.asarray(ages, dtype=np.intp), max_delay)
+    groups = np.asarray(groups, dtype=np.intp)
+    width = max_delay + 1
+
+    reported = np.zeros((n_groups, width))
+    np.add.at(reported, (groups, delays), 1)
+    leaving = np.zeros((n_groups, width + 1))
+    np.add.at(leaving, (groups, ages + 1), 1)
+    # events in the risk set at delay d: entered at their delay, left after their age
+    at_risk = np.cumsum(reported - leaving[:, :width], axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        hazard = np.where(at_risk > 0, reported / at_risk, 0.0)
+    # F(d) = prod_{j > d} (1 - hazard(j)), F(max_delay) = 1
+    cdf = np.ones((n_groups, width))
+    cdf[:, :-1] = np.cumprod((1 - hazard)[:, :0:-1], axis=1)[:, ::-1]
+    return cdf
+
+
+class ReportingDelayModel:
+    """
+    Reporting-delay distribution (observation date to report date, in
+    days) per country and vaccination period, estimated from the events
+    reported up to the data cutoff. Country-period groups with too few
+    events use the distribution of all countries in that period.
+    """
+    def __init__(self, events, max_delay=MAX_DELAY_DAYS, min_events=MIN_EVENTS,
+                 vaccination_start=VACCINATION_START, vaccination_end=VACCINATION_END):
+        events = events.dropna(subset=['observation date', 'report date'])
+        observed = events['observation date'].dt.tz_convert('UTC').dt.normalize()
+        reported = events['report date'].dt.tz_convert('UTC').dt.normalize()
+        delays = (reported - observed).dt.days.to_numpy()
+        if len(delays) == 0:
+            raise ValueError("No events with both an observation and a report date")
+
+        self.cutoff = reported.max()
+        self.max_delay = max_delay
+        self.vaccination_start = vaccination_start
+        self.vaccination_end = vaccination_end
+        # negative delays are data-entry errors; delays past max_delay are
+        # outside the window the nowcast corrects for
+        keep = (delays >= 0) & (delays <= max_delay)
+        delays = delays[keep]
+        ages = (self.cutoff - observed[keep]).dt.days.to_numpy()
+        countries = events['Country'].astype(str).to_numpy()[keep]
+        periods = self._period_codes(pd.DatetimeIndex(observed[keep]))
+
+        self.countries, country_codes = np.unique(countries, return_inverse=True)
+        n_periods = len(PERIODS)
+        group_codes = country_codes * n_periods + periods
+        n_groups = len(self.countries) * n_periods
+        by_group = delay_cdfs(delays, ages, group_codes, n_groups, max_delay)
+        pooled = delay_cdfs(delays, ages, periods, n_periods, max_delay)
+
+        self.events = np.bincount(group_codes, minlength=n_groups).reshape(-1, n_periods)
+        self.pooled_events = np.bincount(periods, minlength=n_periods)
+        self.uses_pooled = self.events < min_events
+        by_group = by_group.reshape(len(self.countries), n_periods, -1)
+        self.cdf = np.where(self.uses_pooled[:, :, None], pooled[None, :, :], by_group)
+
+    @classmethod
+    def from_event_files(cls, event_files, **kwargs):
+        events = pd.concat([read_events(path, columns=DELAY_COLUMNS) for path in event_files],
+                           ignore_index=True)
+        return cls(events, **kwargs)
+
+    def _period_codes(self, index):
+        masks = period_masks(index, self.vaccination_start, self.vaccination_end)
+        return np.select([masks[p] for p in PERIODS], range(len(PERIODS)))
+
+    def summary(self):
+        """
+        Events, median and 90th-percentile delay per country and period.
+        """
+        rows = []
+        for c, country in enumerate(self.countries):
+            for p, period in enumerate(PERIODS):
+                cdf = self.cdf[c, p]
+                rows.append({'country': country, 'period': period,
+                             'events': int(self.events[c, p]),
+                             'pooled': bool(self.uses_pooled[c, p]),
+                             'median_delay_days': int(np.searchsorted(cdf, 0.5)),
+                             'p90_delay_days': int(np.searchsorted(cdf, 0.9))})
+        return pd.DataFrame(rows)
+
+    def completeness(self, country, month_ends):
+        """
+        Expected share of each month's outbreaks already reported at the
+        cutoff, assuming observations spread evenly over the month's days
+        up to the cutoff. Days older than max_delay count as complete, and
+        countries without events are taken as complete.
+        """
+        months = pd.DatetimeIndex(month_ends).tz_convert('UTC').tz_localize(None).to_period('M')
+        matches = np.flatnonzero(self.countries == country)
+        if not len(matches):
+            return np.ones(len(months))
+
+        days = pd.date_range(self.cutoff - pd.Timedelta(days=self.max_delay), self.cutoff, freq='D')
+        ages = (self.cutoff - days).days.to_numpy()
+        day_cdf = pd.Series(self.cdf[matches[0], self._period_codes(days), ages],
+                            index=days.tz_localize(None).to_period('M'))
+        missing = (1 - day_cdf).groupby(level=0).sum().reindex(months, fill_value=0.0)
+
+        cutoff = self.cutoff.tz_localize(None)
+        observed_days = np.minimum(months.days_in_month,
+                                   (cutoff - months.start_time).days + 1).to_numpy(dtype=float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(observed_days > 0, 1 - missing.to_numpy() / observed_days, np.nan)
+
+
+def nowcast_country_frame(country_frame, model, min_completeness=MIN_COMPLETENESS):
+    """
+    Correct a frame of monthly counts per country (monthly_series_frame)
+    for reporting delay by dividing each month by its expected
+    completeness. Returns (corrected, completeness) frames; months below
+    min_completeness are NaN in the corrected frame.
+    """
+    completeness = pd.DataFrame(
+        {country: model.completeness(country, country_frame.index) for country in country_frame.columns},
+        index=country_frame.index)
+    corrected = country_frame / completeness.where(completeness >= min_completeness)
+    return corrected, completeness
+
+
+def nowcast_treated_and_control(event_files, treated='France', model=None,
+                                min_completeness=MIN_COMPLETENESS, **model_kwargs):
+    """
+    Delay-corrected monthly treated and pooled control series, ready for
+    ITSAnalysis. Each country is corrected with its own delay distribution
+    before pooling. Trailing months whose treated or pooled control
+    completeness is below min_completeness are dropped.
+
+    Returns (treated series, control series, table) where the table lists
+    observed counts, completeness and nowcast per month for both series.
+    """
+    model = model or ReportingDelayModel.from_event_files(event_files, **model_kwargs)
+    frame = monthly_series_frame(ensure_cube(event_files), by='Country')
+    corrected, completeness = nowcast_country_frame(frame, model, min_completeness=0.0)
+
+    controls = [c for c in frame.columns if c != treated]
+    table = pd.DataFrame({
+        'treated_observed': frame[treated],
+        'treated_completeness': completeness[treated],
+        'treated_nowcast': corrected[treated],
+        'control_observed': frame[controls].sum(axis=1),
+        'control_nowcast': corrected[controls].sum(axis=1),
+    })
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # months without control outbreaks fall back to the average country completeness
+        table['control_completeness'] = np.where(table['control_nowcast'] > 0,
+                                                 table['control_observed'] / table['control_nowcast'],
+                                                 completeness[controls].mean(axis=1))
+    table = table.rename_axis('month').reset_index()
+
+    reliable = ((table['treated_completeness'] >= min_completeness)
+                & (table['control_completeness'] >= min_completeness))
+
+    def trimmed(name):
+        # same span as cube_monthly_series (first to last month with
+        # outbreaks), less the incomplete tail; only trailing months can
+        # fall below min_completeness
+        active = table.index[table[f'{name}_observed'] > 0]
+        rows = table.loc[active.min():active.max()]
+        rows = rows[reliable[rows.index].cummin()]
+        return pd.Series(rows[f'{name}_nowcast'].to_numpy(), index=pd.DatetimeIndex(rows['month']).rename(None))
+
+    return trimmed('treated'), trimmed('control'), table
+
+
+def run_nowcast(event_files, output_dir, treated='France'):
+    """
+    Estimate the reporting delays and write the per-country delay summary
+    and the monthly nowcast table.
+    """
+    model = ReportingDelayModel.from_event_files(event_files)
+    _, _, table = nowcast_treated_and_control(event_files, treated=treated, model=model)
+    os.makedirs(output_dir, exist_ok=True)
+    delays_path = os.path.join(output_dir, 'reporting_delays.csv')
+    nowcast_path = os.path.join(output_dir, 'nowcast_monthly.csv')
+    model.summary().to_csv(delays_path, index=False)
+    table.to_csv(nowcast_path, index=False)
+    print(f"Saved reporting delays to: {delays_path}")
+    print(f"Saved nowcast to: {nowcast_path}")
+    return table
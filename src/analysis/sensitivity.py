@@ -0,0 +1,215 @@
+import numpy as np
+import pandas as pd
+import hashlib
+import json
+import os
+import sqlite3
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+from analysis.its_batch import its_design_matrix, fit_ols_batch
+from analysis.study_periods import VACCINATION_START
+from data_processing.aggregate_cube import EVENT_FILES
+from data_processing.aggregate_pyramid import (PYRAMID_DIR, ensure_pyramid, level_series,
+                                               load_level, resolve_level)
+
+RESULTS_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                          'results', 'analysis', 'sensitivity.sqlite')
+
+TREATED = 'France'
+NEIGHBOURS = ['Belgium', 'Germany', 'Italy', 'Luxembourg', 'Spain', 'Switzerland']
+# control definition -> (countries to include, countries to exclude); None means no restriction
+CONTROL_DEFINITIONS = {
+    'all': (None, [TREATED]),
+    'neighbours': (NEIGHBOURS, [TREATED]),
+    'non_neighbours': (None, [TREATED] + NEIGHBOURS),
+}
+
+DEFAULT_START_SHIFTS = (-6, -3, 0, 3, 6)     # months around the campaign start
+DEFAULT_WINDOWS = (None, 12, 24)             # months either side of the start; None = full series
+DEFAULT_FREQS = ('week', 'month')
+
+RESULT_COLUMNS = ['n_obs', 'france_level_change', 'france_level_p', 'france_slope_change',
+                  'france_slope_p', 'control_level_change', 'control_level_p',
+                  'control_slope_change', 'control_slope_p', 'did_effect', 'did_std_err']
+PARAM_COLUMNS = ['intervention_start', 'window_months', 'freq', 'control']
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS cells (
+    key TEXT PRIMARY KEY,
+    {', '.join(f'{c} TEXT' for c in ['intervention_start', 'freq', 'control'])},
+    window_months INTEGER,
+    {', '.join(f'{c} REAL' for c in RESULT_COLUMNS)},
+    error TEXT,
+    data_hash TEXT
+)
+"""
+
+# pyramid levels already read by this process, keyed by (pyramid_dir, level,
+# data hash) so a rebuilt pyramid is never served from an older read
+_LEVEL_CACHE = {}
+
+
+def sensitivity_grid(starts=None, windows=DEFAULT_WINDOWS, freqs=DEFAULT_FREQS,
+                     controls=tuple(CONTROL_DEFINITIONS)):
+    """
+    Every combination of intervention start, window length, frequency and
+    control definition, one dict per cell. Starts default to the campaign
+    start shifted by DEFAULT_START_SHIFTS months.
+    """
+    if starts is None:
+        starts = [VACCINATION_START + pd.DateOffset(months=m) for m in DEFAULT_START_SHIFTS]
+    for control in controls:
+        if control not in CONTROL_DEFINITIONS:
+            raise ValueError(f"Unknown control definition {control}; "
+                             f"expected one of {list(CONTROL_DEFINITIONS)}")
+    starts = [_utc(s) for s in starts]
+    return [{'intervention_start': start.strftime('%Y-%m-%d'), 'window_months': window,
+             'freq': resolve_level(freq), 'control': control}
+            for start, window, freq, control in product(starts, windows, freqs, controls)]
+
+
+def _utc(value):
+    ts = pd.Timestamp(value)
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+
+
+def _data_hash(pyramid_dir):
+    with open(os.path.join(pyramid_dir, 'meta.json')) as f:
+        return hashlib.sha256(json.dumps(json.load(f)['content_hashes']).encode()).hexdigest()
+
+
+def cell_key(cell, data_hash):
+    """
+    Cache key of a grid cell: its parameters and the event data it was fitted on.
+    """
+    payload = json.dumps({**{c: cell[c] for c in PARAM_COLUMNS}, 'data': data_hash}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _level_counts(level, event_files, pyramid_dir, data_hash):
+    key = (pyramid_dir, level, data_hash)
+    if key not in _LEVEL_CACHE:
+        _LEVEL_CACHE[key] = load_level(level, event_files, pyramid_dir)
+    return _LEVEL_CACHE[key]
+
+
+def fit_cell(counts, cell):
+    """
+    France and control ITS fits for one grid cell of a pyramid level, with
+    the difference-in-differences level effect. The DiD standard error
+    treats the two fits as independent.
+    """
+    include, exclude = CONTROL_DEFINITIONS[cell['control']]
+    treated = level_series(counts, countries=[TREATED])
+    control = level_series(counts, countries=include, exclude_countries=exclude)
+    start = max(treated.index.min(), control.index.min())
+    end = min(treated.index.max(), control.index.max())
+
+    intervention_start = _utc(cell['intervention_start'])
+    if cell['window_months'] is not None:
+        start = max(start, intervention_start - pd.DateOffset(months=cell['window_months']))
+        end = min(end, intervention_start + pd.DateOffset(months=cell['window_months']))
+    frame = pd.concat([treated[start:end], control[start:end]], axis=1).fillna(0)
+
+    fit = fit_ols_batch(its_design_matrix(frame.index, intervention_start), frame.to_numpy(dtype=float))
+    params, bse, pvalues = fit['params'], fit['bse'], fit['pvalues']
+    return {
+        'n_obs': len(frame),
+        'france_level_change': params[0, 2], 'france_level_p': pvalues[0, 2],
+        'france_slope_change': params[0, 3], 'france_slope_p': pvalues[0, 3],
+        'control_level_change': params[1, 2], 'control_level_p': pvalues[1, 2],
+        'control_slope_change': params[1, 3], 'control_slope_p': pvalues[1, 3],
+        'did_effect': params[0, 2] - params[1, 2],
+        'did_std_err': float(np.hypot(bse[0, 2], bse[1, 2])),
+    }
+
+
+def _fit_chunk(args):
+    level, cells, event_files, pyramid_dir, data_hash = args
+    counts = _level_counts(level, event_files, pyramid_dir, data_hash)
+    rows = []
+    for cell in cells:
+        try:
+            rows.append({**cell, **fit_cell(counts, cell), 'error': None})
+        except ValueError as e:
+            # a window with no post-period or too few points is a result, not a failure
+            rows.append({**cell, **dict.fromkeys(RESULT_COLUMNS), 'error': str(e)})
+    return rows
+
+
+def _connect(db_file):
+    os.makedirs(os.path.dirname(os.path.abspath(db_file)), exist_ok=True)
+    connection = sqlite3.connect(db_file)
+    connection.execute(_SCHEMA)
+    return connection
+
+
+def run_sensitivity(cells=None, event_files=None, db_file=RESULTS_DB, pyramid_dir=PYRAMID_DIR,
+                    processes=1, chunk_size=16, force=False):
+    """
+    Fit every cell of the sensitivity grid and store the results in an
+    SQLite table keyed by cell parameters and event-data hash, so a rerun
+    only fits cells that are new or whose data changed (unless force).
+
+    Cells are grouped by frequency and chunked; each worker reads a
+    pyramid level once and reuses it for every cell of that level.
+    Returns the results for the requested cells as a DataFrame.
+    """
+    event_files = event_files or EVENT_FILES
+    cells = sensitivity_grid() if cells is None else cells
+    ensure_pyramid(event_files, pyramid_dir)
+    data_hash = _data_hash(pyramid_dir)
+    keys = [cell_key(cell, data_hash) for cell in cells]
+
+    with closing(_connect(db_file)) as connection, connection:
+        done = set() if force else {row[0] for row in connection.execute('SELECT key FROM cells')}
+        todo = [cell for cell, key in zip(cells, keys) if key not in done]
+
+        jobs = []
+        for level in sorted({cell['freq'] for cell in todo}):
+            level_cells = [cell for cell in todo if cell['freq'] == level]
+            jobs += [(level, level_cells[i:i + chunk_size], event_files, pyramid_dir, data_hash)
+                     for i in range(0, len(level_cells), chunk_size)]
+        if processes == 1 or len(jobs) <= 1:
+            rows = [row for job in jobs for row in _fit_chunk(job)]
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                rows = [row for chunk in pool.map(_fit_chunk, jobs) for row in chunk]
+
+        columns = ['key'] + PARAM_COLUMNS + RESULT_COLUMNS + ['error', 'data_hash']
+        connection.executemany(
+            f"INSERT OR REPLACE INTO cells ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            [[cell_key(row, data_hash)] + [row[c] for c in PARAM_COLUMNS + RESULT_COLUMNS]
+             + [row['error'], data_hash] for row in rows])
+    if todo:
+        print(f"Fitted {len(todo)} of {len(cells)} sensitivity cells ({len(cells) - len(todo)} cached)")
+
+    results = query_sensitivity(db_file=db_file, data_hash=data_hash)
+    return results[results['key'].isin(keys)].reset_index(drop=True)
+
+
+def query_sensitivity(db_file=RESULTS_DB, **filters):
+    """
+    Stored sensitivity results as a DataFrame, optionally filtered on
+    column values, e.g. query_sensitivity(freq='week', control='neighbours').
+    A list value matches any of its items.
+    """
+    clauses, values = [], []
+    for column, value in filters.items():
+        if column not in ['key', 'data_hash'] + PARAM_COLUMNS:
+            raise ValueError(f"Cannot filter on {column}")
+        if value is None:
+            clauses.append(f'{column} IS NULL')
+            continue
+        value = list(value) if isinstance(value, (list, tuple, set)) else [value]
+        clauses.append(f"{column} IN ({', '.join('?' * len(value))})")
+        values += value
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+    with closing(_connect(db_file)) as connection:
+        table = pd.read_sql_query(
+            f'SELECT * FROM cells{where} ORDER BY freq, control, intervention_start, window_months',
+            connection, params=values)
+    table[['n_obs', 'window_months']] = table[['n_obs', 'window_months']].astype('Int64')
+    return table
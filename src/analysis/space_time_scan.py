@@ -0,0 +1,201 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from data_processing.spatial_index import SpatialIndex, chord_to_km, ensure_spatial_index, unit_vectors
+
+DAY_NS = 86_400 * 10 ** 9
+
+
+class ScanGeometry:
+    """
+    Candidate cylinders for the space-time permutation scan. Each
+    distinct outbreak location is a circle centre. Its circles hold the
+    nearest 1..max_neighbours events, found with the spatial index, and
+    are cut only where a location ends and within max_radius_km. Time
+    windows are every run of 1..max_length consecutive time units.
+    """
+    def __init__(self, index, time_unit_days=7, max_neighbours=50, max_radius_km=50.0, max_length=8):
+        valid = index.dates != np.iinfo('int64').min
+        self.event_ids = index.event_ids[valid]
+        self.latitude = index.latitude[valid]
+        self.longitude = index.longitude[valid]
+        dates = index.dates[valid]
+        if len(dates) < 2:
+            raise ValueError("Need at least two dated events to scan")
+
+        self.origin = dates.min()
+        self.time_unit_days = time_unit_days
+        self.times = ((dates - self.origin) // (time_unit_days * DAY_NS)).astype(np.intp)
+        self.n_time = int(self.times.max()) + 1
+        self.max_length = min(max_length, self.n_time)
+
+        events = SpatialIndex(self.event_ids, self.latitude, self.longitude, dates)
+        centres = np.unique(np.round(np.column_stack([self.latitude, self.longitude]), 5), axis=0)
+        self.centre_lat, self.centre_lon = centres[:, 0], centres[:, 1]
+
+        # one extra neighbour to see where the last location in a circle ends
+        k = min(max_neighbours + 1, len(self.times))
+        chords, neighbours = events.tree.query(unit_vectors(self.centre_lat, self.centre_lon), k=k)
+        distances = chord_to_km(chords)
+        ends_location = np.ones_like(distances, dtype=bool)
+        ends_location[:, :-1] = distances[:, 1:] > distances[:, :-1] + 1e-9
+        if k > max_neighbours:
+            neighbours, distances, ends_location = (a[:, :max_neighbours]
+                                                    for a in (neighbours, distances, ends_location))
+        self.neighbours = neighbours                            # centres x J
+        self.radius_km = distances
+        self.valid = ends_location & (distances <= max_radius_km)
+        # neighbours up to the largest valid circle; centres are scored in
+        # this order so each block can be cut to its own largest circle
+        self.circle_size = np.where(self.valid.any(axis=1),
+                                    self.valid.shape[1] - np.argmax(self.valid[:, ::-1], axis=1), 0)
+        self.order = np.argsort(self.circle_size, kind='stable')
+
+
+def _best_cylinders(times, geometry, min_cases=2, block_size=256):
+    """
+    Highest log-likelihood ratio over every cylinder for one assignment of
+    event times. Returns per-centre (llr, neighbours - 1, start, length).
+
+    Only windows starting in a time unit that holds one of the circle's
+    events are scored: moving any other window's start up to its first
+    such event keeps the observed count and cannot raise the expected
+    one. That needs J x J cells per centre and length rather than J x T.
+    The logarithms are evaluated only for cylinders holding more events
+    than expected, and at least min_cases of them.
+    """
+    L = len(geometry.neighbours)
+    T = geometry.n_time
+    total = len(times)
+    overall = np.concatenate([[0], np.cumsum(np.bincount(times, minlength=T))])
+
+    best = np.zeros(L)
+    best_at = np.zeros((L, 3), dtype=np.intp)
+    for block in range(0, L, block_size):
+        rows = geometry.order[block:block + block_size]
+        J = geometry.circle_size[rows[-1]]
+        if J == 0:
+            continue
+        B = len(rows)
+        zone_size = np.arange(1, J + 1)
+        anchor_in_zone = zone_size[:, None] <= zone_size[None, :]       # anchor x circle size
+        anchors = times[geometry.neighbours[rows, :J]]                  # B x J
+        offset = (anchors[:, None, :] - anchors[:, :, None]).astype(np.int16)  # anchor x neighbour
+        # an anchor sharing its time unit with an earlier neighbour repeats that one's windows
+        repeated = ((offset == 0) & ~anchor_in_zone).any(axis=2)
+        valid = geometry.valid[rows, None, :J] & anchor_in_zone & ~repeated[:, :, None]
+        observed = np.zeros((B, J, J), dtype=np.int16)
+        llr = np.zeros(B * J * J)
+        excess = np.empty(0, dtype=np.intp)
+
+        for length in range(1, geometry.max_length + 1):
+            # events among the first j+1 neighbours in the window's last time unit
+            step = np.cumsum(offset == length - 1, axis=2, dtype=np.int16)
+            observed += step
+            window_events = overall[np.minimum(anchors + length, T)] - overall[anchors]
+            # a window whose last unit adds nothing only raises the expected count, and
+            # a float32 expected count, floored at min_cases, is enough to find the cells with an excess
+            screen = zone_size.astype(np.float32) * (window_events / total).astype(np.float32)[:, :, None]
+            np.maximum(screen, min_cases - 0.5, out=screen)
+            llr[excess] = 0
+            excess = np.flatnonzero((step > 0) & (observed > screen) & valid)
+            c = observed.ravel()[excess].astype(float)
+            mu = zone_size[excess % J] * window_events.ravel()[excess // J] / total
+            llr[excess] = c * np.log(c / mu) + (total - c) * np.log((total - c) / (total - mu))
+
+            flat = llr.reshape(B, -1)
+            arg = flat.argmax(axis=1)
+            value = flat[np.arange(B), arg]
+            better = np.flatnonzero(value > best[rows])
+            best[rows[better]] = value[better]
+            anchor, j = np.unravel_index(arg[better], (J, J))
+            start = anchors[better, anchor]
+            # a window running past the last time unit is the shorter one that ends there
+            best_at[rows[better]] = np.column_stack([j, start, np.minimum(length, T - start)])
+    return best, best_at
+
+
+def _replicate_chunk(args):
+    geometry, n_replicates, seed, min_cases = args
+    rng = np.random.default_rng(seed)
+    maxima = np.empty(n_replicates)
+    for r in range(n_replicates):
+        llr, _ = _best_cylinders(rng.permutation(geometry.times), geometry, min_cases)
+        maxima[r] = llr.max()
+    return maxima
+
+
+def space_time_scan(index, n_replicates=999, time_unit_days=7, max_neighbours=50,
+                    max_radius_km=50.0, max_length=8, min_cases=2, seed=0, processes=1, chunk_size=25):
+    """
+    Space-time permutation scan statistic (Kulldorff, 2005) over outbreak
+    locations and observation dates.
+
+    Cylinders are scored by the Poisson log-likelihood ratio of observed
+    against expected events, with the expected count for a circle and
+    window taken from the space and time margins. Significance comes from
+    Monte Carlo replicates with the event dates shuffled across events.
+    Cylinders with fewer than min_cases observed events are not scored,
+    in the data or the replicates, so a lone outbreak is never reported
+    as a cluster.
+    The replicates are seeded per chunk, so results do not depend on the
+    number of processes.
+
+    Returns a DataFrame of non-overlapping clusters sorted by
+    log-likelihood ratio, with Monte Carlo p-values.
+    """
+    geometry = ScanGeometry(index, time_unit_days, max_neighbours, max_radius_km, max_length)
+    llr, best_at = _best_cylinders(geometry.times, geometry, min_cases)
+
+    sizes = [min(chunk_size, n_replicates - i) for i in range(0, n_replicates, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(geometry, size, s, min_cases) for size, s in zip(sizes, seeds)]
+    if processes == 1 or len(jobs) <= 1:
+        maxima = np.concatenate([_replicate_chunk(job) for job in jobs]) if jobs else np.empty(0)
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            maxima = np.concatenate(list(pool.map(_replicate_chunk, jobs)))
+
+    # secondary clusters: best cylinder per centre, dropping any that share events
+    clusters, used = [], set()
+    unit = np.timedelta64(geometry.time_unit_days, 'D')
+    origin = np.datetime64(int(geometry.origin), 'ns')
+    for centre in np.argsort(-llr, kind='stable'):
+        if llr[centre] <= 0:
+            break
+        j, start, length = best_at[centre]
+        members = geometry.neighbours[centre, :j + 1]
+        in_window = (geometry.times[members] >= start) & (geometry.times[members] < start + length)
+        events = set(geometry.event_ids[members].tolist())
+        if events & used:
+            continue
+        used |= events
+        observed = int(in_window.sum())
+        window_events = int(((geometry.times >= start) & (geometry.times < start + length)).sum())
+        clusters.append({
+            'centre_latitude': geometry.centre_lat[centre],
+            'centre_longitude': geometry.centre_lon[centre],
+            'radius_km': geometry.radius_km[centre, j],
+            'start': pd.Timestamp(origin + start * unit, tz='UTC'),
+            'end': pd.Timestamp(origin + (start + length) * unit, tz='UTC'),
+            'events_in_circle': int(j + 1),
+            'observed': observed,
+            'expected': (j + 1) * window_events / len(geometry.times),
+            'llr': llr[centre],
+            'p_value': (1 + np.sum(maxima >= llr[centre])) / (len(maxima) + 1),
+        })
+    return pd.DataFrame(clusters)
+
+
+def scan_event_files(event_files, **kwargs):
+    """
+    Run the scan over the events of one or more processed files, using
+    their persisted spatial indexes.
+    """
+    indexes = [ensure_spatial_index(path) for path in event_files]
+    combined = SpatialIndex(np.concatenate([ix.event_ids for ix in indexes]),
+                            np.concatenate([ix.latitude for ix in indexes]),
+                            np.concatenate([ix.longitude for ix in indexes]),
+                            np.concatenate([ix.dates for ix in indexes]))
+    return space_time_scan(combined, **kwargs)
@@ -0,0 +1,18 @@
+import pandas as pd
+
+# vaccination campaign in France; every analysis, figure and pipeline
+# stage reads the study periods from here
+VACCINATION_START = pd.Timestamp('2023-10-01').tz_localize('UTC')
+VACCINATION_END = pd.Timestamp('2024-10-01').tz_localize('UTC')
+
+
+def period_masks(index, start=VACCINATION_START, end=VACCINATION_END):
+    """
+    Boolean masks for the pre-vaccination, vaccination and post-vaccination
+    periods of a time index.
+    """
+    return {
+        'pre': index < start,
+        'during': (index >= start) & (index < end),
+        'post': index >= end,
+    }
@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+
+def project_to_simplex(V, mask):
+    """
+    Euclidean projection of each row of V onto the probability simplex,
+    restricted to the entries where mask is True (others are fixed at 0).
+    """
+    B, J = V.shape
+    masked = np.where(mask, V, -np.inf)
+    U = -np.sort(-masked, axis=1)                       # descending, -inf last
+    finite = np.isfinite(U)
+    css = np.cumsum(np.where(finite, U, 0.0), axis=1) - 1.0
+    k = np.arange(1, J + 1)
+    cond = finite & (U - css / k > 0)
+    rho = J - 1 - np.argmax(cond[:, ::-1], axis=1)      # last index where cond holds
+    theta = css[np.arange(B), rho] / (rho + 1)
+    return np.where(mask, np.maximum(V - theta[:, None], 0.0), 0.0)
+
+
+def solve_simplex_weights(G, c, mask, max_iter=20000, tol=1e-10):
+    """
+    Batched non-negative, sum-to-one least squares by accelerated projected
+    gradient (FISTA).
+
+    Each problem b minimises 0.5 w'G w - c[b]'w over the simplex of the
+    columns allowed by mask[b], i.e. ||y_b - A w||^2 with G = A'A and
+    c[b] = A'y_b. G is shared by all problems, so the whole batch costs one
+    (J x J) @ (J x B) product per iteration.
+    """
+    B, J = c.shape
+    L = np.linalg.eigvalsh(G)[-1]
+    if L <= 0:
+        raise ValueError("Donor matrix is all zeros over the pre-period")
+    step = 1.0 / L
+
+    w = mask / mask.sum(axis=1, keepdims=True)
+    z = w.copy()
+    t = 1.0
+    for _ in range(max_iter):
+        grad = z @ G - c
+        w_next = project_to_simplex(z - step * grad, mask)
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        z = w_next + ((t - 1) / t_next) * (w_next - w)
+        converged = np.max(np.abs(w_next - w)) < tol
+        w, t = w_next, t_next
+        if converged:
+            break
+    return w
+
+
+def _solve_chunk(args):
+    G, c, mask = args
+    return solve_simplex_weights(G, c, mask)
+
+
+def _solve(G, c, mask, processes=1, chunk_size=64):
+    if processes == 1 or len(c) <= chunk_size:
+        return solve_simplex_weights(G, c, mask)
+    starts = range(0, len(c), chunk_size)
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        parts = pool.map(_solve_chunk, [(G, c[i:i + chunk_size], mask[i:i + chunk_size]) for i in starts])
+        return np.concatenate(list(parts))
+
+
+def _rmspe(gaps):
+    return np.sqrt(np.mean(gaps ** 2, axis=-1))
+
+
+class SyntheticControl:
+    """
+    Synthetic control estimator for one treated country against a pool of
+    individual donor countries' monthly series.
+    """
+    def __init__(self, series_frame, treated, intervention_start, donors=None):
+        """
+        series_frame: aligned monthly counts, one column per country.
+        """
+        donors = donors or [c for c in series_frame.columns if c != treated]
+        if treated not in series_frame.columns:
+            raise ValueError(f"Treated unit {treated} not in series")
+
+        self.treated = treated
+        self.donors = list(donors)
+        self.units = [treated] + self.donors
+        self.data = series_frame[self.units].astype(float)
+        self.pre_mask = np.asarray(self.data.index < intervention_start)
+        if self.pre_mask.sum() < 2 or (~self.pre_mask).sum() < 1:
+            raise ValueError("Need at least two pre-period and one post-period observations")
+
+        M = self.data.to_numpy()
+        M_pre = M[self.pre_mask]
+        # shared Gram matrix over every unit; each problem masks its own target out
+        self._G = M_pre.T @ M_pre
+        self._M = M
+
+    def _fit(self, targets, excluded, processes=1):
+        """
+        Fit weights for each target unit index, with the excluded unit
+        indices (per problem) removed from its donor pool.
+        """
+        J = len(self.units)
+        mask = np.ones((len(targets), J), dtype=bool)
+        for b, (target, drop) in enumerate(zip(targets, excluded)):
+            mask[b, target] = False
+            mask[b, list(drop)] = False
+        c = self._G[:, targets].T
+        W = _solve(self._G, c, mask, processes=processes)
+
+        synthetic = W @ self._M.T                                   # B x T
+        gaps = self._M[:, targets].T - synthetic
+        pre = _rmspe(gaps[:, self.pre_mask])
+        post = _rmspe(gaps[:, ~self.pre_mask])
+        # units with no pre-period outbreaks are fitted exactly; their ratio is undefined
+        ratio = np.divide(post, pre, out=np.full_like(post, np.nan), where=pre > 0)
+        return W, synthetic, gaps, pre, post, ratio
+
+    def fit(self):
+        """
+        Donor weights and synthetic series for the treated country.
+        """
+        W, synthetic, gaps, pre, post, ratio = self._fit([0], [[]])
+        weights = pd.Series(W[0, 1:], index=self.donors).sort_values(ascending=False)
+        return {
+            'weights': weights[weights > 1e-6],
+            'synthetic': pd.Series(synthetic[0], index=self.data.index),
+            'gap': pd.Series(gaps[0], index=self.data.index),
+            'pre_rmspe': pre[0],
+            'post_rmspe': post[0],
+            'rmspe_ratio': ratio[0],
+            'post_effect': gaps[0, ~self.pre_mask].mean(),
+        }
+
+    def placebo_in_space(self, processes=1):
+        """
+        Refit with every donor in turn as the pseudo-treated unit (the real
+        treated country is left out of the placebo donor pools), all in one
+        batch. The p-value is the share of units whose post/pre RMSPE ratio
+        is at least the treated country's; units with an undefined ratio
+        (no pre-period outbreaks) are left out of the ranking.
+        """
+        targets = list(range(len(self.units)))
+        excluded = [[]] + [[0]] * len(self.donors)
+        W, synthetic, gaps, pre, post, ratio = self._fit(targets, excluded, processes)
+
+        table = pd.DataFrame({
+            'unit': self.units,
+            'pre_rmspe': pre,
+            'post_rmspe': post,
+            'rmspe_ratio': ratio,
+            'post_effect': gaps[:, ~self.pre_mask].mean(axis=1),
+            'is_treated': [True] + [False] * len(self.donors),
+        })
+        ranked = ratio[~np.isnan(ratio)]
+        p_value = float(np.mean(ranked >= ratio[0]))
+        return table.sort_values('rmspe_ratio', ascending=False).reset_index(drop=True), p_value
+
+    def leave_one_out(self, processes=1):
+        """
+        Refit the treated country's synthetic control once per donor with
+        that donor removed from the pool, all in one batch.
+        """
+        donors_idx = list(range(1, len(self.units)))
+        W, synthetic, gaps, pre, post, ratio = self._fit([0] * len(donors_idx),
+                                                         [[j] for j in donors_idx], processes)
+        return pd.DataFrame({
+            'dropped_donor': self.donors,
+            'pre_rmspe': pre,
+            'post_rmspe': post,
+            'rmspe_ratio': ratio,
+            'post_effect': gaps[:, ~self.pre_mask].mean(axis=1),
+        })
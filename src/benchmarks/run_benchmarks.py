@@ -0,0 +1,249 @@
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, SRC_DIR)
+
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, 'baselines.json')
+DEFAULT_SIZES = [10_000, 100_000]
+# a stage regresses when it is this much slower or larger than its baseline
+TIME_TOLERANCE = 0.5
+MEMORY_TOLERANCE = 0.25
+# differences below these are noise, whatever the ratio
+MIN_SECONDS = 0.05
+MIN_MB = 10.0
+
+
+def _paths(workdir):
+    return {'raw': os.path.join(workdir, 'raw', 'europe_hpai_bird_outbreaks.csv'),
+            'france': os.path.join(workdir, 'processed', 'france_hpai_outbreaks.csv'),
+            'control': os.path.join(workdir, 'processed', 'europe_control_group.csv'),
+            'figures': os.path.join(workdir, 'figures')}
+
+
+def _run_extract(paths):
+    from data_processing.extract_french_hpai_data import extract_french_data
+    extract_french_data(paths['raw'], paths['france'])
+
+
+def _run_control_group(paths):
+    from data_processing.process_control_group import process_control_group
+    process_control_group(paths['raw'], paths['control'])
+
+
+def _run_statistics(paths):
+    from analysis.hpai_stats_analysis import OutbreakAnalysis
+    OutbreakAnalysis(paths['france'], paths['control']).calculate_period_statistics()
+
+
+def _run_its(paths):
+    from analysis.itsa_analysis import ITSAnalysis
+    from data_processing.aggregate_pyramid import treated_and_control_series
+    ITSAnalysis(*treated_and_control_series([paths['france'], paths['control']])).perform_analysis()
+
+
+def _run_figures(paths):
+    from visualization.plot_outbreak_trends import generate_all_figures
+    generate_all_figures(paths['france'], paths['control'], output_dir=paths['figures'], processes=1)
+
+
+# in pipeline order; later stages read what earlier ones wrote, and share
+# their caches, as in a scheduled run
+STAGES = {
+    'extract': _run_extract,
+    'control_group': _run_control_group,
+    'statistics': _run_statistics,
+    'its': _run_its,
+    'figures': _run_figures,
+}
+STAGE_MODULES = {
+    'extract': ['data_processing.extract_french_hpai_data'],
+    'control_group': ['data_processing.process_control_group'],
+    'statistics': ['analysis.hpai_stats_analysis'],
+    'its': ['analysis.itsa_analysis', 'data_processing.aggregate_pyramid', 'scipy.special', 'statsmodels.api'],
+    'figures': ['visualization.plot_outbreak_trends', 'matplotlib.pyplot'],
+}
+
+
+def _max_rss_mb():
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+
+
+def _measure(job):
+    """
+    Run one stage in this (fresh) process and return its wall time, the
+    process's peak RSS and how far the stage pushed the peak above the
+    footprint after imports. Imports are done before the clock starts.
+    """
+    stage, workdir = job
+    paths = _paths(workdir)
+    for module in STAGE_MODULES[stage]:
+        importlib.import_module(module)
+    before = _max_rss_mb()
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        STAGES[stage](paths)
+    seconds = time.perf_counter() - start
+    peak = _max_rss_mb()
+    return {'seconds': seconds, 'max_rss_mb': peak, 'peak_growth_mb': peak - before}
+
+
+def _run_stage(stage, workdir):
+    # a spawned process per stage keeps imports and memory peaks separate;
+    # HPAI_CACHE_DIR points every cache at the scratch directory
+    previous = os.environ.get('HPAI_CACHE_DIR')
+    os.environ['HPAI_CACHE_DIR'] = os.path.join(workdir, 'cache')
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+            return pool.submit(_measure, (stage, workdir)).result()
+    finally:
+        if previous is None:
+            del os.environ['HPAI_CACHE_DIR']
+        else:
+            os.environ['HPAI_CACHE_DIR'] = previous
+
+
+def synthetic_export(rows, data_dir, seed=0):
+    """
+    Path of the synthetic export with the given size and seed, generating
+    it on first use.
+    """
+    from benchmarks.synthetic_data import generate_export
+
+    path = os.path.join(data_dir, f'synthetic_{rows}_{seed}.csv')
+    if not os.path.exists(path):
+        print(f"Generating {rows} synthetic events...")
+        generate_export(rows, path + '.tmp', seed=seed)
+        os.replace(path + '.tmp', path)
+    return path
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, stages=None, repeat=1, data_dir=None, seed=0):
+    """
+    Time every stage on synthetic exports of each size. Each repeat runs
+    the stages from cold caches in a fresh scratch directory; the fastest
+    time and the largest memory peaks are kept.
+
+    Returns {'stage@rows': {'seconds', 'max_rss_mb', 'peak_growth_mb'}}.
+    """
+    stages = stages or list(STAGES)
+    data_dir = data_dir or os.path.join(tempfile.gettempdir(), 'hpai_benchmark_data')
+    os.makedirs(data_dir, exist_ok=True)
+    # stages need the ones before them to have run
+    needed = list(STAGES)[:max(list(STAGES).index(s) for s in stages) + 1]
+
+    results = {}
+    for rows in sizes:
+        export = synthetic_export(rows, data_dir, seed)
+        for _ in range(repeat):
+            workdir = tempfile.mkdtemp(prefix='hpai_benchmark_')
+            try:
+                os.makedirs(os.path.dirname(_paths(workdir)['raw']))
+                shutil.copyfile(export, _paths(workdir)['raw'])
+                for stage in needed:
+                    measured = _run_stage(stage, workdir)
+                    if stage not in stages:
+                        continue
+                    key = f'{stage}@{rows}'
+                    best = results.setdefault(key, measured)
+                    best['seconds'] = min(best['seconds'], measured['seconds'])
+                    best['max_rss_mb'] = max(best['max_rss_mb'], measured['max_rss_mb'])
+                    best['peak_growth_mb'] = max(best['peak_growth_mb'], measured['peak_growth_mb'])
+                    print(f"{key}: {measured['seconds']:.3f}s, peak RSS {measured['max_rss_mb']:.1f} MB "
+                          f"(+{measured['peak_growth_mb']:.1f} MB over imports)")
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def machine_info():
+    return {'python': platform.python_version(), 'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(), 'cpus': os.cpu_count()}
+
+
+def load_baselines(baseline_file=BASELINE_FILE):
+    if not os.path.exists(baseline_file):
+        return {'machine': None, 'results': {}}
+    with open(baseline_file) as f:
+        return json.load(f)
+
+
+def save_baselines(results, baseline_file=BASELINE_FILE):
+    """
+    Merge results into the stored baselines, replacing measured entries.
+    """
+    baselines = load_baselines(baseline_file)
+    baselines['machine'] = machine_info()
+    baselines['results'].update({key: {k: round(v, 4) for k, v in value.items()}
+                                 for key, value in results.items()})
+    baselines['results'] = dict(sorted(baselines['results'].items()))
+    with open(baseline_file, 'w') as f:
+        json.dump(baselines, f, indent=4)
+    print(f"Saved baselines to: {baseline_file}")
+
+
+def compare(results, baselines, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """
+    Regressions against the baselines as a list of messages; stages
+    without a baseline are skipped.
+    """
+    regressions = []
+    for key, measured in results.items():
+        baseline = baselines['results'].get(key)
+        if baseline is None:
+            continue
+        if (measured['seconds'] > baseline['seconds'] * (1 + time_tolerance)
+                and measured['seconds'] - baseline['seconds'] > MIN_SECONDS):
+            regressions.append(f"{key}: {measured['seconds']:.3f}s vs baseline {baseline['seconds']:.3f}s")
+        if (measured['max_rss_mb'] > baseline['max_rss_mb'] * (1 + memory_tolerance)
+                and measured['max_rss_mb'] - baseline['max_rss_mb'] > MIN_MB):
+            regressions.append(f"{key}: peak RSS {measured['max_rss_mb']:.1f} MB "
+                               f"vs baseline {baseline['max_rss_mb']:.1f} MB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Per-stage time and memory benchmarks on synthetic exports.')
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES,
+                        help='Rows in the synthetic exports (10^4 to 10^7)')
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), help='Stages to measure (default: all)')
+    parser.add_argument('--repeat', type=int, default=1, help='Cold runs per size; the fastest is kept')
+    parser.add_argument('--data-dir', help='Where generated exports are kept between runs')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the generator')
+    parser.add_argument('--baseline-file', default=BASELINE_FILE, help='Stored baselines (JSON)')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baselines')
+    parser.add_argument('--output', help='Also write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.stages, args.repeat, args.data_dir, args.seed)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'machine': machine_info(), 'results': results}, f, indent=4)
+    if args.save_baseline:
+        save_baselines(results, args.baseline_file)
+        return 0
+
+    regressions = compare(results, load_baselines(args.baseline_file))
+    if regressions:
+        print("\nPerformance regressions:")
+        for message in regressions:
+            print(f"- {message}")
+        return 1
+    print("\nNo regressions against the stored baselines.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
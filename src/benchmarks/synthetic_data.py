@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.outbreak_cache import RAW_FILE
+from data_processing.schema import read_outbreak_csv
+
+RAW_COLUMNS = ['Event ID', 'Disease', 'Serotype', 'latitude', 'longitude', 'Locality', 'Country',
+               'Region', 'observation date', 'report date', 'Species', 'Diagnosis Source',
+               'Humans Affected', 'Human Deaths', 'Diagnosis Status']
+# drawn independently of country and date, with the export's frequencies
+CATEGORICAL_COLUMNS = ['Disease', 'Serotype', 'Region', 'Species', 'Diagnosis Source', 'Diagnosis Status']
+# spread of generated farms around the real outbreak locations, in degrees
+COORDINATE_JITTER = 0.05
+CHUNK_ROWS = 1_000_000
+FIRST_EVENT_ID = 300_000
+
+
+class ExportProfile:
+    """
+    What the generator reproduces from a real WAHIS export: the country
+    mix, outbreak locations and localities per country, the seasonality
+    of observation dates over the export's span, the reporting delays and
+    the frequencies of the remaining categorical columns.
+    """
+    def __init__(self, events):
+        events = events.reset_index(drop=True)
+        countries = events['Country'].astype(str)
+        self.countries, counts = np.unique(countries, return_counts=True)
+        self.country_weights = counts / counts.sum()
+
+        # locations grouped by country, so one country's pool is a contiguous slice
+        order = np.argsort(countries.to_numpy(), kind='stable')
+        self.latitude = events['latitude'].to_numpy(dtype=float)[order]
+        self.longitude = events['longitude'].to_numpy(dtype=float)[order]
+        self.locality = events['Locality'].astype(str).to_numpy()[order]
+        self.pool_start = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        self.pool_size = counts
+
+        observed = events['observation date'].dropna().dt.tz_convert('UTC').dt.tz_localize(None)
+        self.days = pd.date_range(observed.min().normalize(), observed.max().normalize(), freq='D')
+        month_share = observed.dt.month.value_counts(normalize=True)
+        day_weights = month_share.reindex(self.days.month, fill_value=0).to_numpy()
+        self.day_weights = day_weights / day_weights.sum()
+        self.missing_date_share = events['observation date'].isna().mean()
+
+        delays = (events['report date'] - events['observation date']).dt.days.dropna()
+        self.delays = delays[delays >= 0].to_numpy(dtype=np.int64)
+
+        self.categories = {}
+        for column in CATEGORICAL_COLUMNS:
+            shares = events[column].astype(str).value_counts(normalize=True)
+            self.categories[column] = (shares.index.to_numpy(dtype=object), shares.to_numpy())
+
+    @classmethod
+    def from_export(cls, raw_file=RAW_FILE):
+        return cls(read_outbreak_csv(raw_file))
+
+    def sample(self, n_rows, rng, first_event_id=FIRST_EVENT_ID):
+        """
+        n_rows synthetic events with the raw export's columns and formats.
+        """
+        country = rng.choice(len(self.countries), size=n_rows, p=self.country_weights)
+        pick = self.pool_start[country] + (rng.random(n_rows) * self.pool_size[country]).astype(np.int64)
+
+        day = rng.choice(len(self.days), size=n_rows, p=self.day_weights)
+        observed = self.days.to_numpy()[day]
+        reported = observed + rng.choice(self.delays, size=n_rows).astype('timedelta64[D]')
+        observed_text = np.char.add(np.datetime_as_string(observed, unit='s'), 'Z').astype(object)
+        observed_text[rng.random(n_rows) < self.missing_date_share] = None
+
+        columns = {
+            'Event ID': np.arange(first_event_id, first_event_id + n_rows),
+            'latitude': np.round(self.latitude[pick] + rng.normal(0, COORDINATE_JITTER, n_rows), 6),
+            'longitude': np.round(self.longitude[pick] + rng.normal(0, COORDINATE_JITTER, n_rows), 6),
+            'Locality': self.locality[pick],
+            'Country': self.countries[country],
+            'observation date': observed_text,
+            'report date': np.char.add(np.datetime_as_string(reported, unit='s'), 'Z'),
+            'Humans Affected': np.nan,
+            'Human Deaths': np.nan,
+        }
+        for column, (values, shares) in self.categories.items():
+            columns[column] = values[rng.choice(len(values), size=n_rows, p=shares)]
+        return pd.DataFrame(columns)[RAW_COLUMNS]
+
+
+def generate_export(n_rows, output_file, profile=None, seed=0, chunk_rows=CHUNK_ROWS):
+    """
+    Write a synthetic raw export of n_rows events to output_file, in chunks
+    so 10^7-row files never sit in memory at once. The file is reproducible
+    for a given seed and chunk_rows.
+    """
+    profile = profile or ExportProfile.from_export()
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    for start in range(0, n_rows, chunk_rows):
+        chunk = profile.sample(min(chunk_rows, n_rows - start), rng, FIRST_EVENT_ID + start)
+        chunk.to_csv(output_file, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+    return output_file
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic WAHIS-style outbreak export.')
+    parser.add_argument('rows', type=int, help='Number of events')
+    parser.add_argument('output', help='CSV file to write')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--profile', default=RAW_FILE, help='Real export to take the profile from')
+    args = parser.parse_args(argv)
+    generate_export(args.rows, args.output, ExportProfile.from_export(args.profile), seed=args.seed)
+    print(f"Wrote {args.rows} synthetic events to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
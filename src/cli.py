@@ -0,0 +1,479 @@
+import time
+
+_START = time.perf_counter()
+
+import argparse
+import importlib
+import json
+import os
+import sys
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SRC_DIR)
+sys.path.insert(0, SRC_DIR)
+
+DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
+FRANCE_DATA = os.path.join(DATA_DIR, 'processed', 'france_hpai_outbreaks.csv')
+CONTROL_DATA = os.path.join(DATA_DIR, 'processed', 'europe_control_group.csv')
+
+HEAVY_MODULES = ['matplotlib', 'seaborn', 'scipy', 'statsmodels']
+
+# Subcommands import only what they need. stats, its, report and export
+# never load matplotlib or seaborn; `--timings` reports what was loaded.
+COMMAND_IMPORTS = {
+    'stats': ['analysis.hpai_stats_analysis'],
+    'its': ['analysis.itsa_analysis', 'analysis.its_batch', 'analysis.its_count',
+            'analysis.control_robustness', 'scipy.special'],
+    'report': ['analysis.itsa_analysis'],
+    'placebo': ['analysis.itsa_analysis'],
+    'bootstrap': ['analysis.itsa_analysis', 'scipy.special'],
+    'nearby': ['data_processing.spatial_index', 'scipy.spatial'],
+    'scan': ['analysis.space_time_scan', 'scipy.spatial'],
+    'synth': ['analysis.synthetic_control', 'analysis.its_batch'],
+    'nowcast': ['analysis.reporting_delay'],
+    'dedup': ['data_processing.deduplicate', 'scipy.sparse'],
+    'sensitivity': ['analysis.sensitivity', 'scipy.special'],
+    'export': ['analysis.hpai_stats_analysis', 'analysis.itsa_analysis', 'scipy.special'],
+    'figures': ['visualization.plot_outbreak_trends'],
+    'pipeline': ['pipeline'],
+}
+
+
+def _its_analysis(args):
+    from analysis.itsa_analysis import ITSAnalysis
+    from data_processing.aggregate_pyramid import treated_and_control_series
+
+    event_files = [args.france_data, args.control_data]
+    if args.nowcast:
+        from analysis.reporting_delay import nowcast_treated_and_control
+
+        if args.freq != 'month':
+            raise ValueError("Nowcasting is only available for monthly series")
+        france, control, _ = nowcast_treated_and_control(event_files)
+        return ITSAnalysis(france, control)
+    return ITSAnalysis(*treated_and_control_series(event_files, args.freq))
+
+
+def _write_or_print(text, output):
+    if output:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            f.write(text)
+        print(f"Saved to: {output}")
+    else:
+        print(text)
+
+
+def cmd_stats(args):
+    if args.streaming:
+        # read straight from the accumulators, without loading the cube
+        from analysis.study_periods import VACCINATION_START, VACCINATION_END
+        from data_processing.period_accumulators import ensure_store
+
+        store = ensure_store(VACCINATION_START, VACCINATION_END, [args.france_data, args.control_data])
+        _write_or_print(store.table().to_csv(), args.output)
+        return
+
+    from analysis.hpai_stats_analysis import OutbreakAnalysis
+
+    stats_df = OutbreakAnalysis(args.france_data, args.control_data,
+                                freq=args.freq).calculate_period_statistics()
+    _write_or_print(stats_df.to_csv(), args.output)
+
+
+def cmd_its(args):
+    if args.leave_one_out:
+        # every leave-one-country-out control group, fitted as one batch
+        from analysis.control_robustness import leave_one_country_out
+        from analysis.its_batch import monthly_series_frame
+        from data_processing.aggregate_cube import ensure_cube
+
+        cube = ensure_cube([args.france_data, args.control_data])
+        table = leave_one_country_out(monthly_series_frame(cube, by='Country'))
+        _write_or_print(table.to_csv(index=False), args.output)
+        influential = table.iloc[1:].loc[lambda t: t['did_shift'].abs().idxmax()]
+        print(f"Full-pool DiD {table['did_effect'].iloc[0]:.2f}; leave-one-out range "
+              f"{table['did_effect'].iloc[1:].min():.2f} to {table['did_effect'].iloc[1:].max():.2f}; "
+              f"most influential: {influential['dropped_country']} ({influential['did_shift']:+.2f})")
+        return
+
+    if args.by:
+        # one ITS fit per country / species group / serotype, in a single batch
+        from analysis.study_periods import VACCINATION_START
+        from analysis.its_batch import fit_its_batch, monthly_series_frame
+        from data_processing.aggregate_cube import ensure_cube
+
+        if args.by == 'region':
+            from data_processing.region_index import REGIONS_FILE, region_monthly_frame
+            frame = region_monthly_frame([args.france_data, args.control_data],
+                                         args.regions_file or REGIONS_FILE)
+        else:
+            frame = monthly_series_frame(ensure_cube([args.france_data, args.control_data]), by=args.by)
+        if args.model == 'ols':
+            table = fit_its_batch(frame, VACCINATION_START)
+        else:
+            from analysis.its_count import fit_count_its_batch
+            table = fit_count_its_batch(frame, VACCINATION_START, family=args.model,
+                                        harmonics=args.harmonics)
+        _write_or_print(table.to_csv(index=False), args.output)
+        return
+
+    if args.model != 'ols':
+        import pandas as pd
+
+        fit = _its_analysis(args).perform_count_analysis(args.model, args.harmonics)
+        table = pd.DataFrame({
+            'series': [series for series in ('France', 'Control') for _ in fit['terms']],
+            'term': fit['terms'] * 2,
+            'coef': fit['params'].ravel(),
+            'std_err': fit['bse'].ravel(),
+            'p_value': fit['pvalues'].ravel(),
+        })
+        _write_or_print(table.to_csv(index=False), args.output)
+        print(f"Difference-in-differences (log rate ratio of level change): {fit['did_effect']:.4f}")
+        return
+
+    results = _its_analysis(args).results()
+    _write_or_print(results.coefficient_table().to_csv(index=False), args.output)
+    print(f"Difference-in-differences (level change): {results.did_effect:.4f}")
+
+
+def cmd_report(args):
+    _write_or_print(_its_analysis(args).generate_statistical_report(), args.output)
+
+
+def cmd_placebo(args):
+    table, summary = _its_analysis(args).placebo_in_time(
+        min_pre=args.min_pre, min_post=args.min_post, processes=args.processes)
+    _write_or_print(table.to_csv(index=False), args.output)
+    print(f"Actual break {summary['actual_break']:%Y-%m}: {summary['effect']} = "
+          f"{summary['actual_effect']:.2f}, rank {summary['rank']} of {summary['n_breaks']}, "
+          f"placebo p = {summary['placebo_p_value']:.3f}")
+
+
+def cmd_bootstrap(args):
+    table = _its_analysis(args).bootstrap_confidence_intervals(
+        n_boot=args.n_boot, block_length=args.block_length, alpha=args.alpha,
+        seed=args.seed, processes=args.processes)
+    _write_or_print(table.to_csv(index=False), args.output)
+    did = table[table['series'] == 'DiD'].iloc[0]
+    print(f"DiD level effect {did['coef']:.2f}, {100 * (1 - args.alpha):.0f}% CI "
+          f"[{did['ci_lower']:.2f}, {did['ci_upper']:.2f}]")
+
+
+def cmd_synth(args):
+    from analysis.study_periods import VACCINATION_START
+    from analysis.its_batch import monthly_series_frame
+    from analysis.synthetic_control import SyntheticControl
+    from data_processing.aggregate_cube import ensure_cube
+
+    cube = ensure_cube([args.france_data, args.control_data])
+    synth = SyntheticControl(monthly_series_frame(cube, by='Country'), 'France', VACCINATION_START)
+    fit = synth.fit()
+    if args.leave_one_out:
+        table = synth.leave_one_out(processes=args.processes)
+        _write_or_print(table.to_csv(index=False), args.output)
+    else:
+        table, p_value = synth.placebo_in_space(processes=args.processes)
+        _write_or_print(table.to_csv(index=False), args.output)
+        print(f"Placebo-in-space p = {p_value:.3f}")
+    print("Donor weights: " + ', '.join(f"{name} {w:.3f}" for name, w in fit['weights'].items()))
+    print(f"Pre RMSPE {fit['pre_rmspe']:.2f}, post RMSPE {fit['post_rmspe']:.2f}, "
+          f"mean post-period gap {fit['post_effect']:.2f}")
+
+
+def cmd_nowcast(args):
+    from analysis.reporting_delay import ReportingDelayModel, nowcast_treated_and_control
+
+    event_files = [args.france_data, args.control_data]
+    model = ReportingDelayModel.from_event_files(event_files, max_delay=args.max_delay)
+    if args.delays:
+        _write_or_print(model.summary().to_csv(index=False), args.output)
+        return
+    france, control, table = nowcast_treated_and_control(event_files, model=model,
+                                                         min_completeness=args.min_completeness)
+    _write_or_print(table.tail(args.months).to_csv(index=False), args.output)
+    print(f"Data cutoff {model.cutoff:%Y-%m-%d}; series for ITS end {france.index.max():%Y-%m}")
+
+
+def cmd_dedup(args):
+    import pandas as pd
+    from data_processing.deduplicate import deduplicate_events
+    from data_processing.outbreak_cache import read_events, store_events
+
+    reports = []
+    for path in (args.france_data, args.control_data):
+        events, decisions = deduplicate_events(read_events(path), distance_km=args.distance_km,
+                                               window_days=args.window_days,
+                                               match_locality=not args.ignore_locality)
+        reports.append(decisions.drop(columns='row').assign(source=os.path.basename(path)))
+        print(f"{os.path.basename(path)}: {len(decisions)} near-duplicates of {len(events) + len(decisions)} events")
+        if args.apply and len(decisions):
+            store_events(events, path)
+    _write_or_print(pd.concat(reports, ignore_index=True).to_csv(index=False), args.output)
+
+
+def cmd_sensitivity(args):
+    from analysis.sensitivity import run_sensitivity, sensitivity_grid
+
+    cells = sensitivity_grid(starts=args.starts, windows=args.windows,
+                             freqs=args.freqs, controls=args.controls)
+    table = run_sensitivity(cells, [args.france_data, args.control_data],
+                            processes=args.processes, force=args.force)
+    _write_or_print(table.drop(columns=['key', 'data_hash']).to_csv(index=False), args.output)
+    fitted = table['error'].isna()
+    print(f"{fitted.sum()} of {len(table)} cells fitted; DiD level effect ranges "
+          f"{table.loc[fitted, 'did_effect'].min():.2f} to {table.loc[fitted, 'did_effect'].max():.2f}")
+
+
+def _window(value):
+    return None if value == 'full' else int(value)
+
+
+def cmd_nearby(args):
+    import pandas as pd
+    from data_processing.spatial_index import ensure_spatial_index
+
+    frames = []
+    for path in (args.france_data, args.control_data):
+        index = ensure_spatial_index(path)
+        if args.k:
+            frames.append(index.nearest(args.lat, args.lon, k=args.k))
+        else:
+            frames.append(index.within(args.lat, args.lon, args.radius_km,
+                                       start=args.start, end=args.end))
+    table = pd.concat(frames, ignore_index=True).sort_values('distance_km', kind='stable')
+    if args.k:
+        table = table.head(args.k)
+    _write_or_print(table.to_csv(index=False), args.output)
+    print(f"{len(table)} outbreaks found")
+
+
+def cmd_scan(args):
+    from analysis.space_time_scan import scan_event_files
+
+    event_files = [args.france_data] + ([args.control_data] if args.europe else [])
+    clusters = scan_event_files(event_files, n_replicates=args.replicates,
+                                time_unit_days=args.time_unit_days,
+                                max_neighbours=args.max_neighbours,
+                                max_radius_km=args.max_radius_km, max_length=args.max_length,
+                                min_cases=args.min_cases, seed=args.seed, processes=args.processes)
+    _write_or_print(clusters.to_csv(index=False), args.output)
+    significant = (clusters['p_value'] <= 0.05).sum() if len(clusters) else 0
+    print(f"{len(clusters)} candidate clusters, {significant} with p <= 0.05")
+
+
+def cmd_export(args):
+    from analysis.hpai_stats_analysis import OutbreakAnalysis
+
+    stats_df = OutbreakAnalysis(args.france_data, args.control_data,
+                                freq=args.freq).calculate_period_statistics()
+    results = _its_analysis(args).results()
+
+    export = {
+        'period_statistics': [
+            {'period': period, 'series': series, **{k: float(v) for k, v in row.items()}}
+            for (period, series), row in stats_df.iterrows()
+        ],
+        **results.to_dict(),
+    }
+    _write_or_print(json.dumps(export, indent=4), args.output)
+
+
+def cmd_figures(args):
+    from visualization.plot_outbreak_trends import generate_all_figures
+
+    generate_all_figures(args.france_data, args.control_data, processes=args.processes)
+
+
+def cmd_pipeline(args):
+    from pipeline import Pipeline
+
+    summary = Pipeline().run(args.stages or None, force=args.force, dry_run=args.dry_run)
+    print("\nPipeline summary:")
+    for name, status in summary.items():
+        print(f"{name}: {status}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='HPAI vaccination analysis command line.')
+    parser.add_argument('--france-data', default=FRANCE_DATA, help='Processed France events CSV')
+    parser.add_argument('--control-data', default=CONTROL_DATA, help='Processed control group events CSV')
+    parser.add_argument('--freq', default='month', choices=['day', 'week', 'month', 'season'],
+                        help='Resolution of the France/control series for stats and ITS commands '
+                             '(its --by / --leave-one-out and stats --streaming are monthly only)')
+    parser.add_argument('--nowcast', action='store_true',
+                        help='Correct the trailing months for reporting delay before the ITS commands')
+    parser.add_argument('--timings', action='store_true',
+                        help='Report import and run time, and which heavy libraries were loaded')
+    parser.add_argument('--timings-log', help='Append timings as a JSON line to this file')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for name, func, help_text in (
+            ('stats', cmd_stats, 'Pre/during/post vaccination statistics (CSV)'),
+            ('its', cmd_its, 'ITS regression coefficients (CSV)'),
+            ('report', cmd_report, 'Plain-text statistical report'),
+            ('export', cmd_export, 'Statistics and ITS coefficients as JSON')):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('--output', help='Write to this file instead of stdout')
+        sub.set_defaults(func=func)
+        if name == 'stats':
+            sub.add_argument('--streaming', action='store_true',
+                             help='Read the table from the persisted per-period accumulators')
+        if name == 'its':
+            sub.add_argument('--by', choices=['Country', 'species_group', 'serotype', 'region'],
+                             help='Fit one series per cube group or sub-national region instead of France vs control')
+            sub.add_argument('--regions-file', help='GeoJSON region boundaries for --by region '
+                                                    '(default: data/external/france_departments.geojson)')
+            sub.add_argument('--model', choices=['ols', 'poisson', 'negbin'], default='ols',
+                             help='OLS on counts, or a seasonal Poisson / negative binomial model')
+            sub.add_argument('--harmonics', type=int, default=2,
+                             help='Fourier harmonics for the count models\' seasonal terms')
+            sub.add_argument('--leave-one-out', action='store_true',
+                             help='DiD estimate for every leave-one-country-out control group')
+
+    sub = subparsers.add_parser('placebo', help='Placebo-in-time sweep over every break month (CSV)')
+    sub.add_argument('--output', help='Write to this file instead of stdout')
+    sub.add_argument('--min-pre', type=int, default=6, help='Minimum months before a break')
+    sub.add_argument('--min-post', type=int, default=6, help='Minimum months after a break')
+    sub.add_argument('--processes', type=int, default=1, help='Worker processes for large grids')
+    sub.set_defaults(func=cmd_placebo)
+
+    sub = subparsers.add_parser('bootstrap', help='Moving-block bootstrap CIs for the ITS and DiD effects (CSV)')
+    sub.add_argument('--output', help='Write to this file instead of stdout')
+    sub.add_argument('--n-boot', type=int, default=2000, help='Bootstrap replicates')
+    sub.add_argument('--block-length', type=int, help='Block length in months (default: n^(1/3))')
+    sub.add_argument('--alpha', type=float, default=0.05, help='Two-sided significance level')
+    sub.add_argument('--seed', type=int, default=0, help='Random seed')
+    sub.add_argument('--processes', type=int, default=1, help='Worker processes')
+    sub.set_defaults(func=cmd_bootstrap)
+
+    sub = subparsers.add_parser('synth', help='Synthetic control for France from the donor countries (CSV)')
+    sub.add_argument('--output', help='Write to this file instead of stdout')
+    sub.add_argument('--leave-one-out', action='store_true',
+                     help='Refit once per dropped donor instead of the placebo-in-space sweep')
+    sub.add_argument('--processes', type=int, default=1, help='Worker processes for large donor pools')
+    sub.set_defaults(func=cmd_synth)
+
+    sub = subparsers.add_parser('nowcast', help='Reporting-delay corrected counts for recent months (CSV)')
+    sub.add_argument('--output', help='Write to this file instead of stdout')
+    sub.add_argument('--months', type=int, default=12, help='Trailing months to show')
+    sub.add_argument('--max-delay', type=int, default=180, help='Longest reporting delay modelled, in days')
+    sub.add_argument('--min-completeness', type=float, default=0.2,
+                     help='Drop trailing months expected to be less complete than this')
+    sub.add_argument('--delays', action='store_true',
+                     help='Show the delay distribution per country and period instead')
+    sub.set_defaults(func=cmd_nowcast)
+
+    sub = subparsers.add_parser('dedup', help='Near-duplicate events and the merge decisions (CSV)')
+    sub.add_argument('--output', help='Write to this file instead of stdout')
+    sub.add_argument('--distance-km', type=float, default=1.0, help='Largest distance between duplicates')
+    sub.add_argument('--window-days', type=int, default=2, help='Largest gap between observation dates')
+    sub.add_argument('--ignore-locality', action='store_true', help='Do not require matching localities')
+    sub.add_argument('--apply', action='store_true', help='Rewrite the processed files without the duplicates')
+    sub.set_defaults(func=cmd_dedup)
+
+    sub = subparsers.add_parser('sensitivity', help='ITS/DiD effects over a grid of study designs (CSV)')
+    sub.add_argument('--output', help='Write to this file instead of stdout')
+    sub.add_argument('--starts', nargs='+', help='Intervention start dates (default: campaign start +/- 6 months)')
+    sub.add_argument('--windows', nargs='+', type=_window, default=[None, 12, 24],
+                     help="Months either side of the start, or 'full' for the whole series")
+    sub.add_argument('--freqs', nargs='+', default=['week', 'month'], choices=['day', 'week', 'month', 'season'],
+                     help='Series resolutions')
+    sub.add_argument('--controls', nargs='+', default=['all', 'neighbours', 'non_neighbours'],
+                     choices=['all', 'neighbours', 'non_neighbours'], help='Control group definitions')
+    sub.add_argument('--processes', type=int, default=1, help='Worker processes')
+    sub.add_argument('--force', action='store_true', help='Refit cells already in the results database')
+    sub.set_defaults(func=cmd_sensitivity)
+
+    sub = subparsers.add_parser('nearby', help='Outbreaks within a radius of, or nearest to, a point (CSV)')
+    sub.add_argument('--output', help='Write to this file instead of stdout')
+    sub.add_argument('--lat', type=float, required=True, help='Latitude of the point (degrees)')
+    sub.add_argument('--lon', type=float, required=True, help='Longitude of the point (degrees)')
+    sub.add_argument('--radius-km', type=float, default=10.0, help='Search radius in km')
+    sub.add_argument('--start', help='Only outbreaks observed on or after this date')
+    sub.add_argument('--end', help='Only outbreaks observed before this date')
+    sub.add_argument('--k', type=int, help='Return the k nearest outbreaks instead of a radius search')
+    sub.set_defaults(func=cmd_nearby)
+
+    sub = subparsers.add_parser('scan', help='Space-time permutation scan for outbreak clusters (CSV)')
+    sub.add_argument('--output', help='Write to this file instead of stdout')
+    sub.add_argument('--europe', action='store_true', help='Scan France and the control countries together')
+    sub.add_argument('--replicates', type=int, default=999, help='Monte Carlo replicates')
+    sub.add_argument('--time-unit-days', type=int, default=7, help='Length of one time unit in days')
+    sub.add_argument('--max-neighbours', type=int, default=50, help='Most events in a circle')
+    sub.add_argument('--max-radius-km', type=float, default=50.0, help='Largest circle radius in km')
+    sub.add_argument('--max-length', type=int, default=8, help='Longest window in time units')
+    sub.add_argument('--min-cases', type=int, default=2, help='Fewest events in a reported cluster')
+    sub.add_argument('--seed', type=int, default=0, help='Random seed')
+    sub.add_argument('--processes', type=int, default=1, help='Worker processes for the replicates')
+    sub.set_defaults(func=cmd_scan)
+
+    sub = subparsers.add_parser('figures', help='Render the trend figures')
+    sub.add_argument('--processes', type=int, help='Worker processes (1 renders serially)')
+    sub.set_defaults(func=cmd_figures)
+
+    sub = subparsers.add_parser('pipeline', help='Run the cached analysis pipeline')
+    sub.add_argument('stages', nargs='*', help='Stages to bring up to date (default: all)')
+    sub.add_argument('--force', action='store_true', help='Rerun stages even if up to date')
+    sub.add_argument('--dry-run', action='store_true', help='Only report which stages would run')
+    sub.set_defaults(func=cmd_pipeline)
+    return parser
+
+
+def report_timings(command, imports_done, finished, log_file=None):
+    """
+    Print import/run time and heavy-library usage to stderr, optionally
+    appending the same record to a JSON-lines log.
+    """
+    record = {
+        'command': command,
+        'import_seconds': round(imports_done - _START, 4),
+        'run_seconds': round(finished - imports_done, 4),
+        'loaded': [m for m in HEAVY_MODULES if m in sys.modules],
+    }
+    print(f"\n[timings] {command}: imports {record['import_seconds']:.3f}s, "
+          f"run {record['run_seconds']:.3f}s, "
+          f"heavy modules loaded: {', '.join(record['loaded']) or 'none'}", file=sys.stderr)
+    if log_file:
+        with open(log_file, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+def _monthly_only_option(args):
+    """
+    The option in args whose series are always monthly (the cube, the
+    region frame or the period accumulators), if any.
+    """
+    if args.command == 'stats' and args.streaming:
+        return 'stats --streaming'
+    if args.command == 'its' and args.leave_one_out:
+        return 'its --leave-one-out'
+    if args.command == 'its' and args.by:
+        return 'its --by'
+    return None
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    monthly_only = _monthly_only_option(args)
+    if monthly_only and args.freq != 'month':
+        parser.error(f"{monthly_only} only works on monthly series, not --freq {args.freq}")
+    imports_done = None
+    try:
+        for module in COMMAND_IMPORTS[args.command]:
+            importlib.import_module(module)
+        imports_done = time.perf_counter()
+        args.func(args)
+    except Exception as e:
+        print(f"\nAn error occurred: {str(e)}", file=sys.stderr)
+        return 1
+    finally:
+        if (args.timings or args.timings_log) and imports_done is not None:
+            report_timings(args.command, imports_done, time.perf_counter(), args.timings_log)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
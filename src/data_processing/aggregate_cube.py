@@ -0,0 +1,155 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.outbreak_cache import CACHE_DIR, content_hash, file_fingerprint, read_events
+
+# Define paths relative to project root
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PROCESSED_DIR = os.path.join(PROJECT_ROOT, 'data', 'processed')
+EVENT_FILES = [
+    os.path.join(PROCESSED_DIR, 'france_hpai_outbreaks.csv'),
+    os.path.join(PROCESSED_DIR, 'europe_control_group.csv'),
+]
+CUBE_FILE = os.path.join(CACHE_DIR, 'monthly_outbreak_cube.csv')
+
+CUBE_KEYS = ['Country', 'species_group', 'serotype', 'month']
+
+
+def species_group(species):
+    """
+    Bird group of a WAHIS species string, e.g. 'Domestic,Duck,' -> 'Duck'.
+    Mixed reports are grouped under the first species listed.
+    """
+    tokens = [t.strip() for t in str(species).split(',') if t.strip()]
+    if not tokens:
+        return 'Unknown'
+    return tokens[1] if len(tokens) > 1 else tokens[0]
+
+
+def serotype_label(serotype):
+    """
+    Clean WAHIS serotype list, e.g. ';H5N1 HPAI;' -> 'H5N1 HPAI'.
+    """
+    return ','.join(s for s in str(serotype).split(';') if s) or 'Unknown'
+
+
+def _map_values(series, func):
+    # categoricals only need the mapping applied once per category
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # code -1 (missing) picks up the trailing 'Unknown'
+        mapped = np.array([func(c) for c in series.cat.categories] + ['Unknown'], dtype=object)
+        return pd.Series(mapped[series.cat.codes.to_numpy()], index=series.index)
+    return series.map(func)
+
+
+def build_cube(events):
+    """
+    Aggregate outbreak events into monthly counts keyed by country,
+    species group, serotype and observation month ('YYYY-MM').
+    """
+    events = events.dropna(subset=['observation date'])
+    keys = pd.DataFrame({
+        'Country': events['Country'].astype(str),
+        'species_group': _map_values(events['Species'], species_group),
+        'serotype': _map_values(events['Serotype'], serotype_label),
+        'month': events['observation date'].dt.strftime('%Y-%m'),
+    })
+    cube = keys.groupby(CUBE_KEYS).size().reset_index(name='outbreak_count')
+    return cube.sort_values(['month'] + CUBE_KEYS[:-1]).reset_index(drop=True)
+
+
+def _sources_state(event_files):
+    return [{'file': os.path.abspath(f), 'fingerprint': file_fingerprint(f)} for f in event_files]
+
+
+def ensure_cube(event_files=None, cube_file=CUBE_FILE):
+    """
+    Load the persisted cube, rebuilding it from the processed event files
+    only when one of them has changed since the cube was written.
+    """
+    event_files = event_files or EVENT_FILES
+    meta_file = os.path.splitext(cube_file)[0] + '.meta.json'
+
+    if os.path.exists(cube_file) and os.path.exists(meta_file):
+        with open(meta_file) as f:
+            meta = json.load(f)
+        state = _sources_state(event_files)
+        if state == meta['sources']:
+            return load_cube(cube_file)
+        # fingerprints moved; fall back to comparing content
+        hashes = [content_hash(f) for f in event_files]
+        if hashes == meta['content_hashes']:
+            meta['sources'] = state
+            with open(meta_file, 'w') as f:
+                json.dump(meta, f, indent=4)
+            return load_cube(cube_file)
+
+    print("Building monthly aggregate cube...")
+    events = pd.concat([read_events(f, columns=['Country', 'Species', 'Serotype', 'observation date'])
+                        for f in event_files], ignore_index=True)
+    cube = build_cube(events)
+
+    os.makedirs(os.path.dirname(cube_file), exist_ok=True)
+    cube.to_csv(cube_file, index=False)
+    with open(meta_file, 'w') as f:
+        json.dump({'sources': _sources_state(event_files),
+                   'content_hashes': [content_hash(f) for f in event_files]}, f, indent=4)
+    print(f"Saved {len(cube)} cube cells to: {cube_file}")
+    return cube
+
+
+def load_cube(cube_file=CUBE_FILE):
+    """
+    Read a persisted cube.
+    """
+    return pd.read_csv(cube_file, dtype={'Country': 'category', 'species_group': 'category',
+                                         'serotype': 'category', 'month': str,
+                                         'outbreak_count': 'int32'})
+
+
+def cube_monthly_series(cube, countries=None, exclude_countries=None,
+                        species_groups=None, serotypes=None):
+    """
+    Monthly outbreak counts for a slice of the cube.
+
+    Returns a UTC month-end indexed Series with zero-filled gaps, i.e. the
+    same result as ``events.set_index('observation date').resample('ME').size()``
+    on the matching events.
+    """
+    mask = pd.Series(True, index=cube.index)
+    if countries is not None:
+        mask &= cube['Country'].isin(countries)
+    if exclude_countries is not None:
+        mask &= ~cube['Country'].isin(exclude_countries)
+    if species_groups is not None:
+        mask &= cube['species_group'].isin(species_groups)
+    if serotypes is not None:
+        mask &= cube['serotype'].isin(serotypes)
+
+    counts = cube[mask].groupby('month')['outbreak_count'].sum()
+    if counts.empty:
+        return pd.Series(dtype='int64', index=pd.DatetimeIndex([], tz='UTC', freq='ME'))
+
+    months = pd.PeriodIndex(counts.index, freq='M')
+    counts.index = months.to_timestamp(how='end').normalize().tz_localize('UTC')
+    full_range = pd.date_range(counts.index.min(), counts.index.max(), freq='ME', tz='UTC')
+    return counts.reindex(full_range, fill_value=0).astype('int64').rename(None)
+
+
+if __name__ == "__main__":
+    try:
+        cube = ensure_cube()
+        print(f"\nCube cells: {len(cube)}")
+        print(f"Countries: {cube['Country'].nunique()}")
+        print(f"Species groups: {', '.join(sorted(cube['species_group'].unique()))}")
+        print(f"Months: {cube['month'].min()} to {cube['month'].max()}")
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+        print(f"\nDebug information:")
+        print(f"Current working directory: {os.getcwd()}")
+        for f in EVENT_FILES:
+            print(f"{os.path.basename(f)} exists?: {os.path.exists(f)}")
@@ -0,0 +1,180 @@
+import pandas as pd
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.outbreak_cache import CACHE_DIR, content_hash, file_fingerprint, read_events
+from data_processing.aggregate_cube import (EVENT_FILES, _map_values, cube_monthly_series,
+                                            ensure_cube, serotype_label, species_group)
+
+PYRAMID_DIR = os.path.join(CACHE_DIR, 'outbreak_pyramid')
+PYRAMID_KEYS = ['Country', 'species_group', 'serotype', 'period']
+
+# level -> pandas frequency of the zero-filled series index
+LEVELS = {
+    'day': 'D',
+    'week': 'W-MON',      # ISO weeks, labelled by their Monday
+    'month': 'ME',        # month end, as in cube_monthly_series
+    'season': 'YS-OCT',   # epidemiological season October-September, labelled 1 October
+}
+FREQ_ALIASES = {'D': 'day', 'W': 'week', 'M': 'month', 'ME': 'month', 'season': 'season'}
+# the month level is kept in the cube's 'YYYY-MM' format
+LABEL_FORMATS = {'day': '%Y-%m-%d', 'week': '%Y-%m-%d', 'month': '%Y-%m', 'season': '%Y-%m-%d'}
+
+
+def resolve_level(freq):
+    """
+    Pyramid level for a frequency name ('day', 'week', 'month', 'season')
+    or pandas-style alias ('D', 'W', 'M', 'ME').
+    """
+    level = FREQ_ALIASES.get(freq, freq)
+    if level not in LEVELS:
+        raise ValueError(f"Unknown frequency {freq}; expected one of {list(LEVELS)}")
+    return level
+
+
+def period_starts(days, level):
+    """
+    Timestamp labelling the period of the given level that contains each day.
+    """
+    if level == 'day':
+        return days
+    if level == 'week':
+        return days - pd.to_timedelta(days.dt.dayofweek, unit='D')
+    if level == 'month':
+        return days.dt.to_period('M').dt.to_timestamp(how='end').dt.normalize()
+    season_year = days.dt.year - (days.dt.month < 10).astype(int)
+    return pd.to_datetime(season_year.astype(str) + '-10-01')
+
+
+def build_pyramid(events):
+    """
+    Aggregate events into daily counts keyed by country, species group and
+    serotype in one pass, then roll the daily table up to ISO weeks, months
+    and October-September seasons. Returns {level: counts frame}.
+    """
+    events = events.dropna(subset=['observation date'])
+    keys = pd.DataFrame({
+        'Country': events['Country'].astype(str),
+        'species_group': _map_values(events['Species'], species_group),
+        'serotype': _map_values(events['Serotype'], serotype_label),
+        'day': events['observation date'].dt.tz_convert('UTC').dt.tz_localize(None).dt.normalize(),
+    })
+    daily = keys.groupby(PYRAMID_KEYS[:-1] + ['day']).size().reset_index(name='outbreak_count')
+
+    # labels are computed once per distinct day and mapped onto the daily rows
+    days = pd.Series(daily['day'].unique())
+    pyramid = {}
+    for level in LEVELS:
+        labels = period_starts(days, level).dt.strftime(LABEL_FORMATS[level])
+        period = daily['day'].map(pd.Series(labels.to_numpy(), index=days.to_numpy()))
+        counts = (daily.assign(period=period)
+                       .groupby(PYRAMID_KEYS)['outbreak_count'].sum()
+                       .reset_index())
+        pyramid[level] = counts.sort_values(['period'] + PYRAMID_KEYS[:-1]).reset_index(drop=True)
+    return pyramid
+
+
+def _sources_state(event_files):
+    return [{'file': os.path.abspath(f), 'fingerprint': file_fingerprint(f)} for f in event_files]
+
+
+def _level_file(pyramid_dir, level):
+    return os.path.join(pyramid_dir, f'{level}.csv')
+
+
+def ensure_pyramid(event_files=None, pyramid_dir=PYRAMID_DIR):
+    """
+    Make sure the persisted pyramid reflects the processed event files,
+    rebuilding every level in one pass over the events when one changed.
+    """
+    event_files = event_files or EVENT_FILES
+    meta_file = os.path.join(pyramid_dir, 'meta.json')
+
+    if os.path.exists(meta_file) and all(os.path.exists(_level_file(pyramid_dir, l)) for l in LEVELS):
+        with open(meta_file) as f:
+            meta = json.load(f)
+        state = _sources_state(event_files)
+        if state == meta['sources']:
+            return pyramid_dir
+        hashes = [content_hash(f) for f in event_files]
+        if hashes == meta['content_hashes']:
+            meta['sources'] = state
+            with open(meta_file, 'w') as f:
+                json.dump(meta, f, indent=4)
+            return pyramid_dir
+
+    print("Building multi-resolution aggregate pyramid...")
+    events = pd.concat([read_events(f, columns=['Country', 'Species', 'Serotype', 'observation date'])
+                        for f in event_files], ignore_index=True)
+    pyramid = build_pyramid(events)
+
+    os.makedirs(pyramid_dir, exist_ok=True)
+    for level, counts in pyramid.items():
+        counts.to_csv(_level_file(pyramid_dir, level), index=False)
+    with open(meta_file, 'w') as f:
+        json.dump({'sources': _sources_state(event_files),
+                   'content_hashes': [content_hash(f) for f in event_files],
+                   'cells': {level: len(counts) for level, counts in pyramid.items()}}, f, indent=4)
+    print(f"Saved pyramid levels ({', '.join(LEVELS)}) to: {pyramid_dir}")
+    return pyramid_dir
+
+
+def load_level(freq, event_files=None, pyramid_dir=PYRAMID_DIR):
+    """
+    Counts at one resolution, reading only that level of the pyramid.
+    """
+    level = resolve_level(freq)
+    ensure_pyramid(event_files, pyramid_dir)
+    counts = pd.read_csv(_level_file(pyramid_dir, level),
+                         dtype={'Country': 'category', 'species_group': 'category',
+                                'serotype': 'category', 'period': str, 'outbreak_count': 'int32'})
+    counts.attrs['level'] = level
+    return counts
+
+
+def level_series(counts, countries=None, exclude_countries=None,
+                 species_groups=None, serotypes=None):
+    """
+    Outbreak counts for a slice of one pyramid level as a zero-filled UTC
+    series at that level's frequency. At the month level this is the same
+    series as cube_monthly_series.
+    """
+    level = counts.attrs['level']
+    mask = pd.Series(True, index=counts.index)
+    if countries is not None:
+        mask &= counts['Country'].isin(countries)
+    if exclude_countries is not None:
+        mask &= ~counts['Country'].isin(exclude_countries)
+    if species_groups is not None:
+        mask &= counts['species_group'].isin(species_groups)
+    if serotypes is not None:
+        mask &= counts['serotype'].isin(serotypes)
+
+    series = counts[mask].groupby('period')['outbreak_count'].sum()
+    if series.empty:
+        return pd.Series(dtype='int64', index=pd.DatetimeIndex([], tz='UTC', freq=LEVELS[level]))
+
+    if level == 'month':
+        index = pd.PeriodIndex(series.index, freq='M').to_timestamp(how='end').normalize()
+    else:
+        index = pd.to_datetime(series.index)
+    series.index = index.tz_localize('UTC')
+    full_range = pd.date_range(series.index.min(), series.index.max(), freq=LEVELS[level], tz='UTC')
+    return series.reindex(full_range, fill_value=0).astype('int64').rename(None)
+
+
+def treated_and_control_series(event_files, freq='month', treated='France'):
+    """
+    Treated-country and pooled control series at the requested resolution.
+    Monthly series come from the monthly cube, other resolutions from the
+    pyramid; either way nothing is re-aggregated from the events.
+    """
+    if resolve_level(freq) == 'month':
+        cube = ensure_cube(event_files)
+        return (cube_monthly_series(cube, countries=[treated]),
+                cube_monthly_series(cube, exclude_countries=[treated]))
+    counts = load_level(freq, event_files)
+    return (level_series(counts, countries=[treated]),
+            level_series(counts, exclude_countries=[treated]))
@@ -0,0 +1,160 @@
+import numpy as np
+import pandas as pd
+import os
+import sys
+from itertools import product
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.spatial_index import haversine_km, km_to_chord, unit_vectors
+
+DISTANCE_KM = 1.0
+WINDOW_DAYS = 2
+
+
+def normalise_locality(locality):
+    return locality.astype(str).str.upper().str.replace(r'[^0-9A-Z]+', ' ', regex=True).str.strip()
+
+
+def candidate_pairs(latitude, longitude, days, distance_km=DISTANCE_KM, window_days=WINDOW_DAYS):
+    """
+    Positions (i, j), i < j, of every pair of points that may lie within
+    distance_km and window_days of each other, without comparing all pairs.
+
+    Points are hashed to cells of a grid over their unit vectors (cell side
+    = chord of distance_km) and over time (cell length = window_days + 1),
+    so any qualifying pair is in the same or an adjacent cell. Each cell
+    is packed into one int64 key; after a single sort, every neighbouring
+    offset is a vectorized searchsorted probe of the sorted keys. days
+    must be sorted, so only the current and next time cell need probing.
+    """
+    days = np.asarray(days, dtype=np.int64)
+    if len(days) > 1 and np.any(np.diff(days) < 0):
+        raise ValueError("days must be sorted")
+    if len(days) == 0:
+        return np.empty((0, 2), dtype=np.intp)
+
+    cells = np.column_stack([np.floor(unit_vectors(latitude, longitude) / km_to_chord(distance_km)),
+                             days // (window_days + 1)]).astype(np.int64)
+    # pad each axis by one cell so neighbouring offsets never wrap into another row
+    cells -= cells.min(axis=0) - 1
+    sizes = cells.max(axis=0) + 2
+    if np.prod(sizes.astype(float)) >= 2 ** 63:
+        raise ValueError("Grid too fine to pack into 64-bit keys; increase distance_km or window_days")
+    strides = np.concatenate([np.cumprod(sizes[:0:-1])[::-1], [1]])
+    keys = cells @ strides
+
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    pairs = []
+    for offset in product((-1, 0, 1), (-1, 0, 1), (-1, 0, 1), (0, 1)):
+        # shifted sorted keys are still sorted, which keeps the probes cache-friendly
+        probe = sorted_keys + np.dot(offset, strides)
+        lo = np.searchsorted(sorted_keys, probe, side='left')
+        counts = np.searchsorted(sorted_keys, probe, side='right') - lo
+        i = np.repeat(order, counts)
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        j = order[np.repeat(lo, counts) + within]
+        keep = i < j
+        pairs.append(np.column_stack([i[keep], j[keep]]))
+    return np.concatenate(pairs)
+
+
+def _components(n, i, j):
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    graph = coo_matrix((np.ones(len(i), dtype=np.int8), (i, j)), shape=(n, n))
+    return connected_components(graph, directed=False)[1]
+
+
+def find_duplicates(events, distance_km=DISTANCE_KM, window_days=WINDOW_DAYS, match_locality=True):
+    """
+    Near-duplicate events: same country (and normalised locality when
+    match_locality), coordinates within distance_km and observation dates
+    within window_days, under different Event IDs. Matches are merged
+    transitively; each group keeps the first-reported event (lowest Event
+    ID on ties).
+
+    Returns a DataFrame with one row per dropped event describing the
+    merge decision, including the dropped event's index label in events
+    ('row'); events without coordinates or an observation date are never
+    merged.
+    """
+    usable = events.dropna(subset=['latitude', 'longitude', 'observation date'])
+    usable = usable.sort_values('observation date', kind='stable')
+    observed = usable['observation date'].dt.tz_convert('UTC')
+    days = ((observed - pd.Timestamp('1970-01-01', tz='UTC')) // pd.Timedelta(days=1)).to_numpy()
+    lat, lon = usable['latitude'].to_numpy(dtype=float), usable['longitude'].to_numpy(dtype=float)
+
+    pairs = candidate_pairs(lat, lon, days, distance_km, window_days)
+    i, j = pairs[:, 0], pairs[:, 1]
+    distance = haversine_km(lat[i], lon[i], lat[j], lon[j])
+    match = (distance <= distance_km) & (np.abs(days[j] - days[i]) <= window_days)
+    country = usable['Country'].astype(str).to_numpy()
+    match &= country[i] == country[j]
+    if match_locality:
+        locality = normalise_locality(usable['Locality']).to_numpy()
+        match &= (locality[i] == locality[j]) & usable['Locality'].notna().to_numpy()[i]
+    i, j = i[match], j[match]
+    if not len(i):
+        return pd.DataFrame(columns=['row', 'cluster', 'kept_event_id', 'dropped_event_id', 'Country',
+                                     'Locality', 'distance_km', 'days_apart', 'kept_species',
+                                     'dropped_species', 'cluster_size'])
+
+    labels = _components(len(usable), i, j)
+    in_cluster = np.zeros(len(usable), dtype=bool)
+    in_cluster[i] = in_cluster[j] = True
+
+    members = usable.iloc[np.flatnonzero(in_cluster)].assign(
+        cluster=labels[in_cluster], day=days[in_cluster])
+    order = ['cluster', 'report date', 'Event ID'] if 'report date' in members else ['cluster', 'Event ID']
+    members = members.sort_values(order, kind='stable', na_position='last')
+    first = members.groupby('cluster').head(1)
+    dropped = members.drop(index=first.index)
+    keeper = first.set_index('cluster').loc[dropped['cluster']]
+
+    report = pd.DataFrame({
+        'row': dropped.index.to_numpy(),
+        'cluster': dropped['cluster'].to_numpy(),
+        'kept_event_id': keeper['Event ID'].to_numpy(),
+        'dropped_event_id': dropped['Event ID'].to_numpy(),
+        'Country': dropped['Country'].astype(str).to_numpy(),
+        'Locality': dropped['Locality'].to_numpy(),
+        'distance_km': haversine_km(keeper['latitude'], keeper['longitude'],
+                                    dropped['latitude'], dropped['longitude']),
+        'days_apart': np.abs(dropped['day'].to_numpy() - keeper['day'].to_numpy()),
+        'kept_species': keeper['Species'].to_numpy() if 'Species' in events else None,
+        'dropped_species': dropped['Species'].to_numpy() if 'Species' in events else None,
+        'cluster_size': dropped.groupby('cluster')['cluster'].transform('size').to_numpy() + 1,
+    })
+    return report.sort_values(['cluster', 'dropped_event_id'], kind='stable').reset_index(drop=True)
+
+
+def deduplicate_events(events, **kwargs):
+    """
+    Drop near-duplicate events (see find_duplicates). Returns the
+    deduplicated frame, in the original order, and the merge decisions.
+    """
+    events = events.reset_index(drop=True)
+    decisions = find_duplicates(events, **kwargs)
+    return events.drop(index=decisions['row']).reset_index(drop=True), decisions
+
+
+def duplicates_report_path(event_file):
+    """
+    Where the merge decisions for a processed event file are written.
+    """
+    return os.path.splitext(event_file)[0] + '_duplicates.csv'
+
+
+def drop_duplicates_with_report(events, event_file, **kwargs):
+    """
+    Deduplicate events bound for event_file and save the merge decisions
+    next to it.
+    """
+    events, decisions = deduplicate_events(events, **kwargs)
+    report_file = duplicates_report_path(event_file)
+    os.makedirs(os.path.dirname(report_file), exist_ok=True)
+    decisions.drop(columns='row').to_csv(report_file, index=False)
+    print(f"Dropped {len(decisions)} near-duplicate events; decisions saved to: {report_file}")
+    return events
@@ -0,0 +1,129 @@
+import argparse
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.outbreak_cache import load_outbreaks
+from data_processing.process_control_group import add_analytical_fields
+
+# Define paths relative to project root
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+INPUT_FILE = os.path.join(PROJECT_ROOT, 'data', 'raw', 'europe_hpai_bird_outbreaks.csv')
+OUTPUT_DIR = os.path.join(PROJECT_ROOT, 'data', 'processed')
+
+
+def country_slug(country):
+    """
+    File-name friendly version of a WAHIS country name, e.g.
+    'Moldova, Republic of' -> 'moldova_republic_of'.
+    """
+    return re.sub(r'[^a-z0-9]+', '_', country.lower()).strip('_')
+
+
+def monthly_count_matrix(df):
+    """
+    Outbreak counts per observation month (rows) and country (columns),
+    computed with a single groupby over the whole export.
+    """
+    months = df['observation date'].dt.strftime('%Y-%m')
+    return (df.groupby([months, df['Country']], observed=True).size()
+              .unstack(fill_value=0)
+              .sort_index())
+
+
+def write_monthly_json(monthly_counts, json_output_path):
+    """
+    Write a month -> count series in the format produced by
+    group_and_convert_to_json. Months without outbreaks are omitted.
+    """
+    monthly_counts = monthly_counts[monthly_counts > 0].sort_index()
+    json_data = [{'month': month, 'outbreak_count': int(count)}
+                 for month, count in monthly_counts.items()]
+
+    os.makedirs(os.path.dirname(json_output_path), exist_ok=True)
+    with open(json_output_path, 'w') as f:
+        json.dump(json_data, f, indent=4)
+    return json_data
+
+
+def extract_countries(input_file, output_dir, countries, control_for=None):
+    """
+    Extract several treated countries, and optionally "all except X" control
+    groups, from a single scan of the raw export.
+
+    The export is read once and split into per-country partitions. Each
+    requested country gets ``<country>_hpai_outbreaks.csv`` and its monthly
+    JSON. Each country in ``control_for`` gets
+    ``europe_control_group_excl_<country>.csv`` built from the other
+    partitions, with monthly counts obtained by subtracting that country's
+    column from the pooled total rather than rescanning.
+    """
+    control_for = control_for or []
+
+    print(f"Reading all partitions from cache of: {input_file}")
+    df = load_outbreaks(input_file)
+    partitions = dict(tuple(df.groupby('Country', sort=False, observed=True)))
+
+    missing = [c for c in list(countries) + list(control_for) if c not in partitions]
+    if missing:
+        raise ValueError(f"Countries not present in export: {', '.join(missing)}")
+
+    print("Aggregating monthly counts for all countries...")
+    monthly = monthly_count_matrix(df)
+    pooled_total = monthly.sum(axis=1)
+
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = {}
+
+    for country in countries:
+        slug = country_slug(country)
+        country_df = partitions[country].sort_values('observation date', kind='stable').reset_index(drop=True)
+
+        csv_path = os.path.join(output_dir, f"{slug}_hpai_outbreaks.csv")
+        json_path = os.path.join(output_dir, f"{slug}_hpai_outbreaks_monthly.json")
+        print(f"Saving {country} ({len(country_df)} outbreaks) to: {csv_path}")
+        country_df.to_csv(csv_path, index=False)
+        write_monthly_json(monthly[country], json_path)
+        outputs[country] = {'csv': csv_path, 'json': json_path}
+
+    for country in control_for:
+        slug = country_slug(country)
+        # filtered rather than concatenated from partitions, so same-day
+        # events keep the export's order through the stable sort
+        control_df = df[df['Country'] != country]
+        control_df = control_df.sort_values('observation date', kind='stable')
+        control_df = add_analytical_fields(control_df).reset_index(drop=True)
+
+        csv_path = os.path.join(output_dir, f"europe_control_group_excl_{slug}.csv")
+        json_path = os.path.join(output_dir, f"europe_control_group_excl_{slug}_monthly.json")
+        print(f"Saving control group excluding {country} ({len(control_df)} outbreaks) to: {csv_path}")
+        control_df.to_csv(csv_path, index=False)
+        write_monthly_json(pooled_total - monthly[country], json_path)
+        outputs[f"excl_{country}"] = {'csv': csv_path, 'json': json_path}
+
+    return outputs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Extract several countries from one scan of the raw export.')
+    parser.add_argument('countries', nargs='+', help="Treated countries, e.g. France 'Hungary'")
+    parser.add_argument('--control-for', nargs='*', default=[],
+                        help='Countries to build "all except X" control groups for')
+    parser.add_argument('--input', default=INPUT_FILE, help='Raw export CSV')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help='Directory for processed files')
+    args = parser.parse_args()
+
+    try:
+        outputs = extract_countries(args.input, args.output_dir, args.countries, args.control_for)
+        print(f"\nWrote {len(outputs)} datasets:")
+        for name, paths in outputs.items():
+            print(f"{name}: {paths['csv']}")
+
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+        print(f"\nDebug information:")
+        print(f"Current working directory: {os.getcwd()}")
+        print(f"Input file exists?: {os.path.exists(args.input)}")
+        print(f"Output directory exists?: {os.path.exists(args.output_dir)}")
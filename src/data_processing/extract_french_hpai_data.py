@@ -1,29 +1,36 @@
 import pandas as pd
 from datetime import datetime
 import os
+import sys
 import json
 
-# Define project root and paths - using your actual path structure
-PROJECT_ROOT = "/Users/juliettewilliamson/Desktop/duckduckgoose_code"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.outbreak_cache import load_outbreaks
+from data_processing.deduplicate import drop_duplicates_with_report
+
+# Define paths relative to project root
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 INPUT_FILE = os.path.join(PROJECT_ROOT, 'data', 'raw', 'europe_hpai_bird_outbreaks.csv')
 OUTPUT_CSV = os.path.join(PROJECT_ROOT, 'data', 'processed', 'france_hpai_outbreaks.csv')
 OUTPUT_JSON = os.path.join(PROJECT_ROOT, 'data', 'processed', 'france_hpai_outbreaks_monthly.json')
 
-def extract_french_data(input_file, output_file):
+def extract_french_data(input_file, output_file, deduplicate=False):
     """
     Function to extract and process French HPAI outbreak data from broader European dataset.
+    With deduplicate, near-duplicate events are dropped and the merge
+    decisions written next to the output file.
     """
     if not os.path.exists(input_file):
         raise FileNotFoundError(f"Could not find input file at: {input_file}")
     
-    print(f"Reading data from: {input_file}")
-    df = pd.read_csv(input_file, parse_dates=['observation date', 'report date'])
-    
-    print("Filtering French data...")
-    france_df = df[df['Country'] == 'France'].copy()
+    print(f"Reading French partition from cache of: {input_file}")
+    france_df = load_outbreaks(input_file, countries=['France'])
+    if deduplicate:
+        france_df = drop_duplicates_with_report(france_df, output_file)
     
+    # stable, so events on the same day keep the export's order
     print("Sorting by observation date...")
-    france_df = france_df.sort_values('observation date')
+    france_df = france_df.sort_values('observation date', kind='stable')
     france_df = france_df.reset_index(drop=True)
     
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
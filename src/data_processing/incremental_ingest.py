@@ -0,0 +1,273 @@
+import numpy as np
+import pandas as pd
+from collections import Counter
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.outbreak_cache import read_events, store_events, append_events
+from data_processing.schema import read_outbreak_csv
+from data_processing.period_accumulators import count_changes, load_store, save_store
+
+# Define paths relative to project root
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PROCESSED_DIR = os.path.join(PROJECT_ROOT, 'data', 'processed')
+FRANCE_CSV = os.path.join(PROCESSED_DIR, 'france_hpai_outbreaks.csv')
+FRANCE_JSON = os.path.join(PROCESSED_DIR, 'france_hpai_outbreaks_monthly.json')
+CONTROL_CSV = os.path.join(PROCESSED_DIR, 'europe_control_group.csv')
+CONTROL_JSON = os.path.join(PROCESSED_DIR, 'europe_control_group_monthly.json')
+
+
+def read_delta(delta_file):
+    """
+    Read a file of new or revised WAHIS rows (same layout as the raw export).
+    """
+    if not os.path.exists(delta_file):
+        raise FileNotFoundError(f"Could not find delta file at: {delta_file}")
+    delta = read_outbreak_csv(delta_file)
+    # a later row for the same event supersedes an earlier one
+    return delta.drop_duplicates('Event ID', keep='last').reset_index(drop=True)
+
+
+def _rows_differ(old, new):
+    """
+    Row-wise inequality of two aligned frames, treating NaN == NaN.
+    """
+    # categoricals from different files only compare once decoded
+    old, new = old.astype(object), new.astype(object)
+    differs = (old != new) & ~(old.isna() & new.isna())
+    return differs.any(axis=1).to_numpy()
+
+
+def merge_events(existing, delta, withdrawn_ids=()):
+    """
+    Upsert delta rows into an existing events frame keyed by Event ID and
+    drop the events in withdrawn_ids (revised into the other dataset).
+
+    Superseded rows are removed and the new and changed rows, in delta
+    order, go after the events already recorded on their observation date,
+    as a full extract of the export with the delta appended orders them.
+
+    Returns the merged frame (sorted by observation date), a summary with
+    the new, changed and withdrawn event IDs plus the removed/added rows
+    needed to patch monthly counts and derived columns, and for every
+    merged row its position in existing (-1 for added rows).
+    """
+    raw_columns = [c for c in delta.columns if c in existing.columns]
+    delta = delta[raw_columns].reset_index(drop=True)
+
+    known = delta['Event ID'].isin(existing['Event ID']).to_numpy()
+    candidates = delta[known]
+    compare_columns = [c for c in raw_columns if c != 'Event ID']
+    previous = (existing.drop_duplicates('Event ID', keep='last')
+                        .set_index('Event ID')
+                        .loc[candidates['Event ID'], compare_columns]
+                        .reset_index(drop=True))
+    changed = np.zeros(len(delta), dtype=bool)
+    changed[np.flatnonzero(known)] = _rows_differ(previous, candidates[compare_columns].reset_index(drop=True))
+    added_rows = delta[~known | changed].reset_index(drop=True)
+
+    withdrawn = existing['Event ID'].isin(withdrawn_ids)
+    replaced = existing['Event ID'].isin(delta.loc[changed, 'Event ID']) | withdrawn
+    removed_rows = existing[replaced]
+    kept = np.flatnonzero(~replaced.to_numpy())
+
+    merged = pd.concat([existing.iloc[kept], added_rows], ignore_index=True)
+    merged = merged.sort_values('observation date', kind='stable')
+    source = np.concatenate([kept, np.full(len(added_rows), -1)])[merged.index]
+
+    return merged.reset_index(drop=True), {
+        'new_ids': delta.loc[~known, 'Event ID'].tolist(),
+        'changed_ids': delta.loc[changed, 'Event ID'].tolist(),
+        'withdrawn_ids': existing.loc[withdrawn, 'Event ID'].drop_duplicates().tolist(),
+        'removed_rows': removed_rows,
+        'added_rows': added_rows,
+    }, source
+
+
+def _values_differ(old, new):
+    return ((old != new).fillna(True) & ~(old.isna() & new.isna())).to_numpy(dtype=bool)
+
+
+def refresh_derived_fields(df, added, touched_countries, previous_first):
+    """
+    Update the control group's derived columns after a merge, touching only
+    what the delta can have changed: added rows, rows of touched countries,
+    and days_since_first_outbreak only if the first outbreak moved.
+
+    Returns the frame and a mask of the rows whose derived values changed
+    (always including the added rows).
+    """
+    changed = added.copy()
+    first_outbreak = df['observation date'].min()
+    days_rows = np.ones(len(df), dtype=bool) if first_outbreak != previous_first else added
+    days = (df.loc[days_rows, 'observation date'] - first_outbreak).dt.days.astype('Int32')
+    changed[days_rows] |= _values_differ(df.loc[days_rows, 'days_since_first_outbreak'], days)
+    df['days_since_first_outbreak'] = df['days_since_first_outbreak'].astype('Int32')
+    df.loc[days_rows, 'days_since_first_outbreak'] = days
+
+    df['month_year'] = df['month_year'].astype(object)
+    df.loc[added, 'month_year'] = df.loc[added, 'observation date'].dt.strftime('%Y-%m')
+
+    countries = df['Country'].astype(str)
+    touched = countries.isin(touched_countries).to_numpy()
+    totals = countries[touched].map(countries[touched].value_counts()).astype('Int32')
+    changed[touched] |= _values_differ(df.loc[touched, 'country_total_outbreaks'], totals)
+    df['country_total_outbreaks'] = df['country_total_outbreaks'].astype('Int32')
+    df.loc[touched, 'country_total_outbreaks'] = totals
+    return df, changed
+
+
+def spliced_csv(csv_path, n_existing, merged, source, reformat):
+    """
+    CSV text of merged that copies the existing file's line for every row
+    taken unchanged from it and formats only the rows in reformat (and the
+    added ones). Returns None when the file's lines do not map one to one
+    onto its n_existing rows (e.g. quoted line breaks).
+    """
+    with open(csv_path, newline='') as f:
+        lines = f.read().split(os.linesep)
+    # header, one line per row and the empty string after the last line break
+    if len(lines) != n_existing + 2 or lines[-1]:
+        return None
+
+    reformat = reformat | (source < 0)
+    rows = np.flatnonzero(reformat)
+    formatted = merged.iloc[rows].to_csv(index=False, header=False,
+                                         lineterminator=os.linesep).split(os.linesep)[:-1]
+    if len(formatted) != len(rows):
+        return None
+
+    body = np.asarray(lines, dtype=object)[np.where(reformat, 0, source + 1)]
+    body[rows] = formatted
+    return os.linesep.join([lines[0], *body, ''])
+
+
+def update_monthly_json(json_output_path, removed_rows, added_rows):
+    """
+    Patch the monthly JSON counts in place for the months the delta touched.
+    """
+    counts = Counter()
+    if os.path.exists(json_output_path):
+        with open(json_output_path) as f:
+            counts.update({r['month']: r['outbreak_count'] for r in json.load(f)})
+
+    removed = removed_rows['observation date'].dropna().dt.strftime('%Y-%m').value_counts()
+    added = added_rows['observation date'].dropna().dt.strftime('%Y-%m').value_counts()
+    for month, n in removed.items():
+        counts[month] -= int(n)
+    for month, n in added.items():
+        counts[month] += int(n)
+
+    json_data = [{'month': month, 'outbreak_count': int(count)}
+                 for month, count in sorted(counts.items()) if count > 0]
+    with open(json_output_path, 'w') as f:
+        json.dump(json_data, f, indent=4)
+
+    return sorted(set(removed.index) | set(added.index))
+
+
+def incremental_update_dataset(delta, csv_path, json_path, analytical_fields=False, withdrawn_ids=()):
+    """
+    Merge a delta into one processed dataset and its monthly JSON, and drop
+    the events in withdrawn_ids, whose latest version belongs to the other
+    dataset.
+
+    New events that all fall after the current last observation are appended
+    to the CSV (and to its columnar cache) without rewriting it. Otherwise
+    the CSV is spliced: rows whose values did not change keep their existing
+    text and only new, revised and re-derived rows are formatted.
+    """
+    unchanged = {'new_ids': [], 'changed_ids': [], 'withdrawn_ids': [], 'months': [], 'count_changes': {}}
+    existing = read_events(csv_path)
+    if delta.empty and not existing['Event ID'].isin(withdrawn_ids).any():
+        return unchanged
+    previous_first = existing['observation date'].min()
+    previous_last = existing['observation date'].max()
+
+    merged, summary, source = merge_events(existing, delta, withdrawn_ids)
+    if not summary['new_ids'] and not summary['changed_ids'] and not summary['withdrawn_ids']:
+        return unchanged
+
+    added_rows = summary['added_rows']
+    append_only = (not summary['changed_ids'] and not summary['withdrawn_ids'] and not analytical_fields
+                   and pd.notna(existing['observation date'].iloc[-1])
+                   and added_rows['observation date'].notna().all()
+                   and (added_rows['observation date'] >= previous_last).all())
+
+    if append_only:
+        print(f"Appending {len(added_rows)} new events to: {csv_path}")
+        append_events(added_rows.sort_values('observation date', kind='stable')[existing.columns],
+                      csv_path)
+    else:
+        reformat = source < 0
+        if analytical_fields:
+            touched_countries = (set(added_rows['Country'].astype(str))
+                                 | set(summary['removed_rows']['Country'].astype(str)))
+            merged, reformat = refresh_derived_fields(merged, reformat, touched_countries, previous_first)
+        merged = merged[existing.columns]
+        text = spliced_csv(csv_path, len(existing), merged, source, reformat)
+        print(f"Rewriting {csv_path} with {len(summary['new_ids'])} new, "
+              f"{len(summary['changed_ids'])} changed and {len(summary['withdrawn_ids'])} withdrawn events "
+              f"({reformat.sum()} of {len(merged)} rows reformatted)")
+        store_events(merged, csv_path, text=text)
+
+    months = update_monthly_json(json_path, summary['removed_rows'], added_rows)
+    return {'new_ids': summary['new_ids'], 'changed_ids': summary['changed_ids'],
+            'withdrawn_ids': summary['withdrawn_ids'], 'months': months,
+            'count_changes': count_changes(summary['removed_rows'], added_rows)}
+
+
+def incremental_update(delta_file, treated_country='France',
+                       france_csv=FRANCE_CSV, france_json=FRANCE_JSON,
+                       control_csv=CONTROL_CSV, control_json=CONTROL_JSON):
+    """
+    Apply a delta export to both the treated-country and control group
+    datasets, leaving untouched outputs as they are. Events are upserted
+    by Event ID against both files, so a revision that moves an event into
+    or out of the treated country also removes it from the file it left.
+    """
+    delta = read_delta(delta_file)
+    treated = (delta['Country'].astype(str) == treated_country).to_numpy()
+    # period accumulators that match the files before this delta are patched
+    # in place; stale or missing ones are rebuilt on their next use
+    event_files = [france_csv, control_csv]
+    store = load_store(event_files)
+
+    print(f"Delta contains {len(delta)} events ({treated.sum()} for {treated_country})")
+    results = {
+        'treated': incremental_update_dataset(delta[treated], france_csv, france_json,
+                                              withdrawn_ids=delta.loc[~treated, 'Event ID']),
+        'control': incremental_update_dataset(delta[~treated], control_csv, control_json,
+                                              analytical_fields=True,
+                                              withdrawn_ids=delta.loc[treated, 'Event ID']),
+    }
+    if store is not None:
+        for result in results.values():
+            store.apply(result['count_changes'])
+        save_store(store, event_files)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Merge new WAHIS rows into the processed datasets.')
+    parser.add_argument('delta_file', help='CSV of new or revised rows in raw export layout')
+    args = parser.parse_args()
+
+    try:
+        results = incremental_update(args.delta_file)
+        for name, result in results.items():
+            print(f"\n{name.title()} dataset:")
+            print(f"New events: {len(result['new_ids'])}")
+            print(f"Changed events: {len(result['changed_ids'])}")
+            print(f"Withdrawn events: {len(result['withdrawn_ids'])}")
+            print(f"Months updated: {', '.join(result['months']) or 'none'}")
+
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+        print(f"\nDebug information:")
+        print(f"Current working directory: {os.getcwd()}")
+        print(f"Delta file exists?: {os.path.exists(args.delta_file)}")
+        print(f"Processed directory exists?: {os.path.exists(PROCESSED_DIR)}")
@@ -0,0 +1,301 @@
+import pandas as pd
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    HAVE_PYARROW = True
+except ImportError:  # fall back to plain CSV parsing
+    HAVE_PYARROW = False
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.schema import SCHEMA_SIGNATURE, read_outbreak_csv, apply_schema
+
+# Define paths relative to project root
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+RAW_FILE = os.path.join(PROJECT_ROOT, 'data', 'raw', 'europe_hpai_bird_outbreaks.csv')
+# HPAI_CACHE_DIR moves every cache (columnar, cube, pyramid, pipeline state)
+# elsewhere, e.g. so benchmarks on synthetic data leave the real caches alone
+CACHE_DIR = os.environ.get('HPAI_CACHE_DIR') or os.path.join(PROJECT_ROOT, 'data', 'cache')
+
+MANIFEST_NAME = 'manifest.json'
+# source row number, kept in partitioned caches so rows read back from
+# several partitions come out in the export's order
+ROW_COLUMN = '__row'
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_fingerprint(path):
+    """
+    Cheap change detector for a file: its size and modification time.
+    """
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def content_hash(path):
+    """
+    SHA-256 of a file's contents, read in fixed-size blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path_for(source_file, cache_dir=None):
+    """
+    Location of the columnar cache built from a given CSV file.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    name = os.path.splitext(os.path.basename(source_file))[0]
+    # keep same-named files from different directories apart
+    location = hashlib.sha1(os.path.dirname(os.path.abspath(source_file)).encode()).hexdigest()[:8]
+    return os.path.join(cache_dir, f"{name}-{location}")
+
+
+def _read_manifest(cache_path):
+    manifest_file = os.path.join(cache_path, MANIFEST_NAME)
+    if not os.path.exists(manifest_file):
+        return None
+    with open(manifest_file) as f:
+        return json.load(f)
+
+
+def _write_manifest(cache_path, manifest):
+    with open(os.path.join(cache_path, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=4)
+
+
+def is_cache_valid(source_file, cache_path):
+    """
+    Check whether the cache still reflects the source file.
+
+    The size/mtime fingerprint is checked first; the content hash is only
+    computed when the fingerprint changed (e.g. the file was touched or
+    copied), in which case a matching hash refreshes the stored fingerprint.
+    """
+    manifest = _read_manifest(cache_path)
+    if manifest is None or manifest.get('schema') != SCHEMA_SIGNATURE:
+        return False
+    if manifest.get('partition_col') and manifest.get('row_column') != ROW_COLUMN:
+        return False
+
+    fingerprint = file_fingerprint(source_file)
+    if fingerprint == manifest.get('fingerprint'):
+        return True
+
+    if content_hash(source_file) != manifest.get('content_hash'):
+        return False
+
+    manifest['fingerprint'] = fingerprint
+    _write_manifest(cache_path, manifest)
+    return True
+
+
+def build_cache(source_file, cache_path, partition_col=None):
+    """
+    Parse a CSV export once and store it as Parquet, optionally partitioned
+    by a column (one directory per country for the raw WAHIS export).
+    """
+    if not os.path.exists(source_file):
+        raise FileNotFoundError(f"Could not find input file at: {source_file}")
+
+    print(f"Building columnar cache for: {source_file}")
+    df = read_outbreak_csv(source_file)
+
+    if os.path.exists(cache_path):
+        shutil.rmtree(cache_path)
+    os.makedirs(cache_path)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if partition_col:
+        table = table.append_column(ROW_COLUMN, pa.array(range(len(df)), type=pa.int64()))
+        pq.write_to_dataset(table, cache_path, partition_cols=[partition_col])
+    else:
+        pq.write_table(table, os.path.join(cache_path, 'part-00000.parquet'))
+
+    _write_manifest(cache_path, {
+        'source': os.path.abspath(source_file),
+        'fingerprint': file_fingerprint(source_file),
+        'content_hash': content_hash(source_file),
+        'columns': list(df.columns),
+        'partition_col': partition_col,
+        'row_column': ROW_COLUMN if partition_col else None,
+        'rows': len(df),
+        'schema': SCHEMA_SIGNATURE,
+    })
+    print(f"Cached {len(df)} rows to: {cache_path}")
+    return df
+
+
+def _ensure_cache(source_file, cache_dir=None, partition_col=None):
+    cache_path = cache_path_for(source_file, cache_dir)
+    if not is_cache_valid(source_file, cache_path):
+        build_cache(source_file, cache_path, partition_col=partition_col)
+    return cache_path
+
+
+def _read_cache(cache_path, filter_expr=None, columns=None):
+    manifest = _read_manifest(cache_path)
+    partition_col = manifest.get('partition_col')
+    dataset = ds.dataset(cache_path, format='parquet',
+                         partitioning='hive' if partition_col else None,
+                         exclude_invalid_files=True)
+    if partition_col and columns is not None:
+        columns = list(columns) + [ROW_COLUMN]
+    table = dataset.to_table(filter=filter_expr, columns=columns)
+    if partition_col:
+        table = table.sort_by(ROW_COLUMN)
+    df = table.to_pandas()
+
+    # partition columns come back as plain strings and at the end
+    if partition_col and partition_col in df.columns:
+        df[partition_col] = df[partition_col].astype('category')
+    ordered = [c for c in manifest['columns'] if c in df.columns]
+    return df[ordered]
+
+
+def load_outbreaks(input_file=RAW_FILE, countries=None, exclude_countries=None,
+                   columns=None, cache_dir=None):
+    """
+    Load raw outbreak events from the country-partitioned cache, building or
+    rebuilding it only when the raw export has changed.
+
+    Only the partitions for the requested countries are read, so extracting
+    one country does not touch the rest of the export.
+    """
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(f"Could not find input file at: {input_file}")
+
+    if not HAVE_PYARROW:
+        df = read_outbreak_csv(input_file)
+        if countries is not None:
+            df = df[df['Country'].isin(countries)]
+        if exclude_countries is not None:
+            df = df[~df['Country'].isin(exclude_countries)]
+        df = df.reset_index(drop=True)
+        return df[columns] if columns else df
+
+    cache_path = _ensure_cache(input_file, cache_dir, partition_col='Country')
+
+    filter_expr = None
+    if countries is not None:
+        filter_expr = ds.field('Country').isin(list(countries))
+    if exclude_countries is not None:
+        excluded = ~ds.field('Country').isin(list(exclude_countries))
+        filter_expr = excluded if filter_expr is None else filter_expr & excluded
+
+    return _read_cache(cache_path, filter_expr=filter_expr, columns=columns)
+
+
+def read_events(file_path, columns=None, cache_dir=None):
+    """
+    Read a processed events CSV through the columnar cache.
+
+    Drop-in replacement for ``pd.read_csv(path, parse_dates=[...])`` used by
+    the analysis and plotting scripts.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Could not find input file at: {file_path}")
+
+    if not HAVE_PYARROW:
+        return read_outbreak_csv(file_path, usecols=columns)
+
+    cache_path = _ensure_cache(file_path, cache_dir)
+    return _read_cache(cache_path, columns=columns)
+
+
+def store_events(df, file_path, cache_dir=None, text=None):
+    """
+    Write a processed events frame to CSV and refresh its columnar cache
+    from memory, so the next read_events call does not re-parse the CSV.
+    text, when given, is the frame already formatted as CSV.
+    """
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    if text is None:
+        df.to_csv(file_path, index=False)
+    else:
+        with open(file_path, 'w', newline='') as f:
+            f.write(text)
+    if not HAVE_PYARROW:
+        return
+
+    # store the frame the way it would be read back from the CSV
+    df = df.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.PeriodDtype):
+            df[col] = df[col].astype(str).where(df[col].notna())
+    df = apply_schema(df)
+
+    cache_path = cache_path_for(file_path, cache_dir)
+    if os.path.exists(cache_path):
+        shutil.rmtree(cache_path)
+    os.makedirs(cache_path)
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False),
+                   os.path.join(cache_path, 'part-00000.parquet'))
+    _write_manifest(cache_path, {
+        'source': os.path.abspath(file_path),
+        'fingerprint': file_fingerprint(file_path),
+        'content_hash': content_hash(file_path),
+        'columns': list(df.columns),
+        'partition_col': None,
+        'rows': len(df),
+        'schema': SCHEMA_SIGNATURE,
+    })
+
+
+def append_events(df, file_path, cache_dir=None):
+    """
+    Append rows to a processed events CSV. If the file's cache is current,
+    the rows are added to it as a new Parquet part file instead of forcing
+    a rebuild of the whole cache.
+    """
+    cache_path = cache_path_for(file_path, cache_dir)
+    cache_current = HAVE_PYARROW and is_cache_valid(file_path, cache_path)
+
+    df.to_csv(file_path, mode='a', header=False, index=False)
+    if not cache_current:
+        return
+
+    parts = sorted(f for f in os.listdir(cache_path) if f.endswith('.parquet'))
+    schema = pq.read_schema(os.path.join(cache_path, parts[0]))
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+    pq.write_table(table, os.path.join(cache_path, f"part-{len(parts):05d}.parquet"))
+
+    manifest = _read_manifest(cache_path)
+    manifest['fingerprint'] = file_fingerprint(file_path)
+    manifest['content_hash'] = content_hash(file_path)
+    manifest['rows'] += len(df)
+    _write_manifest(cache_path, manifest)
+
+
+def list_cached_countries(input_file=RAW_FILE, cache_dir=None):
+    """
+    Countries present in the raw export, read from the partition layout.
+    """
+    if not HAVE_PYARROW:
+        return sorted(read_outbreak_csv(input_file, usecols=['Country'])['Country'].unique())
+    cache_path = _ensure_cache(input_file, cache_dir, partition_col='Country')
+    df = _read_cache(cache_path, columns=['Country'])
+    return sorted(df['Country'].unique())
+
+
+if __name__ == "__main__":
+    try:
+        print("Refreshing raw export cache...")
+        cache_path = _ensure_cache(RAW_FILE, partition_col='Country')
+        print(f"Cache is up to date at: {cache_path}")
+        print(f"Countries cached: {len(list_cached_countries())}")
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+        print(f"\nDebug information:")
+        print(f"Current working directory: {os.getcwd()}")
+        print(f"Input file exists?: {os.path.exists(RAW_FILE)}")
+        print(f"Cache directory exists?: {os.path.exists(CACHE_DIR)}")
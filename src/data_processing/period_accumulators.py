@@ -0,0 +1,277 @@
+import pandas as pd
+from collections import Counter, defaultdict
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.outbreak_cache import CACHE_DIR, content_hash, file_fingerprint
+from data_processing.aggregate_cube import EVENT_FILES, ensure_cube
+
+STORE_FILE = os.path.join(CACHE_DIR, 'period_accumulators.json')
+PERIODS = ['Pre-Vaccination', 'Vaccination', 'Post-Vaccination']
+
+
+class RunningStats:
+    """
+    Mergeable summary of a stream of monthly counts: Welford mean/variance,
+    a running total and a value histogram. Monthly counts are small
+    integers, so the histogram is an exact median sketch. Values can also
+    be removed, which is needed when a month's count is revised.
+    """
+    def __init__(self, n=0, mean=0.0, m2=0.0, total=0, histogram=None):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.total = total
+        self.histogram = Counter(histogram or {})
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        self.total += x
+        self.histogram[x] += 1
+
+    def remove(self, x):
+        if self.histogram[x] <= 0:
+            raise ValueError(f"Value {x} is not in the accumulator")
+        if self.n == 1:
+            self.n, self.mean, self.m2 = 0, 0.0, 0.0
+        else:
+            mean_without = (self.n * self.mean - x) / (self.n - 1)
+            self.m2 -= (x - self.mean) * (x - mean_without)
+            self.mean = mean_without
+            self.n -= 1
+        self.total -= x
+        self.histogram[x] -= 1
+        if not self.histogram[x]:
+            del self.histogram[x]
+
+    def merge(self, other):
+        """
+        Combine with another accumulator (Chan et al. parallel update).
+        """
+        n = self.n + other.n
+        if n == 0:
+            return self
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta ** 2 * self.n * other.n / n
+        self.n = n
+        self.total += other.total
+        self.histogram.update(other.histogram)
+        return self
+
+    def std(self):
+        return (max(self.m2, 0.0) / (self.n - 1)) ** 0.5 if self.n > 1 else float('nan')
+
+    def median(self):
+        if self.n == 0:
+            return float('nan')
+        lower_rank, upper_rank = (self.n - 1) // 2, self.n // 2
+        seen, lower = 0, None
+        for value in sorted(self.histogram):
+            seen += self.histogram[value]
+            if lower is None and seen > lower_rank:
+                lower = value
+            if seen > upper_rank:
+                return (lower + value) / 2
+
+    def to_dict(self):
+        return {'n': self.n, 'mean': self.mean, 'm2': self.m2, 'total': self.total,
+                'histogram': {str(k): v for k, v in self.histogram.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['n'], data['mean'], data['m2'], data['total'],
+                   {int(k): v for k, v in data['histogram'].items()})
+
+
+def _month_end(month):
+    return pd.Period(month, freq='M').end_time.normalize().tz_localize('UTC')
+
+
+def _month_range(first, last):
+    return [str(p) for p in pd.period_range(first, last, freq='M')]
+
+
+class PeriodStatisticsStore:
+    """
+    Per-series monthly counts with one RunningStats per series and
+    vaccination period, kept over the months where France and the control
+    group overlap (the same alignment as OutbreakAnalysis). Series are every
+    country plus the pooled 'Control' group. Applying a batch of count
+    changes only touches the affected months.
+    """
+    def __init__(self, counts, vaccination_start, vaccination_end, treated='France'):
+        self.counts = defaultdict(Counter, {s: Counter(c) for s, c in counts.items()})
+        self.vaccination_start = pd.Timestamp(vaccination_start)
+        self.vaccination_end = pd.Timestamp(vaccination_end)
+        self.treated = treated
+        self.months = self._aligned_months()
+        self.stats = defaultdict(lambda: {p: RunningStats() for p in PERIODS})
+        for series, series_counts in self.counts.items():
+            for month in self.months:
+                self.stats[series][self.period_of(month)].add(series_counts[month])
+
+    @classmethod
+    def from_cube(cls, cube, vaccination_start, vaccination_end, treated='France'):
+        counts = defaultdict(Counter)
+        grouped = cube.groupby(['Country', 'month'], observed=True)['outbreak_count'].sum()
+        for (country, month), n in grouped.items():
+            counts[str(country)][month] += int(n)
+            if country != treated:
+                counts['Control'][month] += int(n)
+        return cls(counts, vaccination_start, vaccination_end, treated)
+
+    def period_of(self, month):
+        month_end = _month_end(month)
+        if month_end < self.vaccination_start:
+            return PERIODS[0]
+        return PERIODS[1] if month_end < self.vaccination_end else PERIODS[2]
+
+    def _span(self, series):
+        months = [m for m, n in self.counts[series].items() if n > 0]
+        return (min(months), max(months)) if months else None
+
+    def _aligned_months(self):
+        spans = [self._span(self.treated), self._span('Control')]
+        if None in spans:
+            return []
+        first, last = max(s[0] for s in spans), min(s[1] for s in spans)
+        return _month_range(first, last) if first <= last else []
+
+    def apply(self, changes):
+        """
+        Apply count changes {(country, 'YYYY-MM'): delta}, updating the
+        accumulators for the changed months and for months entering or
+        leaving the aligned range.
+        """
+        old = {}
+        for (country, month), delta in changes.items():
+            if not delta:
+                continue
+            for series in (country, 'Control') if country != self.treated else (country,):
+                if series not in self.counts:
+                    # a new series has held zero in every aligned month so far
+                    for m in self.months:
+                        self.stats[series][self.period_of(m)].add(0)
+                old.setdefault((series, month), self.counts[series][month])
+                self.counts[series][month] += delta
+
+        old_months, new_months = set(self.months), set(self._aligned_months())
+        for series in list(self.counts):
+            for month in old_months - new_months:
+                value = old.get((series, month), self.counts[series][month])
+                self.stats[series][self.period_of(month)].remove(value)
+            for month in new_months - old_months:
+                self.stats[series][self.period_of(month)].add(self.counts[series][month])
+        for (series, month), value in old.items():
+            if month in old_months and month in new_months:
+                period = self.stats[series][self.period_of(month)]
+                period.remove(value)
+                period.add(self.counts[series][month])
+        self.months = sorted(new_months)
+
+    def table(self, series=('France', 'Control')):
+        """
+        Same layout as OutbreakAnalysis.calculate_period_statistics.
+        """
+        rows = {}
+        for period in PERIODS:
+            for name in series:
+                acc = self.stats[name][period]
+                rows[(period, name)] = {'mean': acc.mean if acc.n else float('nan'),
+                                        'median': acc.median(), 'std': acc.std(),
+                                        'total': acc.total, 'months': acc.n}
+        return pd.DataFrame.from_dict(rows, orient='index')
+
+    def to_dict(self):
+        return {
+            'treated': self.treated,
+            'vaccination_start': str(self.vaccination_start),
+            'vaccination_end': str(self.vaccination_end),
+            'months': self.months,
+            'counts': {s: dict(c) for s, c in self.counts.items()},
+            'stats': {s: {p: acc.to_dict() for p, acc in by_period.items()}
+                      for s, by_period in self.stats.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        store = cls.__new__(cls)
+        store.counts = defaultdict(Counter, {s: Counter(c) for s, c in data['counts'].items()})
+        store.vaccination_start = pd.Timestamp(data['vaccination_start'])
+        store.vaccination_end = pd.Timestamp(data['vaccination_end'])
+        store.treated = data['treated']
+        store.months = data['months']
+        store.stats = defaultdict(lambda: {p: RunningStats() for p in PERIODS})
+        for series, by_period in data['stats'].items():
+            store.stats[series] = {p: RunningStats.from_dict(acc) for p, acc in by_period.items()}
+        return store
+
+
+def save_store(store, event_files=None, store_file=STORE_FILE):
+    event_files = event_files or EVENT_FILES
+    os.makedirs(os.path.dirname(store_file), exist_ok=True)
+    with open(store_file, 'w') as f:
+        json.dump({'sources': [{'file': os.path.abspath(p), 'fingerprint': file_fingerprint(p),
+                                'content_hash': content_hash(p)} for p in event_files],
+                   'store': store.to_dict()}, f)
+
+
+def load_store(event_files=None, store_file=STORE_FILE, vaccination_start=None, vaccination_end=None):
+    """
+    The persisted store if it still matches the event files (and the period
+    boundaries, when given), else None.
+    """
+    event_files = event_files or EVENT_FILES
+    if not os.path.exists(store_file):
+        return None
+    with open(store_file) as f:
+        saved = json.load(f)
+    store = saved['store']
+    if vaccination_start is not None and (
+            pd.Timestamp(store['vaccination_start']) != pd.Timestamp(vaccination_start)
+            or pd.Timestamp(store['vaccination_end']) != pd.Timestamp(vaccination_end)):
+        return None
+    sources = saved['sources']
+    if [s['file'] for s in sources] != [os.path.abspath(p) for p in event_files]:
+        return None
+    for source, path in zip(sources, event_files):
+        if not os.path.exists(path):
+            return None
+        if file_fingerprint(path) != source['fingerprint'] and content_hash(path) != source['content_hash']:
+            return None
+    return PeriodStatisticsStore.from_dict(store)
+
+
+def ensure_store(vaccination_start, vaccination_end, event_files=None, store_file=STORE_FILE):
+    """
+    Load the persisted accumulators, rebuilding them from the monthly cube
+    when the event files or period boundaries changed.
+    """
+    event_files = event_files or EVENT_FILES
+    store = load_store(event_files, store_file, vaccination_start, vaccination_end)
+    if store is None:
+        print("Building period statistics accumulators...")
+        store = PeriodStatisticsStore.from_cube(ensure_cube(event_files),
+                                                vaccination_start, vaccination_end)
+        save_store(store, event_files, store_file)
+    return store
+
+
+def count_changes(removed_rows, added_rows):
+    """
+    Per (country, month) count deltas implied by replacing removed_rows
+    with added_rows.
+    """
+    changes = Counter()
+    for rows, sign in ((removed_rows, -1), (added_rows, 1)):
+        rows = rows.dropna(subset=['observation date'])
+        keys = zip(rows['Country'].astype(str), rows['observation date'].dt.strftime('%Y-%m'))
+        for key, n in Counter(keys).items():
+            changes[key] += sign * n
+    return changes
@@ -2,46 +2,43 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import os
+import sys
 import json
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.outbreak_cache import load_outbreaks
+from data_processing.deduplicate import drop_duplicates_with_report
+
 # Define paths relative to project root
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 INPUT_FILE = os.path.join(PROJECT_ROOT, 'data', 'raw', 'europe_hpai_bird_outbreaks.csv')
 OUTPUT_CSV = os.path.join(PROJECT_ROOT, 'data', 'processed', 'europe_control_group.csv')
 OUTPUT_JSON = os.path.join(PROJECT_ROOT, 'data', 'processed', 'europe_control_group_monthly.json')
 
-def process_control_group(input_file, output_file):
+def process_control_group(input_file, output_file, deduplicate=False):
     """
     Process European HPAI outbreak data excluding France to create control group dataset.
+    With deduplicate, near-duplicate events are dropped (before the
+    per-country totals are counted) and the merge decisions written next
+    to the output file.
     """
     if not os.path.exists(input_file):
         raise FileNotFoundError(f"Could not find input file at: {input_file}")
     
-    print(f"Reading data from: {input_file}")
-    df = pd.read_csv(input_file, parse_dates=['observation date', 'report date'])
-    
     # remove French data to create control group
-    print("Creating control group by excluding French data...")
-    control_df = df[df['Country'] != 'France'].copy()
+    print(f"Reading non-French partitions from cache of: {input_file}")
+    control_df = load_outbreaks(input_file, exclude_countries=['France'])
+    if deduplicate:
+        control_df = drop_duplicates_with_report(control_df, output_file)
     
     # sort chronologically
+    # stable, so events on the same day keep the export's order
     print("Sorting by observation date...")
-    control_df = control_df.sort_values('observation date')
+    control_df = control_df.sort_values('observation date', kind='stable')
     
     # add useful analytical fields
     print("Adding analytical fields...")
-    
-    # calculate days since first outbreak for to align outbreaks on consistent timeline
-    first_outbreak = control_df['observation date'].min()
-    control_df['days_since_first_outbreak'] = (
-        control_df['observation date'] - first_outbreak).dt.days
-    
-    # add month-year field for monthly aggregation trend analysis
-    control_df['month_year'] = control_df['observation date'].dt.to_period('M')
-    
-    # outbreaks by country
-    country_counts = control_df['Country'].value_counts()
-    control_df['country_total_outbreaks'] = control_df['Country'].map(country_counts)
+    control_df = add_analytical_fields(control_df)
     
     # reset index for clean sequential numbering
     control_df = control_df.reset_index(drop=True)
@@ -55,6 +52,29 @@ def process_control_group(input_file, output_file):
     
     return control_df
 
+def add_analytical_fields(control_df, first_outbreak=None, country_counts=None):
+    """
+    Add the derived control group columns. The first outbreak date and
+    per-country totals can be passed in when the frame is only one slice of
+    the control group (e.g. during chunked ingestion).
+    """
+    # calculate days since first outbreak for to align outbreaks on consistent timeline
+    if first_outbreak is None:
+        first_outbreak = control_df['observation date'].min()
+    control_df['days_since_first_outbreak'] = (
+        control_df['observation date'] - first_outbreak).dt.days.astype('Int32')
+    
+    # add month-year field for monthly aggregation trend analysis
+    control_df['month_year'] = control_df['observation date'].dt.tz_localize(None).dt.to_period('M')
+    
+    # outbreaks by country
+    if country_counts is None:
+        country_counts = control_df['Country'].value_counts()
+    control_df['country_total_outbreaks'] = (
+        control_df['Country'].astype(str).map(country_counts).astype('Int32'))
+    
+    return control_df
+
 def group_and_convert_to_json(df, json_output_path):
     """
     Groups the control group HPAI data by month and converts to JSON format
@@ -95,7 +115,7 @@ def print_control_group_summary(control_df):
     print(f"Last outbreak: {control_df['observation date'].max()}")
     
     print("\nOutbreaks by country:")
-    country_summary = control_df.groupby('Country').size().sort_values(ascending=False)
+    country_summary = control_df.groupby('Country', observed=True).size().sort_values(ascending=False)
     for country, count in country_summary.items():
         print(f"{country}: {count}")
     
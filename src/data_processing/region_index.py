@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.outbreak_cache import read_events
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# administrative boundaries (e.g. NUTS regions or French departments) as
+# GeoJSON in WGS84. The bundled file holds the 96 metropolitan French
+# departments, dissolved from commune outlines (see data/external/README.md)
+REGIONS_FILE = os.path.join(PROJECT_ROOT, 'data', 'external', 'france_departments.geojson')
+# feature properties tried, in order, for the region identifier
+REGION_ID_PROPERTIES = ('NUTS_ID', 'code', 'id', 'name', 'nom')
+REGION_COLUMNS = ['Country', 'latitude', 'longitude', 'observation date']
+
+# points x edges tested at once in the point-in-polygon kernel
+PIP_BLOCK = 4_000_000
+
+
+def _feature_rings(geometry):
+    """
+    Every ring (outer and holes) of a Polygon or MultiPolygon as (m, 2)
+    lon/lat arrays. Under the even-odd rule holes and separate parts need
+    no special treatment.
+    """
+    if geometry['type'] == 'Polygon':
+        polygons = [geometry['coordinates']]
+    elif geometry['type'] == 'MultiPolygon':
+        polygons = geometry['coordinates']
+    else:
+        raise ValueError(f"Unsupported geometry type {geometry['type']}")
+    return [np.asarray(ring, dtype=float)[:, :2] for polygon in polygons for ring in polygon]
+
+
+def points_in_rings(lon, lat, edges):
+    """
+    Even-odd point-in-polygon test for many points against one polygon's
+    edges, shape (k, 4) as (x0, y0, x1, y1), vectorized over points and
+    edges in blocks of PIP_BLOCK pairs.
+    """
+    inside = np.zeros(len(lon), dtype=bool)
+    x0, y0, x1, y1 = (edges[:, c] for c in range(4))
+    step = max(1, PIP_BLOCK // max(len(edges), 1))
+    for start in range(0, len(lon), step):
+        px = lon[start:start + step, None]
+        py = lat[start:start + step, None]
+        straddles = (y0 > py) != (y1 > py)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossing_x = x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+        crossings = np.count_nonzero(straddles & (px < crossing_x), axis=1)
+        inside[start:start + step] = crossings % 2 == 1
+    return inside
+
+
+class RegionIndex:
+    """
+    Region polygons with their bounding boxes. Points are assigned by
+    sorting them by longitude once, cutting each region's bounding box out
+    of the sorted points with searchsorted, and running a vectorized
+    point-in-polygon test only on those candidates.
+    """
+    def __init__(self, region_ids, rings):
+        self.region_ids = np.asarray(region_ids, dtype=object)
+        self.edges = []
+        bounds = []
+        for region_rings in rings:
+            edges = np.concatenate([np.column_stack([ring[:-1], ring[1:]]) for ring in region_rings
+                                    if len(ring) > 1])
+            self.edges.append(edges)
+            points = np.concatenate(region_rings)
+            bounds.append(np.concatenate([points.min(axis=0), points.max(axis=0)]))
+        # lon_min, lat_min, lon_max, lat_max per region
+        self.bounds = np.array(bounds).reshape(-1, 4)
+
+    @classmethod
+    def from_geojson(cls, path=REGIONS_FILE, id_property=None):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Could not find region boundaries at: {path}")
+        with open(path) as f:
+            features = json.load(f)['features']
+
+        region_ids, rings = [], []
+        for number, feature in enumerate(features):
+            if not feature.get('geometry'):
+                continue
+            properties = feature.get('properties') or {}
+            names = [id_property] if id_property else REGION_ID_PROPERTIES
+            region_id = next((properties[n] for n in names if properties.get(n) is not None),
+                             feature.get('id', number))
+            region_ids.append(str(region_id))
+            rings.append(_feature_rings(feature['geometry']))
+        return cls(region_ids, rings)
+
+    def __len__(self):
+        return len(self.region_ids)
+
+    def assign(self, latitude, longitude):
+        """
+        Region identifier for every point (None outside every region).
+        Where regions overlap, the first one in the file wins.
+        """
+        lat = np.asarray(latitude, dtype=float)
+        lon = np.asarray(longitude, dtype=float)
+        result = np.full(len(lat), None, dtype=object)
+        valid = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+        order = valid[np.argsort(lon[valid], kind='stable')]
+        sorted_lon = lon[order]
+        assigned = np.zeros(len(lat), dtype=bool)
+
+        lo = np.searchsorted(sorted_lon, self.bounds[:, 0], side='left')
+        hi = np.searchsorted(sorted_lon, self.bounds[:, 2], side='right')
+        for r in np.flatnonzero(hi > lo):
+            candidates = order[lo[r]:hi[r]]
+            candidates = candidates[~assigned[candidates]
+                                    & (lat[candidates] >= self.bounds[r, 1])
+                                    & (lat[candidates] <= self.bounds[r, 3])]
+            if not len(candidates):
+                continue
+            hits = candidates[points_in_rings(lon[candidates], lat[candidates], self.edges[r])]
+            result[hits] = self.region_ids[r]
+            assigned[hits] = True
+        return result
+
+
+def assign_regions(events, index):
+    """
+    Copy of events with a 'region' column from the region index.
+    """
+    return events.assign(region=index.assign(events['latitude'], events['longitude']))
+
+
+def region_monthly_frame(event_files, regions_file=REGIONS_FILE, countries=None, id_property=None):
+    """
+    Zero-filled month-end frame of outbreak counts with one column per
+    region (events outside every region are left out), in the same layout
+    as monthly_series_frame, ready for fit_its_batch.
+    """
+    index = RegionIndex.from_geojson(regions_file, id_property)
+    events = pd.concat([read_events(path, columns=REGION_COLUMNS) for path in event_files],
+                       ignore_index=True)
+    if countries is not None:
+        events = events[events['Country'].isin(countries)]
+    events = assign_regions(events.dropna(subset=['observation date']), index)
+    events = events.dropna(subset=['region'])
+    if events.empty:
+        raise ValueError(f"No events fall inside the regions in {regions_file}")
+
+    month = events['observation date'].dt.tz_convert('UTC').dt.tz_localize(None).dt.to_period('M')
+    counts = events.groupby([month.rename('month'), 'region']).size().unstack(fill_value=0)
+    counts.index = counts.index.to_timestamp(how='end').normalize().tz_localize('UTC')
+    full_range = pd.date_range(counts.index.min(), counts.index.max(), freq='ME', tz='UTC')
+    return counts.reindex(full_range, fill_value=0).rename_axis(columns=None)
@@ -0,0 +1,73 @@
+import pandas as pd
+import hashlib
+import json
+import os
+
+# Compact column types for WAHIS outbreak records (raw export and the
+# processed files derived from it). Repeated strings become categoricals
+# and identifiers and counts drop to 32-bit. Coordinates stay float64: they
+# are written back to the processed CSVs, where float32 would round them.
+CATEGORY_COLUMNS = [
+    'Disease', 'Serotype', 'Locality', 'Country', 'Region', 'Species',
+    'Diagnosis Source', 'Diagnosis Status', 'month_year',
+]
+
+OUTBREAK_DTYPES = {
+    'Event ID': 'int32',
+    'latitude': 'float64',
+    'longitude': 'float64',
+    'Humans Affected': 'float32',
+    'Human Deaths': 'float32',
+    # nullable so events without an observation date keep an empty value
+    'days_since_first_outbreak': 'Int32',
+    'country_total_outbreaks': 'Int32',
+    **{col: 'category' for col in CATEGORY_COLUMNS},
+}
+
+DATE_COLUMNS = ['observation date', 'report date']
+
+# recorded with every columnar cache, so caches written under other column
+# types are rebuilt rather than read back with stale dtypes
+SCHEMA_SIGNATURE = hashlib.sha1(json.dumps(OUTBREAK_DTYPES, sort_keys=True).encode()).hexdigest()[:12]
+
+# raw exports use '2024-10-28T00:00:00Z'; processed CSVs are written by pandas
+# as '2024-10-28 00:00:00+00:00'. ISO8601 covers both without inference.
+DATE_FORMAT = 'ISO8601'
+
+
+def parse_outbreak_dates(df, columns=None):
+    """
+    Parse the date columns present in a frame to tz-aware UTC timestamps.
+    This is the one place timezones are handled.
+    """
+    for col in columns or DATE_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.DatetimeTZDtype):
+            df[col] = pd.to_datetime(df[col], format=DATE_FORMAT, utc=True)
+    return df
+
+
+def apply_schema(df):
+    """
+    Cast an already-loaded frame to the compact outbreak schema.
+    """
+    dtypes = {col: dtype for col, dtype in OUTBREAK_DTYPES.items() if col in df.columns}
+    return parse_outbreak_dates(df.astype(dtypes))
+
+
+def csv_dtypes(usecols=None):
+    """
+    dtype mapping to pass to pd.read_csv, limited to the requested columns.
+    """
+    if usecols is None:
+        return dict(OUTBREAK_DTYPES)
+    return {col: dtype for col, dtype in OUTBREAK_DTYPES.items() if col in usecols}
+
+
+def read_outbreak_csv(file_path, usecols=None, **kwargs):
+    """
+    Read an outbreak CSV (raw or processed) straight into the compact schema.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Could not find input file at: {file_path}")
+    df = pd.read_csv(file_path, usecols=usecols, dtype=csv_dtypes(usecols), **kwargs)
+    return parse_outbreak_dates(df)
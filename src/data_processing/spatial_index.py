@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+import json
+import os
+import pickle
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.outbreak_cache import (cache_path_for, content_hash,
+                                            file_fingerprint, read_events)
+
+EARTH_RADIUS_KM = 6371.0088
+INDEX_COLUMNS = ['Event ID', 'latitude', 'longitude', 'observation date']
+
+
+def unit_vectors(lat, lon):
+    """
+    Points on the unit sphere for latitude/longitude in degrees, shape (n, 3).
+    Euclidean (chord) distance between them is monotonic in great-circle
+    distance, so a KD-tree over them answers haversine queries exactly.
+    """
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def km_to_chord(km):
+    return 2 * np.sin(np.asarray(km, dtype=float) / (2 * EARTH_RADIUS_KM))
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def _to_ns(value):
+    if value is None:
+        return None
+    ts = pd.Timestamp(value)
+    return (ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')).value
+
+
+class SpatialIndex:
+    """
+    KD-tree over outbreak coordinates (as unit vectors) with the events'
+    IDs and observation dates, for radius, radius-and-time-window and
+    k-nearest queries in great-circle kilometres. An already built tree
+    (e.g. a persisted one) can be passed in to skip the build.
+    """
+    def __init__(self, event_ids, latitude, longitude, dates, tree=None):
+        self.event_ids = np.asarray(event_ids)
+        self.latitude = np.asarray(latitude, dtype=float)
+        self.longitude = np.asarray(longitude, dtype=float)
+        # nanoseconds since the epoch (UTC); NaT is the int64 minimum
+        self.dates = np.asarray(dates, dtype='int64')
+        if tree is None:
+            from scipy.spatial import cKDTree
+            tree = cKDTree(unit_vectors(self.latitude, self.longitude))
+        self.tree = tree
+
+    @classmethod
+    def from_events(cls, events):
+        events = events.dropna(subset=['latitude', 'longitude'])
+        dates = pd.to_datetime(events['observation date'], utc=True)
+        return cls(events['Event ID'].to_numpy(), events['latitude'].to_numpy(),
+                   events['longitude'].to_numpy(), dates.to_numpy(dtype='datetime64[ns]').view('int64'))
+
+    def __len__(self):
+        return len(self.event_ids)
+
+    def save(self, path):
+        """
+        Persist the arrays together with the built KD-tree; unpickling the
+        tree is over 20x faster than rebuilding it at 10^6 points.
+        """
+        with open(path, 'wb') as f:
+            pickle.dump({'event_ids': self.event_ids, 'latitude': self.latitude,
+                         'longitude': self.longitude, 'dates': self.dates, 'tree': self.tree},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+        return cls(data['event_ids'], data['latitude'], data['longitude'], data['dates'],
+                   tree=data['tree'])
+
+    def _time_mask(self, positions, start=None, end=None):
+        mask = self.dates[positions] != np.iinfo('int64').min
+        start, end = _to_ns(start), _to_ns(end)
+        if start is not None:
+            mask &= self.dates[positions] >= start
+        if end is not None:
+            mask &= self.dates[positions] < end
+        return mask
+
+    def _frame(self, positions, distances):
+        return pd.DataFrame({
+            'Event ID': self.event_ids[positions],
+            'latitude': self.latitude[positions],
+            'longitude': self.longitude[positions],
+            'observation date': pd.to_datetime(self.dates[positions], utc=True),
+            'distance_km': distances,
+        })
+
+    def radius_positions(self, latitude, longitude, radius_km):
+        """
+        Row positions within radius_km of each query point, as a list of
+        arrays (one per point); accepts scalars or arrays of points.
+        """
+        points = unit_vectors(np.atleast_1d(latitude), np.atleast_1d(longitude))
+        return [np.asarray(p, dtype=np.intp)
+                for p in self.tree.query_ball_point(points, km_to_chord(radius_km))]
+
+    def within(self, latitude, longitude, radius_km, start=None, end=None):
+        """
+        Events within radius_km of a point, optionally observed in
+        [start, end). Sorted by distance.
+        """
+        positions = self.radius_positions(latitude, longitude, radius_km)[0]
+        if start is not None or end is not None:
+            positions = positions[self._time_mask(positions, start, end)]
+        distances = haversine_km(latitude, longitude,
+                                 self.latitude[positions], self.longitude[positions])
+        order = np.argsort(distances, kind='stable')
+        return self._frame(positions[order], distances[order])
+
+    def nearest(self, latitude, longitude, k=10):
+        """
+        The k events closest to a point, sorted by distance.
+        """
+        k = min(k, len(self))
+        chords, positions = self.tree.query(unit_vectors([latitude], [longitude])[0], k=k)
+        positions = np.atleast_1d(positions)
+        return self._frame(positions, chord_to_km(np.atleast_1d(chords)))
+
+
+def index_path_for(event_file, cache_dir=None):
+    """
+    Location of the persisted spatial index for a processed event file,
+    alongside its columnar cache.
+    """
+    return cache_path_for(event_file, cache_dir) + '.spatial.pickle'
+
+
+def _scipy_version():
+    import scipy
+    return scipy.__version__
+
+
+def ensure_spatial_index(event_file, cache_dir=None):
+    """
+    Load the persisted spatial index (arrays and built KD-tree) for an
+    event file, rebuilding it only when the file has changed since the
+    index was written or the tree was pickled by another SciPy version.
+    """
+    index_file = index_path_for(event_file, cache_dir)
+    meta_file = os.path.splitext(index_file)[0] + '.meta.json'
+
+    meta = None
+    if os.path.exists(index_file) and os.path.exists(meta_file):
+        with open(meta_file) as f:
+            meta = json.load(f)
+    if meta is not None and meta.get('scipy') == _scipy_version():
+        fingerprint = file_fingerprint(event_file)
+        if fingerprint == meta['fingerprint']:
+            return SpatialIndex.load(index_file)
+        if content_hash(event_file) == meta['content_hash']:
+            meta['fingerprint'] = fingerprint
+            with open(meta_file, 'w') as f:
+                json.dump(meta, f, indent=4)
+            return SpatialIndex.load(index_file)
+
+    print(f"Building spatial index for: {event_file}")
+    index = SpatialIndex.from_events(read_events(event_file, columns=INDEX_COLUMNS, cache_dir=cache_dir))
+    os.makedirs(os.path.dirname(index_file), exist_ok=True)
+    index.save(index_file)
+    with open(meta_file, 'w') as f:
+        json.dump({'source': os.path.abspath(event_file),
+                   'fingerprint': file_fingerprint(event_file),
+                   'content_hash': content_hash(event_file),
+                   'scipy': _scipy_version(),
+                   'events': len(index)}, f, indent=4)
+    print(f"Indexed {len(index)} events to: {index_file}")
+    return index
@@ -0,0 +1,162 @@
+import pandas as pd
+from collections import Counter
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_processing.process_control_group import add_analytical_fields
+from data_processing.schema import csv_dtypes, parse_outbreak_dates, read_outbreak_csv
+
+# Define paths relative to project root
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+INPUT_FILE = os.path.join(PROJECT_ROOT, 'data', 'raw', 'europe_hpai_bird_outbreaks.csv')
+PROCESSED_DIR = os.path.join(PROJECT_ROOT, 'data', 'processed')
+
+DEFAULT_CHUNKSIZE = 100_000
+UNDATED_BUCKET = 'undated'
+
+
+def _spill_chunk(chunk, spill_dir, written):
+    """
+    Append the rows of a chunk to one spill file per observation month.
+    """
+    months = chunk['observation date'].dt.strftime('%Y-%m').fillna(UNDATED_BUCKET)
+    for month, rows in chunk.groupby(months, sort=False):
+        path = os.path.join(spill_dir, f"{month}.csv")
+        rows.to_csv(path, mode='a', header=month not in written, index=False)
+        written.add(month)
+
+
+def stream_extract(input_file, output_file, json_output_path, countries=None,
+                   exclude_countries=None, analytical_fields=False,
+                   chunksize=DEFAULT_CHUNKSIZE, spill_dir=None):
+    """
+    Filter, sort and aggregate a raw export with bounded memory.
+
+    The export is read in chunks of ``chunksize`` rows. Matching rows are
+    spilled to one temporary file per observation month while the monthly
+    counts, per-country totals and first outbreak date are accumulated.
+    The sorted output is then written month by month, so peak memory is one
+    chunk plus the largest single month rather than the whole export.
+    """
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(f"Could not find input file at: {input_file}")
+
+    own_spill_dir = spill_dir is None
+    spill_dir = spill_dir or tempfile.mkdtemp(prefix='hpai_spill_')
+    os.makedirs(spill_dir, exist_ok=True)
+
+    monthly_counts = Counter()
+    country_counts = Counter()
+    first_outbreak = None
+    written = set()
+    total_rows = 0
+
+    try:
+        print(f"Streaming data from: {input_file} ({chunksize} rows per chunk)")
+        for chunk in pd.read_csv(input_file, chunksize=chunksize, dtype=csv_dtypes()):
+            if countries is not None:
+                chunk = chunk[chunk['Country'].isin(countries)]
+            if exclude_countries is not None:
+                chunk = chunk[~chunk['Country'].isin(exclude_countries)]
+            if chunk.empty:
+                continue
+
+            chunk = parse_outbreak_dates(chunk.copy())
+            monthly_counts.update(
+                chunk['observation date'].dropna().dt.strftime('%Y-%m').value_counts().to_dict())
+            country_counts.update(chunk['Country'].value_counts()[lambda c: c > 0].to_dict())
+            chunk_first = chunk['observation date'].min()
+            if pd.notna(chunk_first) and (first_outbreak is None or chunk_first < first_outbreak):
+                first_outbreak = chunk_first
+
+            _spill_chunk(chunk, spill_dir, written)
+            total_rows += len(chunk)
+
+        print(f"Matched {total_rows} rows across {len(written)} monthly buckets")
+
+        # write the sorted output one month at a time (undated rows last,
+        # matching sort_values' NaT placement)
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        if os.path.exists(output_file):
+            os.remove(output_file)
+
+        buckets = sorted(m for m in written if m != UNDATED_BUCKET)
+        if UNDATED_BUCKET in written:
+            buckets.append(UNDATED_BUCKET)
+
+        country_totals = pd.Series(country_counts, dtype='int64')
+        print(f"Saving processed data to: {output_file}")
+        for i, month in enumerate(buckets):
+            rows = read_outbreak_csv(os.path.join(spill_dir, f"{month}.csv"))
+            rows = rows.sort_values('observation date', kind='stable')
+            if analytical_fields:
+                rows = add_analytical_fields(rows, first_outbreak=first_outbreak,
+                                             country_counts=country_totals)
+            rows.to_csv(output_file, mode='a', header=i == 0, index=False)
+    finally:
+        if own_spill_dir:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+    json_data = [{'month': month, 'outbreak_count': int(count)}
+                 for month, count in sorted(monthly_counts.items())]
+
+    os.makedirs(os.path.dirname(json_output_path), exist_ok=True)
+    print(f"Saving JSON to: {json_output_path}")
+    with open(json_output_path, 'w') as f:
+        json.dump(json_data, f, indent=4)
+
+    return json_data
+
+
+def stream_french_data(input_file, output_file, json_output_path, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Chunked equivalent of extract_french_data + group_and_convert_to_json.
+    """
+    return stream_extract(input_file, output_file, json_output_path,
+                          countries=['France'], chunksize=chunksize)
+
+
+def stream_control_group(input_file, output_file, json_output_path, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Chunked equivalent of process_control_group + group_and_convert_to_json.
+    """
+    return stream_extract(input_file, output_file, json_output_path,
+                          exclude_countries=['France'], analytical_fields=True,
+                          chunksize=chunksize)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Bounded-memory ingestion of a raw WAHIS export.')
+    parser.add_argument('--input', default=INPUT_FILE, help='Raw export CSV')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help='Rows held in memory per chunk')
+    args = parser.parse_args()
+
+    try:
+        print("Streaming French data...")
+        french_monthly = stream_french_data(
+            args.input,
+            os.path.join(PROCESSED_DIR, 'france_hpai_outbreaks.csv'),
+            os.path.join(PROCESSED_DIR, 'france_hpai_outbreaks_monthly.json'),
+            chunksize=args.chunksize)
+
+        print("\nStreaming control group data...")
+        control_monthly = stream_control_group(
+            args.input,
+            os.path.join(PROCESSED_DIR, 'europe_control_group.csv'),
+            os.path.join(PROCESSED_DIR, 'europe_control_group_monthly.json'),
+            chunksize=args.chunksize)
+
+        print(f"\nFrench months: {len(french_monthly)}, control months: {len(control_monthly)}")
+
+    except Exception as e:
+        print(f"An error occurred: {str(e)}")
+        print(f"\nDebug information:")
+        print(f"Current working directory: {os.getcwd()}")
+        print(f"Input file exists?: {os.path.exists(args.input)}")
+        print(f"Processed directory exists?: {os.path.exists(PROCESSED_DIR)}")
@@ -0,0 +1,287 @@
+import argparse
+import ast
+import hashlib
+import inspect
+import json
+import os
+import sys
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(SRC_DIR)
+sys.path.insert(0, SRC_DIR)
+
+from data_processing.outbreak_cache import CACHE_DIR, content_hash, file_fingerprint
+from data_processing import extract_french_hpai_data as extract
+from data_processing import process_control_group as control
+from analysis import hpai_stats_analysis as stats_analysis
+from analysis import study_periods
+from analysis import itsa_analysis
+from analysis import reporting_delay
+from visualization import plot_outbreak_trends as trends
+
+STATE_FILE = os.path.join(CACHE_DIR, 'pipeline_state.json')
+
+
+class Stage:
+    """
+    One step of the pipeline: the files it reads, the parameters and code
+    it depends on, the files it writes and the upstream stages it needs.
+    """
+    def __init__(self, name, run, inputs, outputs, params=None, modules=(), depends_on=()):
+        self.name = name
+        self.run = run
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = params or {}
+        self.modules = list(modules)
+        self.depends_on = list(depends_on)
+
+
+def _run_extract():
+    france_df = extract.extract_french_data(extract.INPUT_FILE, extract.OUTPUT_CSV)
+    extract.group_and_convert_to_json(france_df, extract.OUTPUT_JSON)
+
+
+def _run_control_group():
+    control_df = control.process_control_group(control.INPUT_FILE, control.OUTPUT_CSV)
+    control.group_and_convert_to_json(control_df, control.OUTPUT_JSON)
+
+
+def _run_statistics():
+    stats_analysis.run_period_statistics(extract.OUTPUT_CSV, control.OUTPUT_CSV)
+
+
+def _run_its():
+    itsa_analysis.run_its_analysis(extract.OUTPUT_CSV, control.OUTPUT_CSV)
+
+
+def _run_nowcast():
+    # tables only; the ITS stage fits the observed counts (see run_its_analysis)
+    reporting_delay.run_nowcast([extract.OUTPUT_CSV, control.OUTPUT_CSV], itsa_analysis.ANALYSIS_DIR)
+
+
+def _run_figures():
+    trends.generate_all_figures(extract.OUTPUT_CSV, control.OUTPUT_CSV)
+
+
+def _period_params():
+    return {'vaccination_start': str(study_periods.VACCINATION_START),
+            'vaccination_end': str(study_periods.VACCINATION_END)}
+
+
+def default_stages():
+    """
+    extract -> control group -> statistics -> ITS -> nowcast -> figures.
+    """
+    processed = [extract.OUTPUT_CSV, control.OUTPUT_CSV]
+    return [
+        Stage('extract', _run_extract,
+              inputs=[extract.INPUT_FILE],
+              outputs=[extract.OUTPUT_CSV, extract.OUTPUT_JSON],
+              modules=[extract]),
+        Stage('control_group', _run_control_group,
+              inputs=[control.INPUT_FILE],
+              outputs=[control.OUTPUT_CSV, control.OUTPUT_JSON],
+              modules=[control]),
+        Stage('statistics', _run_statistics,
+              inputs=processed,
+              outputs=[os.path.join(stats_analysis.OUTPUT_DIR, 'period_statistics.csv')],
+              params=_period_params(),
+              modules=[stats_analysis, study_periods],
+              depends_on=['extract', 'control_group']),
+        Stage('its', _run_its,
+              inputs=processed,
+              outputs=[os.path.join(itsa_analysis.ANALYSIS_DIR, 'vaccination_impact.png'),
+                       os.path.join(itsa_analysis.ANALYSIS_DIR, 'statistical_report.txt')],
+              params=_period_params(),
+              modules=[itsa_analysis, study_periods],
+              depends_on=['extract', 'control_group']),
+        Stage('nowcast', _run_nowcast,
+              inputs=processed,
+              outputs=[os.path.join(itsa_analysis.ANALYSIS_DIR, name)
+                       for name in ('reporting_delays.csv', 'nowcast_monthly.csv')],
+              params=_period_params(),
+              modules=[reporting_delay, study_periods],
+              depends_on=['extract', 'control_group']),
+        Stage('figures', _run_figures,
+              inputs=processed,
+              outputs=[os.path.join(trends.OUTPUT_DIR, name) for name in (
+                  'comparative_timeline_with_vaccination.png', 'rolling_average_comparison.png',
+                  'relative_change.png', 'outbreak_severity_boxplot.png')],
+              params=_period_params(),
+              modules=[trends, study_periods],
+              depends_on=['extract', 'control_group']),
+    ]
+
+
+def _local_module_path(name):
+    path = os.path.join(SRC_DIR, *name.split('.')) + '.py'
+    return path if os.path.exists(path) else None
+
+
+def source_closure(modules):
+    """
+    Source files of the given modules and of every src/ module they import,
+    directly or transitively. Imports are read from the syntax tree, so
+    ones deferred into functions (lazy heavy imports) are included too.
+    """
+    pending = [inspect.getsourcefile(module) for module in modules]
+    seen = set()
+    while pending:
+        path = os.path.abspath(pending.pop())
+        if path in seen:
+            continue
+        seen.add(path)
+        with open(path) as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                # 'from package import module' names a module file as well
+                names = [node.module] + [f"{node.module}.{alias.name}" for alias in node.names]
+            else:
+                continue
+            pending.extend(p for p in map(_local_module_path, names) if p)
+    return sorted(seen)
+
+
+class Pipeline:
+    """
+    Runs stages in dependency order, skipping any stage whose inputs,
+    parameters and code hash to the same key as its last successful run
+    and whose outputs are still on disk.
+    """
+    def __init__(self, stages=None, state_file=STATE_FILE):
+        self.stages = {stage.name: stage for stage in (stages or default_stages())}
+        self.state_file = state_file
+        self.state = self._load_state()
+
+    def _load_state(self):
+        if os.path.exists(self.state_file):
+            with open(self.state_file) as f:
+                return json.load(f)
+        return {'stages': {}, 'files': {}}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        with open(self.state_file, 'w') as f:
+            json.dump(self.state, f, indent=4)
+
+    def _file_hash(self, path):
+        """
+        Content hash of a file, recomputed only when its size/mtime changed.
+        """
+        if not os.path.exists(path):
+            return None
+        fingerprint = file_fingerprint(path)
+        known = self.state['files'].get(path)
+        if known and known['fingerprint'] == fingerprint:
+            return known['hash']
+        digest = content_hash(path)
+        self.state['files'][path] = {'fingerprint': fingerprint, 'hash': digest}
+        return digest
+
+    def stage_key(self, stage):
+        """
+        Hash of everything a stage's outputs depend on, including the
+        source of every src/ module its modules import.
+        """
+        digest = hashlib.sha256()
+        digest.update(stage.name.encode())
+        for path in stage.inputs:
+            digest.update(f"{path}:{self._file_hash(path)}".encode())
+        digest.update(json.dumps(stage.params, sort_keys=True).encode())
+        for path in source_closure(stage.modules):
+            with open(path, 'rb') as f:
+                digest.update(os.path.relpath(path, SRC_DIR).encode())
+                digest.update(f.read())
+        return digest.hexdigest()
+
+    def resolve(self, targets=None):
+        """
+        Topologically ordered stages needed to produce the targets.
+        """
+        targets = targets or list(self.stages)
+        ordered, visiting = [], set()
+
+        def visit(name):
+            if name in ordered:
+                return
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage: {name}")
+            if name in visiting:
+                raise ValueError(f"Cycle in pipeline at stage: {name}")
+            visiting.add(name)
+            for dep in self.stages[name].depends_on:
+                visit(dep)
+            visiting.discard(name)
+            ordered.append(name)
+
+        for name in targets:
+            visit(name)
+        return [self.stages[name] for name in ordered]
+
+    def is_fresh(self, stage, key):
+        recorded = self.state['stages'].get(stage.name)
+        return (recorded is not None and recorded['key'] == key
+                and all(os.path.exists(path) for path in stage.outputs))
+
+    def run(self, targets=None, force=False, dry_run=False):
+        """
+        Run the targets and whatever upstream stages they need.
+        Returns {stage name: 'ran' | 'skipped' | 'stale'}.
+        """
+        summary = {}
+        for stage in self.resolve(targets):
+            key = self.stage_key(stage)
+            if not force and self.is_fresh(stage, key):
+                print(f"[{stage.name}] up to date, skipping")
+                summary[stage.name] = 'skipped'
+                continue
+            if dry_run:
+                print(f"[{stage.name}] would run")
+                summary[stage.name] = 'stale'
+                continue
+
+            print(f"[{stage.name}] running...")
+            stage.run()
+            # refresh output hashes now so downstream keys see the new content
+            for path in stage.outputs:
+                self._file_hash(path)
+            self.state['stages'][stage.name] = {'key': key}
+            self._save_state()
+            summary[stage.name] = 'ran'
+
+        self._save_state()
+        return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run the HPAI analysis pipeline.')
+    parser.add_argument('stages', nargs='*',
+                        help='Stages to bring up to date (default: all). Upstream stages are included.')
+    parser.add_argument('--force', action='store_true', help='Rerun stages even if up to date')
+    parser.add_argument('--dry-run', action='store_true', help='Only report which stages would run')
+    parser.add_argument('--list', action='store_true', help='List stages and exit')
+    args = parser.parse_args()
+
+    pipeline = Pipeline()
+    if args.list:
+        for stage in pipeline.resolve():
+            deps = ', '.join(stage.depends_on) or '-'
+            print(f"{stage.name:<15} depends on: {deps}")
+        sys.exit(0)
+
+    try:
+        summary = pipeline.run(args.stages, force=args.force, dry_run=args.dry_run)
+        print("\nPipeline summary:")
+        for name, status in summary.items():
+            print(f"{name}: {status}")
+    except Exception as e:
+        print(f"\nAn error occurred: {str(e)}")
+        print("\nDebug information:")
+        print(f"Current working directory: {os.getcwd()}")
+        print(f"Project root: {PROJECT_ROOT}")
+        print(f"State file: {pipeline.state_file}")
+        sys.exit(1)
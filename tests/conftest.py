@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src'))
+
+# keep the columnar, cube and pyramid caches written by tests out of data/cache;
+# must be set before data_processing.outbreak_cache is imported
+os.environ.setdefault('HPAI_CACHE_DIR', tempfile.mkdtemp(prefix='hpai_test_cache_'))
@@ -0,0 +1,59 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+from data_processing import aggregate_cube
+from data_processing.aggregate_cube import cube_monthly_series, ensure_cube, species_group
+from data_processing.schema import read_outbreak_csv
+from visualization.plot_outbreak_trends import CONTROL_DATA, FRANCE_DATA
+
+
+@pytest.fixture
+def event_files(tmp_path):
+    paths = [str(tmp_path / 'france.csv'), str(tmp_path / 'control.csv')]
+    shutil.copy(FRANCE_DATA, paths[0])
+    shutil.copy(CONTROL_DATA, paths[1])
+    return paths
+
+
+def resampled(events):
+    series = events.set_index('observation date').resample('ME').size()
+    return series.astype('int64').rename(None).rename_axis(None)
+
+
+def test_cube_slices_match_resampled_events(event_files, tmp_path):
+    cube = ensure_cube(event_files, str(tmp_path / 'cube.csv'))
+    france = read_outbreak_csv(event_files[0])
+    control = read_outbreak_csv(event_files[1])
+    events = pd.concat([france, control], ignore_index=True)
+
+    pd.testing.assert_series_equal(cube_monthly_series(cube, countries=['France']), resampled(france),
+                                   check_freq=False)
+    pd.testing.assert_series_equal(cube_monthly_series(cube, exclude_countries=['France']),
+                                   resampled(control), check_freq=False)
+
+    ducks = events[events['Species'].astype(str).map(species_group) == 'Duck']
+    pd.testing.assert_series_equal(cube_monthly_series(cube, countries=['France'], species_groups=['Duck']),
+                                   resampled(ducks[ducks['Country'] == 'France']), check_freq=False)
+    assert cube_monthly_series(cube, countries=['Atlantis']).empty
+
+
+def test_cube_is_rebuilt_only_when_an_event_file_changes(event_files, tmp_path, monkeypatch):
+    cube_file = str(tmp_path / 'cube.csv')
+    first = ensure_cube(event_files, cube_file)
+
+    builds = []
+    monkeypatch.setattr(aggregate_cube, 'build_cube',
+                        lambda events: builds.append(len(events)) or first)
+    os.utime(event_files[0])
+    ensure_cube(event_files, cube_file)
+    assert builds == []
+
+    with open(event_files[1]) as f:
+        lines = f.readlines()
+    with open(event_files[1], 'w') as f:
+        f.writelines(lines[:-10])
+    ensure_cube(event_files, cube_file)
+    assert builds == [sum(len(read_outbreak_csv(p)) for p in event_files)]
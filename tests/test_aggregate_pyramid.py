@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+from data_processing.aggregate_cube import cube_monthly_series, ensure_cube
+from data_processing.aggregate_pyramid import level_series, load_level, resolve_level
+from data_processing.schema import read_outbreak_csv
+from visualization.plot_outbreak_trends import CONTROL_DATA, FRANCE_DATA
+
+EVENT_FILES = [FRANCE_DATA, CONTROL_DATA]
+
+
+def resampled(dates, rule, **kwargs):
+    series = pd.Series(1, index=pd.DatetimeIndex(dates)).resample(rule, **kwargs).sum()
+    return series.astype('int64').rename(None).rename_axis(None)
+
+
+@pytest.fixture(scope='module')
+def france_dates():
+    events = read_outbreak_csv(FRANCE_DATA)
+    return events['observation date'].dropna().dt.tz_convert('UTC').dt.normalize().sort_values()
+
+
+def test_levels_match_resampled_events(tmp_path, france_dates):
+    expected = {
+        'day': resampled(france_dates, 'D'),
+        'week': resampled(france_dates, 'W-MON', label='left', closed='left'),
+        'month': resampled(france_dates, 'ME'),
+    }
+    for level, series in expected.items():
+        counts = load_level(level, EVENT_FILES, str(tmp_path))
+        pd.testing.assert_series_equal(level_series(counts, countries=['France']), series, check_freq=False)
+
+    seasons = france_dates.dt.year - (france_dates.dt.month < 10)
+    by_season = seasons.value_counts().sort_index()
+    season_series = level_series(load_level('season', EVENT_FILES, str(tmp_path)), countries=['France'])
+    assert season_series.index.strftime('%m-%d').unique().tolist() == ['10-01']
+    assert season_series[season_series > 0].tolist() == by_season.tolist()
+    assert season_series.index.year[season_series > 0].tolist() == by_season.index.tolist()
+
+
+def test_month_level_matches_the_cube(tmp_path):
+    cube = ensure_cube(EVENT_FILES, str(tmp_path / 'cube.csv'))
+    counts = load_level('M', EVENT_FILES, str(tmp_path / 'pyramid'))
+    for kwargs in ({'countries': ['France']}, {'exclude_countries': ['France']},
+                   {'species_groups': ['Duck'], 'countries': ['France']}):
+        pd.testing.assert_series_equal(level_series(counts, **kwargs), cube_monthly_series(cube, **kwargs),
+                                       check_freq=False)
+
+
+def test_frequency_aliases():
+    assert [resolve_level(f) for f in ('D', 'W', 'ME', 'season')] == ['day', 'week', 'month', 'season']
+    with pytest.raises(ValueError, match='Unknown frequency'):
+        resolve_level('fortnight')
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.run_benchmarks import compare, load_baselines, run_benchmarks, save_baselines
+from benchmarks.synthetic_data import RAW_COLUMNS, ExportProfile, generate_export
+from data_processing.extract_french_hpai_data import extract_french_data
+from data_processing.schema import read_outbreak_csv
+
+
+@pytest.fixture(scope='module')
+def profile():
+    return ExportProfile.from_export()
+
+
+def test_generated_export_follows_the_profile(tmp_path, profile):
+    path = generate_export(2500, str(tmp_path / 'synthetic.csv'), profile, seed=1, chunk_rows=1000)
+    events = read_outbreak_csv(path)
+    assert list(pd.read_csv(path, nrows=0).columns) == RAW_COLUMNS
+    assert len(events) == 2500 and events['Event ID'].is_unique
+    assert set(events['Country']) <= set(profile.countries)
+    assert ((events['report date'] - events['observation date']).dt.days.dropna() >= 0).all()
+    observed = events['observation date'].dropna().dt.tz_convert('UTC').dt.tz_localize(None)
+    assert observed.min() >= profile.days[0] and observed.max() <= profile.days[-1]
+
+    # the country mix of the real export, within sampling noise
+    shares = events['Country'].value_counts(normalize=True).reindex(profile.countries, fill_value=0)
+    assert np.abs(shares.to_numpy() - profile.country_weights).max() < 0.05
+
+    again = generate_export(2500, str(tmp_path / 'again.csv'), profile, seed=1, chunk_rows=1000)
+    with open(path) as first, open(again) as second:
+        assert first.read() == second.read()
+
+
+def test_generated_export_feeds_the_extract_stage(tmp_path, profile):
+    path = generate_export(2000, str(tmp_path / 'raw' / 'synthetic.csv'), profile, seed=2)
+    france = extract_french_data(path, str(tmp_path / 'processed' / 'france.csv'))
+    expected = (read_outbreak_csv(path)['Country'] == 'France').sum()
+    assert len(france) == expected > 0
+    assert france['observation date'].dropna().is_monotonic_increasing
+
+
+def test_compare_flags_only_real_regressions(tmp_path):
+    baseline_file = str(tmp_path / 'baselines.json')
+    save_baselines({'extract@10000': {'seconds': 1.0, 'max_rss_mb': 200.0, 'peak_growth_mb': 20.0}},
+                   baseline_file)
+    save_baselines({'its@10000': {'seconds': 0.01, 'max_rss_mb': 150.0, 'peak_growth_mb': 5.0}}, baseline_file)
+    baselines = load_baselines(baseline_file)
+    assert list(baselines['results']) == ['extract@10000', 'its@10000']
+
+    regressions = compare({
+        'extract@10000': {'seconds': 1.6, 'max_rss_mb': 260.0, 'peak_growth_mb': 80.0},
+        # three times slower, but by less than MIN_SECONDS
+        'its@10000': {'seconds': 0.03, 'max_rss_mb': 151.0, 'peak_growth_mb': 6.0},
+        'figures@10000': {'seconds': 9.0, 'max_rss_mb': 900.0, 'peak_growth_mb': 500.0},
+    }, baselines)
+    assert regressions == ['extract@10000: 1.600s vs baseline 1.000s',
+                           'extract@10000: peak RSS 260.0 MB vs baseline 200.0 MB']
+    assert load_baselines(str(tmp_path / 'missing.json')) == {'machine': None, 'results': {}}
+
+
+def test_run_benchmarks_measures_the_requested_stage(tmp_path):
+    results = run_benchmarks([500], stages=['extract'], data_dir=str(tmp_path))
+    assert list(results) == ['extract@500']
+    assert results['extract@500']['seconds'] > 0 and results['extract@500']['max_rss_mb'] > 0
+    assert results['extract@500']['peak_growth_mb'] >= 0
@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from analysis.hpai_stats_analysis import OutbreakAnalysis
+from cli import CONTROL_DATA, FRANCE_DATA, main
+
+
+@pytest.mark.parametrize('freq', ['week', 'month'])
+def test_export_uses_requested_frequency(tmp_path, freq):
+    output = tmp_path / 'export.json'
+    assert main(['--freq', freq, 'export', '--output', str(output)]) == 0
+    exported = json.loads(output.read_text())
+
+    expected = OutbreakAnalysis(FRANCE_DATA, CONTROL_DATA, freq=freq).calculate_period_statistics()
+    by_key = {(row['period'], row['series']): row for row in exported['period_statistics']}
+    assert len(by_key) == len(expected)
+    for (period, series), row in expected.iterrows():
+        assert by_key[(period, series)]['months'] == row['months']
+        assert by_key[(period, series)]['mean'] == pytest.approx(row['mean'])
+
+
+@pytest.mark.parametrize('command', [['stats', '--streaming'], ['its', '--by', 'Country'],
+                                     ['its', '--leave-one-out']])
+def test_monthly_only_options_reject_other_frequencies(command, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(['--freq', 'week'] + command)
+    assert exit_info.value.code == 2
+    assert 'only works on monthly series, not --freq week' in capsys.readouterr().err
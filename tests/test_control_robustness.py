@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.api as sm
+
+from analysis.control_robustness import leave_one_country_out
+from analysis.its_batch import its_design_matrix, monthly_series_frame
+from analysis.itsa_analysis import ITSAnalysis
+from analysis.study_periods import VACCINATION_START
+from data_processing.aggregate_cube import cube_monthly_series, ensure_cube
+from visualization.plot_outbreak_trends import CONTROL_DATA, FRANCE_DATA
+
+
+@pytest.fixture(scope='module')
+def cube(tmp_path_factory):
+    return ensure_cube([FRANCE_DATA, CONTROL_DATA], str(tmp_path_factory.mktemp('cube') / 'cube.csv'))
+
+
+def test_full_pool_reproduces_the_its_analysis(cube):
+    table = leave_one_country_out(monthly_series_frame(cube, by='Country'))
+    france = cube_monthly_series(cube, countries=['France'])
+    control = cube_monthly_series(cube, exclude_countries=['France'])
+    results = ITSAnalysis(france, control).results()
+
+    full = table.iloc[0]
+    assert pd.isna(full['dropped_country']) and full['did_shift'] == 0
+    assert full['did_effect'] == pytest.approx(results.did_effect, rel=1e-10)
+    assert full['control_level_change'] == pytest.approx(results.params[1, 2], rel=1e-10)
+    assert table['dropped_share'].iloc[1:].sum() == pytest.approx(1)
+
+
+def test_each_row_matches_a_refiltered_control(cube):
+    table = leave_one_country_out(monthly_series_frame(cube, by='Country'))
+    france = cube_monthly_series(cube, countries=['France'])
+    pooled = cube_monthly_series(cube, exclude_countries=['France'])
+    months = slice(max(france.index.min(), pooled.index.min()), min(france.index.max(), pooled.index.max()))
+    X = its_design_matrix(france[months].index, VACCINATION_START)
+    france_level = sm.OLS(france[months].to_numpy(dtype=float), X).fit().params[2]
+
+    for row in table.iloc[1:].itertuples():
+        control = cube_monthly_series(cube, exclude_countries=['France', row.dropped_country])
+        control = control.reindex(france[months].index, fill_value=0).to_numpy(dtype=float)
+        reference = sm.OLS(control, X).fit()
+        np.testing.assert_allclose([row.control_level_change, row.control_slope_p, row.did_effect],
+                                   [reference.params[2], reference.pvalues[3],
+                                    france_level - reference.params[2]], rtol=1e-8, atol=1e-10)
+
+
+def test_needs_a_control_country(cube):
+    frame = monthly_series_frame(cube, by='Country')[['France']]
+    with pytest.raises(ValueError, match='No control countries'):
+        leave_one_country_out(frame)
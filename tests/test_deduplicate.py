@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.sparse.csgraph import connected_components
+
+from data_processing.deduplicate import candidate_pairs, deduplicate_events, find_duplicates
+from data_processing.spatial_index import haversine_km
+
+
+def brute_force_pairs(lat, lon, days, distance_km, window_days):
+    i, j = np.triu_indices(len(lat), k=1)
+    close = ((haversine_km(lat[i], lon[i], lat[j], lon[j]) <= distance_km)
+             & (np.abs(days[i] - days[j]) <= window_days))
+    return set(zip(i[close].tolist(), j[close].tolist()))
+
+
+def clustered_events(rng, n=600):
+    # a few dense farms around the world, including ones straddling the antimeridian and near a pole
+    centres = np.array([[48.1, -1.7], [44.0, 1.2], [-0.5, 179.999], [89.9, 30.0], [52.0, 5.0]])
+    centre = centres[rng.integers(0, len(centres), n)]
+    lat = np.clip(centre[:, 0] + rng.normal(0, 0.01, n), -90, 90)
+    lon = (centre[:, 1] + rng.normal(0, 0.01, n) + 180) % 360 - 180
+    return pd.DataFrame({
+        'Event ID': rng.permutation(n) + 1000,
+        'Country': rng.choice(['France', 'Belgium'], n, p=[0.8, 0.2]),
+        'Locality': rng.choice(['Saint-Jean', 'saint jean', 'Lannion'], n),
+        'latitude': lat, 'longitude': lon,
+        'observation date': pd.Timestamp('2023-01-01', tz='UTC') + pd.to_timedelta(rng.integers(0, 60, n), unit='D'),
+        'report date': pd.Timestamp('2023-03-15', tz='UTC') + pd.to_timedelta(rng.integers(0, 5, n), unit='D'),
+        'Species': rng.choice(['Duck', 'Gallus gallus'], n),
+    })
+
+
+@pytest.mark.parametrize('distance_km, window_days', [(1.0, 2), (0.3, 0), (5.0, 7)])
+def test_candidate_pairs_cover_every_close_pair(distance_km, window_days):
+    rng = np.random.default_rng(0)
+    events = clustered_events(rng).sort_values('observation date', kind='stable')
+    lat, lon = events['latitude'].to_numpy(), events['longitude'].to_numpy()
+    days = (events['observation date'] - pd.Timestamp('1970-01-01', tz='UTC')).dt.days.to_numpy()
+
+    pairs = candidate_pairs(lat, lon, days, distance_km, window_days)
+    candidates = set(map(tuple, pairs.tolist()))
+    assert len(candidates) == len(pairs) and all(i < j for i, j in candidates)
+    assert brute_force_pairs(lat, lon, days, distance_km, window_days) <= candidates
+    # the grid prunes most pairs
+    assert len(pairs) < len(lat) * (len(lat) - 1) / 2 / 4
+
+    with pytest.raises(ValueError, match='sorted'):
+        candidate_pairs(lat, lon, days[::-1], distance_km, window_days)
+
+
+def test_find_duplicates_matches_brute_force_clusters():
+    rng = np.random.default_rng(1)
+    events = clustered_events(rng)
+    events.loc[rng.choice(len(events), 20, replace=False), 'latitude'] = np.nan
+    decisions = find_duplicates(events)
+
+    usable = events.dropna(subset=['latitude', 'longitude'])
+    lat, lon = usable['latitude'].to_numpy(), usable['longitude'].to_numpy()
+    days = (usable['observation date'] - pd.Timestamp('1970-01-01', tz='UTC')).dt.days.to_numpy()
+    locality = usable['Locality'].str.upper().str.replace('-', ' ').to_numpy()
+    country = usable['Country'].to_numpy()
+    pairs = [(i, j) for i, j in brute_force_pairs(lat, lon, days, 1.0, 2)
+             if country[i] == country[j] and locality[i] == locality[j]]
+    i, j = np.array(pairs).T
+    graph = np.zeros((len(usable), len(usable)), dtype=np.int8)
+    graph[i, j] = 1
+    labels = connected_components(graph, directed=False)[1]
+
+    members = usable.assign(cluster=labels)[np.bincount(labels)[labels] > 1]
+    kept = members.sort_values(['report date', 'Event ID']).groupby('cluster').head(1)
+    expected = set(members.index) - set(kept.index)
+    assert set(decisions['row']) == expected
+    assert set(decisions['kept_event_id']) == set(kept['Event ID'])
+    assert (decisions['distance_km'] <= 1.0 * (decisions['cluster_size'] - 1)).all()
+    assert not decisions['row'].isin(events.index[events['latitude'].isna()]).any()
+
+
+def test_deduplicate_keeps_the_first_report_in_original_order():
+    events = pd.DataFrame({
+        'Event ID': [3, 1, 2, 4, 5],
+        'Country': ['France', 'France', 'France', 'France', 'Belgium'],
+        'Locality': ['Lannion', 'LANNION', 'Lannion', 'Lannion', 'Lannion'],
+        'latitude': [48.7320, 48.7325, 48.7330, 48.7400, 48.7320],
+        'longitude': [-3.4560, -3.4565, -3.4570, -3.4560, -3.4560],
+        'observation date': pd.to_datetime(['2023-01-01', '2023-01-02', '2023-01-03', '2023-02-01',
+                                            '2023-01-01'], utc=True),
+        'report date': pd.to_datetime(['2023-01-05', '2023-01-04', '2023-01-04', '2023-02-03',
+                                       '2023-01-05'], utc=True),
+        'Species': ['Duck'] * 5,
+    })
+    kept, decisions = deduplicate_events(events)
+    # 1 and 2 share the earliest report date; the lower Event ID wins
+    assert kept['Event ID'].tolist() == [1, 4, 5]
+    assert decisions['dropped_event_id'].tolist() == [2, 3]
+    assert (decisions['kept_event_id'] == 1).all() and (decisions['cluster_size'] == 3).all()
+
+    assert len(find_duplicates(events, match_locality=False)) == 2
+    assert find_duplicates(events, window_days=0).empty
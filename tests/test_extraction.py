@@ -0,0 +1,64 @@
+import os
+
+import pandas as pd
+import pytest
+
+from data_processing.extract_french_hpai_data import extract_french_data
+from data_processing.process_control_group import process_control_group
+from data_processing.streaming_ingest import stream_control_group, stream_french_data
+
+RAW_EXPORT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          'data', 'raw', 'europe_hpai_bird_outbreaks.csv')
+
+
+@pytest.fixture
+def raw_file(tmp_path):
+    # a slice of the real export, with many events sharing an observation date
+    path = tmp_path / 'raw' / 'export.csv'
+    path.parent.mkdir()
+    pd.read_csv(RAW_EXPORT).iloc[::4].to_csv(path, index=False)
+    return str(path)
+
+
+def export_order(raw_file, france):
+    raw = pd.read_csv(raw_file, parse_dates=['observation date'])
+    rows = raw[(raw['Country'] == 'France') == france]
+    return rows.sort_values('observation date', kind='stable')['Event ID'].tolist()
+
+
+def test_same_day_events_keep_export_order(raw_file, tmp_path):
+    france = extract_french_data(raw_file, str(tmp_path / 'france.csv'))
+    control = process_control_group(raw_file, str(tmp_path / 'control.csv'))
+    assert france['observation date'].duplicated().any()
+    assert france['Event ID'].tolist() == export_order(raw_file, france=True)
+    assert control['Event ID'].tolist() == export_order(raw_file, france=False)
+
+
+def test_reextraction_and_streaming_write_identical_files(raw_file, tmp_path):
+    extract_french_data(raw_file, str(tmp_path / 'france.csv'))
+    process_control_group(raw_file, str(tmp_path / 'control.csv'))
+    first = {name: (tmp_path / name).read_text() for name in ('france.csv', 'control.csv')}
+
+    extract_french_data(raw_file, str(tmp_path / 'france.csv'))
+    process_control_group(raw_file, str(tmp_path / 'control.csv'))
+    stream_french_data(raw_file, str(tmp_path / 'france_stream.csv'), str(tmp_path / 'france.json'),
+                       chunksize=100)
+    stream_control_group(raw_file, str(tmp_path / 'control_stream.csv'), str(tmp_path / 'control.json'),
+                         chunksize=100)
+
+    for name in ('france', 'control'):
+        assert (tmp_path / f'{name}.csv').read_text() == first[f'{name}.csv']
+        assert (tmp_path / f'{name}_stream.csv').read_text() == first[f'{name}.csv']
+
+
+def test_one_pass_extraction_matches_single_country_extracts(raw_file, tmp_path):
+    from data_processing.extract_countries import extract_countries
+
+    outputs = extract_countries(raw_file, str(tmp_path / 'multi'), ['France'], control_for=['France'])
+    extract_french_data(raw_file, str(tmp_path / 'france.csv'))
+    process_control_group(raw_file, str(tmp_path / 'control.csv'))
+
+    with open(outputs['France']['csv']) as f:
+        assert f.read() == (tmp_path / 'france.csv').read_text()
+    with open(outputs['excl_France']['csv']) as f:
+        assert f.read() == (tmp_path / 'control.csv').read_text()
@@ -0,0 +1,101 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from data_processing import extract_french_hpai_data as extract
+from data_processing import process_control_group as control
+from data_processing.incremental_ingest import incremental_update
+
+RAW_EXPORT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          'data', 'raw', 'europe_hpai_bird_outbreaks.csv')
+
+
+def build(raw, directory):
+    """
+    Full extract of a raw export (read as text) into directory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    raw_file = os.path.join(directory, 'raw.csv')
+    raw.to_csv(raw_file, index=False)
+    paths = {name: os.path.join(directory, name) for name in
+             ('france.csv', 'france.json', 'control.csv', 'control.json')}
+    extract.group_and_convert_to_json(extract.extract_french_data(raw_file, paths['france.csv']),
+                                      paths['france.json'])
+    control.group_and_convert_to_json(control.process_control_group(raw_file, paths['control.csv']),
+                                      paths['control.json'])
+    return paths
+
+
+def apply_delta(paths, delta, directory):
+    delta_file = os.path.join(directory, 'delta.csv')
+    delta.to_csv(delta_file, index=False)
+    return incremental_update(delta_file, france_csv=paths['france.csv'], france_json=paths['france.json'],
+                              control_csv=paths['control.csv'], control_json=paths['control.json'])
+
+
+def read_outputs(paths):
+    outputs = {}
+    for name, path in paths.items():
+        with open(path) as f:
+            outputs[name] = json.load(f) if name.endswith('.json') else f.read()
+    return outputs
+
+
+@pytest.fixture
+def raw():
+    return pd.read_csv(RAW_EXPORT, dtype=str, keep_default_na=False)
+
+
+@pytest.mark.parametrize('moves_first_outbreak', [False, True])
+def test_incremental_update_matches_full_rebuild(raw, tmp_path, moves_first_outbreak):
+    base = raw.iloc[::3]
+    new_events = raw.iloc[1::3].iloc[::8]
+
+    def revised(country, column, value, nth=0):
+        row = base[base['Country'] == country].iloc[[nth]].copy()
+        row[column] = value
+        return row
+
+    delta = pd.concat([
+        revised('Italy', 'Species', 'Domestic,Duck,'),
+        revised('France', 'Country', 'Belgium'),
+        revised('Belgium', 'Country', 'France'),
+        revised('Hungary', 'observation date', '2024-02-29T00:00:00Z', nth=5),
+        # an earlier first outbreak shifts days_since_first_outbreak on every row
+        revised('Germany', 'observation date', '2020-01-01T00:00:00Z' if moves_first_outbreak
+                else '2023-01-10T00:00:00Z'),
+        new_events,
+    ])
+    # the full rebuild re-extracts the export with the delta appended,
+    # superseding earlier rows of the same events
+    updated = pd.concat([base[~base['Event ID'].isin(delta['Event ID'])], delta])
+
+    incremental = build(base, tmp_path / 'incremental')
+    results = apply_delta(incremental, delta, tmp_path / 'incremental')
+    full = build(updated, tmp_path / 'full')
+
+    assert len(results['treated']['withdrawn_ids']) == 1
+    assert len(results['control']['withdrawn_ids']) == 1
+    assert len(results['control']['changed_ids']) == 3
+    assert read_outputs(incremental) == read_outputs(full)
+
+
+def test_late_treated_events_are_appended(raw, tmp_path):
+    base = raw.iloc[::3]
+    late = base[base['Country'] == 'France'].iloc[:3].copy()
+    late['Event ID'] = ['900001', '900002', '900003']
+    late['observation date'] = ['2030-01-02T00:00:00Z', '2030-01-01T00:00:00Z', '2030-01-02T00:00:00Z']
+
+    incremental = build(base, tmp_path / 'incremental')
+    with open(incremental['france.csv']) as f:
+        before = f.read()
+    results = apply_delta(incremental, late, tmp_path / 'incremental')
+    full = build(pd.concat([base, late]), tmp_path / 'full')
+
+    assert results['treated']['new_ids'] == [900001, 900002, 900003]
+    assert results['control']['new_ids'] == []
+    outputs = read_outputs(incremental)
+    assert outputs['france.csv'].startswith(before)
+    assert outputs == read_outputs(full)
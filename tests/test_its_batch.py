@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.api as sm
+
+from analysis.its_batch import fit_its_batch, its_design_matrix, monthly_series_frame
+from analysis.study_periods import VACCINATION_START as INTERVENTION
+from data_processing.aggregate_cube import ensure_cube
+from visualization.plot_outbreak_trends import CONTROL_DATA, FRANCE_DATA
+
+
+def test_country_fits_match_statsmodels(tmp_path):
+    cube = ensure_cube([FRANCE_DATA, CONTROL_DATA], str(tmp_path / 'cube.csv'))
+    frame = monthly_series_frame(cube, by='Country')
+    assert frame.to_numpy().sum() == cube['outbreak_count'].sum()
+
+    table = fit_its_batch(frame, INTERVENTION)
+    assert len(table) == 4 * frame.shape[1]
+    X = its_design_matrix(frame.index, INTERVENTION)
+    for country in frame.columns:
+        reference = sm.OLS(frame[country].to_numpy(dtype=float), X).fit()
+        rows = table[table['series'] == country]
+        np.testing.assert_allclose(rows['coef'], reference.params, rtol=1e-9, atol=1e-9)
+        np.testing.assert_allclose(rows['std_err'], reference.bse, rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(rows['p_value'], reference.pvalues, rtol=1e-7, atol=1e-12)
+
+
+def test_design_matrix_needs_post_intervention_months():
+    index = pd.date_range('2021-01-31', periods=12, freq='ME', tz='UTC')
+    with pytest.raises(ValueError, match='No observations'):
+        its_design_matrix(index, INTERVENTION)
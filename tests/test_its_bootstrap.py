@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from analysis.its_batch import fit_ols_batch, its_design_matrix
+from analysis.its_bootstrap import block_bootstrap, block_indices, bootstrap_confidence_intervals
+
+INDEX = pd.date_range('2020-01-31', periods=60, freq='ME', tz='UTC')
+
+
+def design_and_outcomes(seed=0):
+    rng = np.random.default_rng(seed)
+    X = its_design_matrix(INDEX, INDEX[36])
+    Y = X @ np.array([[20, 30], [0.2, 0.1], [-6, 1], [0.1, 0]]) + rng.normal(0, 2, (len(INDEX), 2))
+    return X, Y
+
+
+def test_blocks_are_runs_of_consecutive_months():
+    idx = block_indices(np.random.default_rng(0), 200, 60, 4)
+    assert idx.shape == (200, 60) and idx.min() >= 0 and idx.max() < 60
+    blocks = idx.reshape(200, 15, 4)
+    assert (np.diff(blocks, axis=2) == 1).all()
+
+
+def test_replicates_are_refits_on_resampled_residuals():
+    X, Y = design_and_outcomes()
+    replicates, block_length = block_bootstrap(X, Y, n_boot=50, seed=3, chunk_size=50)
+    assert block_length == 4
+
+    fit = fit_ols_batch(X, Y)
+    rng = np.random.default_rng(np.random.SeedSequence(3).spawn(1)[0])
+    idx = block_indices(rng, 50, len(Y), block_length)
+    for r in range(50):
+        Y_star = fit['fittedvalues'].T + fit['resid'].T[idx[r]]
+        np.testing.assert_allclose(replicates[r], np.linalg.lstsq(X, Y_star, rcond=None)[0].T, atol=1e-9)
+
+
+def test_replicates_do_not_depend_on_processes():
+    X, Y = design_and_outcomes()
+    serial, _ = block_bootstrap(X, Y, n_boot=300, chunk_size=100)
+    pooled, _ = block_bootstrap(X, Y, n_boot=300, chunk_size=100, processes=2)
+    np.testing.assert_array_equal(serial, pooled)
+
+
+def test_intervals_agree_with_ols_for_independent_errors():
+    X, Y = design_and_outcomes()
+    table = bootstrap_confidence_intervals(X, Y, ['France', 'Control'], n_boot=4000, block_length=1)
+    assert len(table) == 9 and table.iloc[-1]['series'] == 'DiD'
+    assert (table['ci_lower'] <= table['coef']).all() and (table['coef'] <= table['ci_upper']).all()
+
+    fit = fit_ols_batch(X, Y)
+    # residual resampling shrinks the spread by sqrt(df_resid / n)
+    expected = fit['bse'].ravel() * np.sqrt(fit['df_resid'] / len(Y))
+    np.testing.assert_allclose(table['boot_se'].iloc[:8], expected, rtol=0.1)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.api as sm
+
+from analysis.its_count import count_design_matrix, fit_count_batch, fit_count_its_batch
+
+INDEX = pd.date_range('2020-01-31', periods=60, freq='ME', tz='UTC')
+
+
+def counts(seed=0):
+    rng = np.random.default_rng(seed)
+    X, _ = count_design_matrix(INDEX, INDEX[36])
+    rates = np.exp(X @ np.array([[2.0, 3.0, 1.0], [0.01, -0.005, 0.02], [-0.7, 0.2, 0.0], [0.01, 0.0, -0.02],
+                                 [0.5, 0.3, 0.8], [-0.2, 0.1, 0.4], [0.1, 0.0, 0.0], [0.0, 0.1, 0.2]]))
+    poisson = rng.poisson(rates).astype(float)
+    overdispersed = rng.negative_binomial(2, 2 / (2 + rates)).astype(float)
+    return X, poisson, overdispersed
+
+
+def test_poisson_matches_statsmodels_glm():
+    X, Y, _ = counts()
+    fit = fit_count_batch(X, Y, family='poisson')
+    assert fit['converged'].all() and (fit['alpha'] == 0).all()
+    for j in range(Y.shape[1]):
+        reference = sm.GLM(Y[:, j], X, family=sm.families.Poisson()).fit()
+        np.testing.assert_allclose(fit['params'][j], reference.params, rtol=1e-6, atol=1e-8)
+        np.testing.assert_allclose(fit['bse'][j], reference.bse, rtol=1e-6)
+
+
+def test_negative_binomial_matches_statsmodels_at_the_fitted_dispersion():
+    X, _, Y = counts()
+    fit = fit_count_batch(X, Y, family='negbin')
+    assert (fit['alpha'] > 0.1).all()
+    for j in range(Y.shape[1]):
+        family = sm.families.NegativeBinomial(alpha=fit['alpha'][j])
+        reference = sm.GLM(Y[:, j], X, family=family).fit()
+        # both stop on a relative deviance change of 1e-8
+        np.testing.assert_allclose(fit['params'][j], reference.params, rtol=1e-4, atol=1e-5)
+        np.testing.assert_allclose(fit['bse'][j], reference.bse, rtol=1e-5)
+
+    warm = fit_count_batch(X, Y, family='negbin', start_params=fit['params'])
+    np.testing.assert_allclose(warm['params'], fit['params'], rtol=1e-6, atol=1e-8)
+
+
+def test_tidy_table_and_invalid_input():
+    _, Y, _ = counts()
+    frame = pd.DataFrame(Y, index=INDEX, columns=['France', 'Control', 'Belgium'])
+    table = fit_count_its_batch(frame, INDEX[36], family='poisson')
+    assert len(table) == 3 * 8
+    np.testing.assert_allclose(table['rate_ratio'], np.exp(table['coef']))
+
+    with pytest.raises(ValueError, match='non-negative'):
+        fit_count_batch(np.ones((3, 1)), np.array([1.0, -1.0, 2.0]))
+    with pytest.raises(ValueError, match='Unknown family'):
+        fit_count_batch(np.ones((3, 1)), np.ones(3), family='gamma')
+
+
+def test_weekly_seasonality_varies_within_the_month():
+    weeks = pd.date_range('2019-01-07', periods=260, freq='W-MON', tz='UTC')
+    X, terms = count_design_matrix(weeks, weeks[150])
+    seasonal = pd.DataFrame(X[:, 4:], index=weeks, columns=terms[4:])
+    assert (seasonal.groupby([weeks.year, weeks.month]).nunique() > 1).all().all()
+
+    # an annual cycle peaking in late February is recovered from weekly counts
+    rng = np.random.default_rng(3)
+    truth = np.array([2.0, 0.002, -0.4, 0.0, 0.6, 0.5, 0.0, 0.0])
+    Y = rng.poisson(np.exp(X @ truth)).astype(float)
+    fit = fit_count_batch(X, Y, family='poisson')
+    np.testing.assert_allclose(fit['params'][0, 4:6], truth[4:6], atol=0.06)
+
+    with pytest.raises(ValueError, match='distinct times of year'):
+        count_design_matrix(pd.date_range('2015-10-01', periods=10, freq='YS-OCT', tz='UTC'), '2020-10-01')
+    assert count_design_matrix(weeks, weeks[150], harmonics=0)[0].shape == (260, 4)
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from analysis.its_batch import fit_ols_batch, its_design_matrix
+from analysis.its_placebo import placebo_in_time
+
+
+def series_frame(jump_at=30, jump=25.0, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2020-01-31', periods=54, freq='ME', tz='UTC')
+    france = rng.normal(20, 2, len(index)) + 0.1 * np.arange(len(index))
+    france[jump_at:] += jump
+    control = rng.normal(35, 2, len(index))
+    return pd.DataFrame({'France': france, 'Control': control}, index=index)
+
+
+def test_every_break_matches_a_separate_fit():
+    frame = series_frame()
+    table, _ = placebo_in_time(frame, frame.index[30])
+    for row in table.itertuples():
+        fit = fit_ols_batch(its_design_matrix(frame.index, row.break_date), frame.to_numpy())
+        np.testing.assert_allclose([row.France_level_change, row.France_slope_t, row.Control_level_t],
+                                   [fit['params'][0, 2], fit['tvalues'][0, 3], fit['tvalues'][1, 2]],
+                                   rtol=1e-8)
+        assert np.isclose(row.did_effect, fit['params'][0, 2] - fit['params'][1, 2], rtol=1e-8)
+
+
+def test_actual_break_with_a_jump_ranks_first():
+    frame = series_frame()
+    table, summary = placebo_in_time(frame, frame.index[30])
+    assert summary['rank'] == 1
+    assert summary['placebo_p_value'] == 1 / len(table)
+    assert table['is_actual'].sum() == 1
+
+
+def test_chunked_pool_matches_serial_fit():
+    frame = series_frame()
+    serial, _ = placebo_in_time(frame, frame.index[30])
+    pooled, _ = placebo_in_time(frame, frame.index[30], processes=2, chunk_size=8)
+    pd.testing.assert_frame_equal(serial, pooled)
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.itsa_analysis import ITSAnalysis, run_its_analysis
+from analysis.its_results import ITSResults
+
+
+def monthly_series(seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2021-01-31', '2025-06-30', freq='ME', tz='UTC')
+    france = pd.Series(rng.poisson(20, len(index)).astype(float), index=index)
+    control = pd.Series(rng.poisson(35, len(index)).astype(float), index=index)
+    return france, control
+
+
+def test_batch_analysis_matches_statsmodels():
+    analysis = ITSAnalysis(*monthly_series())
+    reference = analysis.perform_analysis()
+    batch = analysis.perform_batch_analysis()
+
+    for s, name in enumerate(['france_results', 'control_results']):
+        np.testing.assert_allclose(batch['params'][s], reference[name].params, rtol=1e-10)
+        np.testing.assert_allclose(batch['bse'][s], reference[name].bse, rtol=1e-10)
+        np.testing.assert_allclose(batch['pvalues'][s], reference[name].pvalues, rtol=1e-8, atol=1e-12)
+    assert batch['did_effect'] == pytest.approx(reference['did_effect'], rel=1e-10)
+
+
+def test_results_are_shared_and_match_batch_fit():
+    france, control = monthly_series()
+    results = ITSAnalysis(france, control).results()
+    assert ITSAnalysis(france.copy(), control.copy()).results() is results
+    assert not results.params.flags.writeable
+    batch = ITSAnalysis(france, control).perform_batch_analysis()
+    np.testing.assert_allclose(results.params, batch['params'])
+    assert results.did_effect == pytest.approx(batch['did_effect'])
+
+
+def test_run_its_analysis_fits_once(tmp_path, monkeypatch):
+    import analysis.itsa_analysis as itsa
+
+    france, control = monthly_series(seed=1)
+    monkeypatch.setattr(itsa, 'treated_and_control_series', lambda paths, freq: (france, control))
+
+    def refit(self):
+        raise AssertionError("run_its_analysis should not refit with statsmodels")
+    monkeypatch.setattr(ITSAnalysis, 'perform_analysis', refit)
+
+    results = run_its_analysis('france.csv', 'control.csv', output_dir=str(tmp_path))
+    assert isinstance(results, ITSResults)
+    assert results is ITSAnalysis(france, control).results()
+    assert (tmp_path / 'vaccination_impact.png').exists()
+    assert 'Pre-Vaccination' in (tmp_path / 'statistical_report.txt').read_text()
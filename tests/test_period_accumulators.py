@@ -0,0 +1,73 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.hpai_stats_analysis import OutbreakAnalysis
+from analysis.study_periods import VACCINATION_END, VACCINATION_START
+from data_processing.aggregate_cube import ensure_cube
+from data_processing.period_accumulators import PeriodStatisticsStore, RunningStats
+from visualization.plot_outbreak_trends import CONTROL_DATA, FRANCE_DATA
+
+
+def assert_matches_pandas(acc, values):
+    values = pd.Series(values, dtype=float)
+    assert acc.n == len(values) and acc.total == values.sum()
+    assert acc.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert acc.std() == pytest.approx(values.std(), rel=1e-9)
+    assert acc.median() == values.median()
+
+
+def test_running_stats_match_pandas():
+    rng = np.random.default_rng(0)
+    values = rng.poisson(12, 500).tolist()
+    first, second = RunningStats(), RunningStats()
+    for x in values[:180]:
+        first.add(x)
+    for x in values[180:]:
+        second.add(x)
+    merged = RunningStats.from_dict(first.to_dict()).merge(second)
+    assert_matches_pandas(merged, values)
+
+    # revise a few counts in place, as a late report would
+    for position in rng.choice(len(values), 40, replace=False):
+        merged.remove(values[position])
+        values[position] += int(rng.integers(-3, 4))
+        merged.add(values[position])
+    assert_matches_pandas(merged, values)
+    for x in values[:-2]:
+        merged.remove(x)
+    assert_matches_pandas(merged, values[-2:])
+
+    with pytest.raises(ValueError):
+        merged.remove(10_000)
+
+
+def test_store_matches_period_statistics():
+    analysis = OutbreakAnalysis(FRANCE_DATA, CONTROL_DATA)
+    expected = analysis.calculate_period_statistics()
+    pd.testing.assert_frame_equal(analysis.streaming_period_statistics(), expected,
+                                  check_dtype=False, check_exact=False, rtol=1e-12)
+
+
+def test_applied_changes_match_a_rebuilt_store(tmp_path):
+    cube = ensure_cube([FRANCE_DATA, CONTROL_DATA], str(tmp_path / 'cube.csv'))
+    store = PeriodStatisticsStore.from_cube(cube, VACCINATION_START, VACCINATION_END)
+    store = PeriodStatisticsStore.from_dict(store.to_dict())
+
+    france_months = sorted(m for m, n in store.counts['France'].items() if n > 0)
+    changes = Counter({
+        ('France', france_months[0]): -store.counts['France'][france_months[0]],  # shrinks the range
+        ('France', '2024-02'): 3,
+        ('Belgium', '2023-11'): 2,
+        ('Atlantis', '2022-05'): 1,                                                 # a new country
+    })
+    store.apply(changes)
+
+    counts = {series: Counter(c) for series, c in store.counts.items()}
+    rebuilt = PeriodStatisticsStore(counts, VACCINATION_START, VACCINATION_END)
+    assert store.months == rebuilt.months
+    for series in ('France', 'Control', 'Belgium', 'Atlantis'):
+        pd.testing.assert_frame_equal(store.table([series]), rebuilt.table([series]),
+                                      check_exact=False, rtol=1e-9)
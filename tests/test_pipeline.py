@@ -0,0 +1,58 @@
+import importlib.util
+import os
+
+import pipeline
+from pipeline import Pipeline, Stage, source_closure
+
+
+def load_module(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_source_closure_follows_src_imports():
+    from analysis import itsa_analysis
+    from data_processing import extract_french_hpai_data
+
+    its_files = {os.path.relpath(p, pipeline.SRC_DIR) for p in source_closure([itsa_analysis])}
+    assert {os.path.join('analysis', 'its_results.py'), os.path.join('analysis', 'its_batch.py'),
+            os.path.join('data_processing', 'aggregate_pyramid.py'),
+            os.path.join('data_processing', 'schema.py')} <= its_files
+    extract_files = {os.path.relpath(p, pipeline.SRC_DIR)
+                     for p in source_closure([extract_french_hpai_data])}
+    assert os.path.join('data_processing', 'deduplicate.py') in extract_files
+
+
+def test_stage_reruns_when_an_imported_module_changes(tmp_path, monkeypatch):
+    src = tmp_path / 'src'
+    (src / 'lib').mkdir(parents=True)
+    (src / 'lib' / 'helper.py').write_text("SCALE = 1\n")
+    (src / 'stage_code.py').write_text("def run():\n    from lib.helper import SCALE\n    return SCALE\n")
+    monkeypatch.setattr(pipeline, 'SRC_DIR', str(src))
+    stage_code = load_module(src / 'stage_code.py', 'stage_code')
+
+    source = tmp_path / 'input.txt'
+    source.write_text("a\n")
+    output = tmp_path / 'output.txt'
+    runs = []
+
+    def run():
+        runs.append(1)
+        output.write_text(source.read_text())
+
+    def make_pipeline():
+        stage = Stage('copy', run, inputs=[str(source)], outputs=[str(output)], modules=[stage_code])
+        return Pipeline([stage], state_file=str(tmp_path / 'state.json'))
+
+    assert make_pipeline().run() == {'copy': 'ran'}
+    assert make_pipeline().run() == {'copy': 'skipped'}
+
+    (src / 'lib' / 'helper.py').write_text("SCALE = 2\n")
+    assert make_pipeline().run() == {'copy': 'ran'}
+
+    source.write_text("b\n")
+    assert make_pipeline().run(dry_run=True) == {'copy': 'stale'}
+    assert make_pipeline().run() == {'copy': 'ran'}
+    assert len(runs) == 3
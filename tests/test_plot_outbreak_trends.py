@@ -0,0 +1,20 @@
+import os
+import subprocess
+import sys
+
+from visualization.plot_outbreak_trends import CONTROL_DATA, FRANCE_DATA, generate_all_figures
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_generates_every_figure(tmp_path):
+    generate_all_figures(FRANCE_DATA, CONTROL_DATA, output_dir=str(tmp_path), processes=1)
+    assert sorted(os.listdir(tmp_path)) == [
+        'comparative_timeline_with_vaccination.png', 'outbreak_severity_boxplot.png',
+        'relative_change.png', 'rolling_average_comparison.png']
+
+
+def test_figure_module_does_not_import_seaborn():
+    code = ("import sys; sys.path.insert(0, 'src'); import visualization.plot_outbreak_trends; "
+            "assert 'seaborn' not in sys.modules")
+    subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT, check=True)
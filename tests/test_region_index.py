@@ -0,0 +1,67 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from matplotlib.path import Path
+
+from data_processing.outbreak_cache import read_events
+from data_processing.region_index import REGIONS_FILE, RegionIndex, region_monthly_frame
+from visualization.plot_outbreak_trends import CONTROL_DATA, FRANCE_DATA
+
+SQUARE = [[0, 0], [4, 0], [4, 4], [0, 4], [0, 0]]
+HOLE = [[1, 1], [1, 3], [3, 3], [3, 1], [1, 1]]
+TRIANGLE = [[5, 0], [8, 0], [6.5, 3], [5, 0]]
+ISLAND = [[9, 3], [10, 3], [10, 4], [9, 3]]
+
+
+@pytest.fixture
+def regions_file(tmp_path):
+    features = [
+        {'type': 'Feature', 'properties': {'code': 'A'},
+         'geometry': {'type': 'Polygon', 'coordinates': [SQUARE, HOLE]}},
+        {'type': 'Feature', 'properties': {'code': 'B'},
+         'geometry': {'type': 'MultiPolygon', 'coordinates': [[TRIANGLE], [ISLAND]]}},
+    ]
+    path = tmp_path / 'regions.geojson'
+    path.write_text(json.dumps({'type': 'FeatureCollection', 'features': features}))
+    return str(path)
+
+
+def test_assign_matches_polygon_containment(regions_file):
+    rng = np.random.default_rng(0)
+    lon, lat = rng.uniform(-1, 11, 20000), rng.uniform(-1, 5, 20000)
+    points = np.column_stack([lon, lat])
+    in_a = Path(SQUARE).contains_points(points) & ~Path(HOLE).contains_points(points)
+    in_b = Path(TRIANGLE).contains_points(points) | Path(ISLAND).contains_points(points)
+
+    regions = RegionIndex.from_geojson(regions_file).assign(lat, lon)
+    expected = np.where(in_a, 'A', np.where(in_b, 'B', None))
+    assert (regions == expected).all()
+
+
+def test_bundled_departments_cover_french_events_only():
+    index = RegionIndex.from_geojson(REGIONS_FILE)
+    assert len(index) == 96 and {'2A', '2B', '40', '64'} <= set(index.region_ids)
+
+    france = read_events(FRANCE_DATA, columns=['latitude', 'longitude', 'Locality'])
+    departments = pd.Series(index.assign(france['latitude'], france['longitude']))
+    assert departments.notna().all()
+    # the commune's postcode or INSEE code names its department; the one
+    # mismatch is Saint-Gein (Landes), whose longitude has the wrong sign
+    postcode = france['Locality'].str.extract(r'\((\d\d)\d{3}\)')[0]
+    checked = postcode.notna()
+    mismatched = france['Locality'][checked & (departments != postcode)]
+    assert checked.sum() > 200 and mismatched.str.contains('SAINT-GEIN').all() and len(mismatched) <= 1
+
+    control = read_events(CONTROL_DATA, columns=['latitude', 'longitude'])
+    assert pd.isna(index.assign(control['latitude'], control['longitude'])).all()
+
+
+def test_region_monthly_frame_counts_every_french_event():
+    frame = region_monthly_frame([FRANCE_DATA, CONTROL_DATA])
+    dated = read_events(FRANCE_DATA, columns=['observation date'])['observation date'].notna().sum()
+    assert frame.to_numpy().sum() == dated
+    # the southwestern departments the vaccination campaign targeted
+    assert {'32', '40', '64'} <= set(frame.columns) <= set(RegionIndex.from_geojson(REGIONS_FILE).region_ids)
+    assert (frame.index == pd.date_range(frame.index[0], frame.index[-1], freq='ME', tz='UTC')).all()
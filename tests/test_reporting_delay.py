@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.its_batch import monthly_series_frame
+from analysis.reporting_delay import (ReportingDelayModel, delay_cdfs, nowcast_country_frame,
+                                      nowcast_treated_and_control)
+from data_processing.aggregate_cube import ensure_cube
+from visualization.plot_outbreak_trends import CONTROL_DATA, FRANCE_DATA
+
+MAX_DELAY = 60
+
+
+def truncated_sample(rng, n, horizon):
+    """Geometric delays (mean 9 days) over horizon days, keeping those reported by its end."""
+    observed = rng.integers(0, horizon, n)
+    delays = np.minimum(rng.geometric(0.1, n) - 1, MAX_DELAY)
+    ages = horizon - 1 - observed
+    seen = delays <= ages
+    return delays[seen], ages[seen]
+
+
+def test_fully_observed_delays_give_the_empirical_cdf():
+    rng = np.random.default_rng(0)
+    delays = rng.integers(0, MAX_DELAY + 1, 400)
+    groups = rng.integers(0, 3, 400)
+    cdf = delay_cdfs(delays, np.full(400, 10 * MAX_DELAY), groups, 3, MAX_DELAY)
+    for g in range(3):
+        empirical = np.searchsorted(np.sort(delays[groups == g]), np.arange(MAX_DELAY + 1), side='right')
+        np.testing.assert_allclose(cdf[g], empirical / (groups == g).sum(), atol=1e-12)
+
+
+def test_right_truncation_is_corrected():
+    rng = np.random.default_rng(1)
+    delays, ages = truncated_sample(rng, 20_000, horizon=90)
+    d = np.arange(MAX_DELAY + 1)
+    true_cdf = (1 - 0.9 ** (d + 1)) / (1 - 0.9 ** (MAX_DELAY + 1))
+
+    cdf = delay_cdfs(delays, ages, np.zeros(len(delays)), 1, MAX_DELAY)[0]
+    naive = np.searchsorted(np.sort(delays), d, side='right') / len(delays)
+    assert np.abs(cdf - true_cdf).max() < 0.01
+    # the recent events that are already in only had time for short delays
+    assert (naive - true_cdf)[3:16].min() > 0.03
+
+
+def synthetic_events(rng, countries, n=3000, start='2021-01-01', days=900):
+    observed = pd.Timestamp(start, tz='UTC') + pd.to_timedelta(rng.integers(0, days, n), unit='D')
+    reported = observed + pd.to_timedelta(rng.geometric(0.1, n) - 1, unit='D')
+    cutoff = observed.max()
+    events = pd.DataFrame({'Country': rng.choice(countries, n),
+                           'observation date': observed, 'report date': reported})
+    return events[events['report date'] <= cutoff].reset_index(drop=True)
+
+
+def test_completeness_and_nowcast():
+    rng = np.random.default_rng(2)
+    model = ReportingDelayModel(synthetic_events(rng, ['France', 'Italy']), max_delay=MAX_DELAY, min_events=30)
+    summary = model.summary()
+    assert len(summary) == 2 * 3 and summary['events'].sum() == model.events.sum()
+    assert summary.loc[~summary['pooled'], 'median_delay_days'].between(4, 9).all()
+
+    month_ends = pd.date_range('2022-01-31', model.cutoff.tz_localize(None), freq='ME', tz='UTC')
+    month_ends = month_ends.append(pd.DatetimeIndex([model.cutoff + pd.offsets.MonthEnd(0)]))
+    completeness = model.completeness('France', month_ends)
+    # months older than max_delay are complete; the cutoff month is the least complete
+    assert np.allclose(completeness[:-3], 1)
+    assert completeness[-1] < completeness[-2] < 1 and completeness[-1] > 0
+    np.testing.assert_array_equal(model.completeness('Atlantis', month_ends), 1)
+
+    frame = pd.DataFrame({'France': 10.0, 'Italy': 4.0}, index=month_ends)
+    corrected, table = nowcast_country_frame(frame, model, min_completeness=0.0)
+    np.testing.assert_allclose(corrected['France'], 10 / completeness)
+    np.testing.assert_allclose(table['Italy'], model.completeness('Italy', month_ends))
+
+
+def test_requires_dated_events():
+    missing = pd.Series([pd.NaT], dtype='datetime64[ns, UTC]')
+    events = pd.DataFrame({'Country': ['France'], 'observation date': missing, 'report date': missing})
+    with pytest.raises(ValueError, match='No events'):
+        ReportingDelayModel(events)
+
+
+def test_nowcast_series_never_fall_below_the_observed_counts():
+    files = [FRANCE_DATA, CONTROL_DATA]
+    treated, control, table = nowcast_treated_and_control(files)
+    frame = monthly_series_frame(ensure_cube(files), by='Country')
+
+    np.testing.assert_array_equal(table['treated_observed'], frame['France'])
+    np.testing.assert_array_equal(table['control_observed'], frame.drop(columns='France').sum(axis=1))
+    assert (table['treated_nowcast'] >= table['treated_observed']).all()
+    assert (table['control_nowcast'] >= table['control_observed'] - 1e-9).all()
+    # only the incomplete tail is trimmed, and what is kept is the nowcast
+    months = table.set_index('month')
+    assert treated.index.min() == months.index[months['treated_observed'] > 0].min()
+    np.testing.assert_allclose(treated, months.loc[treated.index, 'treated_nowcast'])
+    assert (months.loc[treated.index, 'treated_completeness'] >= 0.2).all()
+    assert len(control) > 0
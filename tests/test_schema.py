@@ -0,0 +1,47 @@
+import json
+import os
+
+import pandas as pd
+
+from data_processing.outbreak_cache import (
+    MANIFEST_NAME, cache_path_for, is_cache_valid, read_events, store_events)
+from data_processing.schema import read_outbreak_csv
+
+PROCESSED_CSV = """Event ID,latitude,longitude,Country,observation date,days_since_first_outbreak,month_year,country_total_outbreaks
+284880,47.803519,-3.231016,Belgium,2020-12-13 00:00:00+00:00,0,2020-12,249
+284881,43.4716568,1.0000001,Belgium,2020-12-15 00:00:00+00:00,2,2020-12,249
+284882,51.1,4.2,Belgium,,,,249
+"""
+
+
+def test_processed_csv_round_trips_unchanged(tmp_path):
+    source = tmp_path / 'events.csv'
+    source.write_text(PROCESSED_CSV)
+    events = read_outbreak_csv(str(source))
+    assert str(events['country_total_outbreaks'].dtype) == 'Int32'
+    assert str(events['days_since_first_outbreak'].dtype) == 'Int32'
+
+    output = tmp_path / 'written.csv'
+    store_events(events, str(output), cache_dir=str(tmp_path / 'cache'))
+    assert output.read_text() == PROCESSED_CSV
+    cached = read_events(str(output), cache_dir=str(tmp_path / 'cache'))
+    assert cached['latitude'].tolist() == [47.803519, 43.4716568, 51.1]
+    assert cached['country_total_outbreaks'].tolist() == [249, 249, 249]
+
+
+def test_cache_written_under_another_schema_is_rebuilt(tmp_path):
+    source = tmp_path / 'events.csv'
+    source.write_text(PROCESSED_CSV)
+    cache_dir = str(tmp_path / 'cache')
+    read_events(str(source), cache_dir=cache_dir)
+    cache_path = cache_path_for(str(source), cache_dir)
+    assert is_cache_valid(str(source), cache_path)
+
+    manifest_file = os.path.join(cache_path, MANIFEST_NAME)
+    with open(manifest_file) as f:
+        manifest = json.load(f)
+    manifest['schema'] = 'float32-coordinates'
+    with open(manifest_file, 'w') as f:
+        json.dump(manifest, f)
+    assert not is_cache_valid(str(source), cache_path)
+    assert read_events(str(source), cache_dir=cache_dir)['latitude'].dtype == 'float64'
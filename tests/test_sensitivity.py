@@ -0,0 +1,72 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+from analysis import sensitivity
+from analysis.itsa_analysis import ITSAnalysis
+from analysis.sensitivity import query_sensitivity, run_sensitivity, sensitivity_grid
+from analysis.study_periods import VACCINATION_START
+from data_processing.aggregate_pyramid import treated_and_control_series
+from visualization.plot_outbreak_trends import CONTROL_DATA, FRANCE_DATA
+
+EVENT_FILES = [FRANCE_DATA, CONTROL_DATA]
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return {'db_file': str(tmp_path / 'sensitivity.sqlite'), 'pyramid_dir': str(tmp_path / 'pyramid')}
+
+
+def test_campaign_cell_matches_the_its_analysis(paths):
+    cells = sensitivity_grid(starts=[VACCINATION_START], windows=[None], freqs=['month'], controls=['all'])
+    row = run_sensitivity(cells, EVENT_FILES, **paths).iloc[0]
+
+    results = ITSAnalysis(*treated_and_control_series(EVENT_FILES)).results()
+    assert row['n_obs'] == len(results.index)
+    assert row['france_level_change'] == pytest.approx(results.params[0, 2], rel=1e-10)
+    assert row['control_slope_change'] == pytest.approx(results.params[1, 3], rel=1e-10)
+    assert row['did_effect'] == pytest.approx(results.did_effect, rel=1e-10)
+
+
+def test_cached_cells_are_not_refitted(paths, monkeypatch):
+    cells = sensitivity_grid(starts=['2023-10-01', '2030-01-01'], windows=[None, 12], freqs=['week', 'month'])
+    first = run_sensitivity(cells, EVENT_FILES, **paths)
+    assert len(first) == len(cells) == 24
+    # a start after the data leaves no post-period; that is recorded, not raised
+    assert first['error'].notna().eq(first['intervention_start'] == '2030-01-01').all()
+
+    def fail(counts, cell):
+        raise AssertionError("cell was refitted")
+    monkeypatch.setattr(sensitivity, 'fit_cell', fail)
+    pd.testing.assert_frame_equal(run_sensitivity(cells, EVENT_FILES, **paths), first)
+
+    weekly = query_sensitivity(paths['db_file'], freq='week', control=['all', 'neighbours'])
+    assert len(weekly) == 8 and set(weekly['control']) == {'all', 'neighbours'}
+
+
+def test_pool_matches_serial_fits(tmp_path):
+    cells = sensitivity_grid(freqs=['month'], windows=[None, 24])
+    serial = run_sensitivity(cells, EVENT_FILES, db_file=str(tmp_path / 'serial.sqlite'),
+                             pyramid_dir=str(tmp_path / 'pyramid'))
+    pooled = run_sensitivity(cells, EVENT_FILES, db_file=str(tmp_path / 'pooled.sqlite'),
+                             pyramid_dir=str(tmp_path / 'pyramid'), processes=2, chunk_size=5)
+    pd.testing.assert_frame_equal(serial, pooled)
+
+
+def test_changed_events_are_refitted_in_the_same_process(paths, tmp_path):
+    france, control = str(tmp_path / 'france.csv'), str(tmp_path / 'control.csv')
+    shutil.copyfile(CONTROL_DATA, control)
+    shutil.copyfile(FRANCE_DATA, france)
+    cells = sensitivity_grid(starts=[VACCINATION_START], windows=[None], freqs=['month'], controls=['all'])
+    before = run_sensitivity(cells, [france, control], **paths).iloc[0]
+
+    # halve the French events; the serial run must not reuse the level it read before
+    events = pd.read_csv(FRANCE_DATA)
+    events.iloc[::2].to_csv(france, index=False)
+    after = run_sensitivity(cells, [france, control], **paths).iloc[0]
+
+    results = ITSAnalysis(*treated_and_control_series([france, control])).results()
+    assert after['data_hash'] != before['data_hash']
+    assert after['did_effect'] == pytest.approx(results.did_effect, rel=1e-10)
+    assert after['did_effect'] != pytest.approx(before['did_effect'])
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.space_time_scan import ScanGeometry, _best_cylinders, space_time_scan
+from data_processing.spatial_index import SpatialIndex
+
+
+@pytest.fixture
+def index():
+    rng = np.random.default_rng(3)
+    n = 160
+    latitude = rng.uniform(44, 48, n)
+    longitude = rng.uniform(-1, 4, n)
+    days = rng.integers(0, 365, n)
+    # a tight cluster of eight outbreaks within three weeks
+    latitude[:8] = 46.0 + rng.normal(0, 0.02, 8)
+    longitude[:8] = 1.5 + rng.normal(0, 0.02, 8)
+    days[:8] = 200 + rng.integers(0, 21, 8)
+    # a few outbreaks sharing a farm location
+    latitude[8:12], longitude[8:12] = 45.2, 0.3
+    dates = (pd.Timestamp('2022-01-01', tz='UTC') + pd.to_timedelta(days, 'D')).as_unit('ns')
+    return SpatialIndex(np.arange(n), latitude, longitude, dates.asi8)
+
+
+def brute_force_llr(times, geometry, min_cases):
+    """Best cylinder per centre over every valid circle and every window."""
+    total, T = len(times), geometry.n_time
+    overall = np.concatenate([[0], np.cumsum(np.bincount(times, minlength=T))])
+    best = np.zeros(len(geometry.neighbours))
+    for centre, members in enumerate(geometry.neighbours):
+        for j in np.flatnonzero(geometry.valid[centre]):
+            zone = np.concatenate([[0], np.cumsum(np.bincount(times[members[:j + 1]], minlength=T))])
+            for length in range(1, geometry.max_length + 1):
+                c = (zone[length:] - zone[:-length]).astype(float)
+                mu = (j + 1) * (overall[length:] - overall[:-length]) / total
+                scored = (c > mu) & (c >= min_cases)
+                c, mu = c[scored], mu[scored]
+                llr = c * np.log(c / mu) + (total - c) * np.log((total - c) / (total - mu))
+                best[centre] = max(best[centre], llr.max(initial=0))
+    return best
+
+
+@pytest.mark.parametrize('min_cases', [1, 2, 3])
+def test_best_cylinders_match_brute_force(index, min_cases):
+    geometry = ScanGeometry(index, time_unit_days=14, max_neighbours=10, max_radius_km=60.0, max_length=4)
+    for times in (geometry.times, np.random.default_rng(1).permutation(geometry.times)):
+        llr, best_at = _best_cylinders(times, geometry, min_cases, block_size=16)
+        np.testing.assert_allclose(llr, brute_force_llr(times, geometry, min_cases), rtol=1e-12)
+
+        for centre in np.flatnonzero(llr > 0):
+            j, start, length = best_at[centre]
+            assert geometry.valid[centre, j] and start + length <= geometry.n_time
+            zone = times[geometry.neighbours[centre, :j + 1]]
+            assert np.sum((zone >= start) & (zone < start + length)) >= min_cases
+
+
+def test_scan_reports_the_cluster_and_no_single_events(index):
+    clusters = space_time_scan(index, n_replicates=49, max_neighbours=12, max_radius_km=30.0,
+                               max_length=4, chunk_size=10)
+    assert (clusters['observed'] >= 2).all()
+    top = clusters.iloc[0]
+    assert abs(top['centre_latitude'] - 46.0) < 0.1 and abs(top['centre_longitude'] - 1.5) < 0.1
+    assert top['observed'] >= 6 and top['p_value'] == 1 / 50
+
+    loose = space_time_scan(index, n_replicates=0, max_neighbours=12, max_radius_km=30.0,
+                            max_length=4, min_cases=1)
+    assert (loose['observed'] == 1).any()
+
+
+def test_replicates_do_not_depend_on_processes(index):
+    kwargs = dict(n_replicates=20, max_neighbours=8, max_length=3, seed=5, chunk_size=7)
+    serial = space_time_scan(index, processes=1, **kwargs)
+    pd.testing.assert_frame_equal(serial, space_time_scan(index, processes=2, **kwargs))
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_processing import spatial_index
+from data_processing.spatial_index import SpatialIndex, ensure_spatial_index, haversine_km
+from visualization.plot_outbreak_trends import CONTROL_DATA
+
+
+@pytest.fixture
+def events():
+    rng = np.random.default_rng(0)
+    n = 2000
+    return pd.DataFrame({
+        'Event ID': np.arange(n),
+        'latitude': rng.uniform(42, 52, n),
+        'longitude': rng.uniform(-5, 9, n),
+        'observation date': pd.Timestamp('2022-01-01', tz='UTC') + pd.to_timedelta(rng.integers(0, 700, n), 'D'),
+    })
+
+
+def test_queries_match_brute_force(events):
+    index = SpatialIndex.from_events(events)
+    distances = haversine_km(46.5, 2.0, events['latitude'], events['longitude'])
+
+    found = index.within(46.5, 2.0, 80)
+    assert sorted(found['Event ID']) == sorted(events.loc[distances <= 80, 'Event ID'])
+    assert found['distance_km'].is_monotonic_increasing
+
+    start, end = pd.Timestamp('2022-06-01', tz='UTC'), pd.Timestamp('2023-01-01', tz='UTC')
+    in_window = (distances <= 80) & (events['observation date'] >= start) & (events['observation date'] < end)
+    assert sorted(index.within(46.5, 2.0, 80, start, end)['Event ID']) == sorted(events.loc[in_window, 'Event ID'])
+
+    nearest = index.nearest(46.5, 2.0, k=5)
+    assert nearest['Event ID'].tolist() == events['Event ID'].to_numpy()[np.argsort(distances)[:5]].tolist()
+    np.testing.assert_allclose(nearest['distance_km'], np.sort(distances)[:5], rtol=1e-9)
+
+
+def test_persisted_index_loads_without_rebuilding_the_tree(tmp_path, monkeypatch):
+    built = ensure_spatial_index(CONTROL_DATA, cache_dir=str(tmp_path))
+
+    import scipy.spatial
+
+    def no_build(*args, **kwargs):
+        raise AssertionError("KD-tree rebuilt on load")
+    monkeypatch.setattr(scipy.spatial, 'cKDTree', no_build)
+    loaded = ensure_spatial_index(CONTROL_DATA, cache_dir=str(tmp_path))
+
+    assert len(loaded) == len(built)
+    point = (loaded.latitude[0], loaded.longitude[0])
+    assert loaded.within(*point, 50)['Event ID'].tolist() == built.within(*point, 50)['Event ID'].tolist()
+
+
+def test_index_from_another_scipy_version_is_rebuilt(tmp_path, monkeypatch):
+    ensure_spatial_index(CONTROL_DATA, cache_dir=str(tmp_path))
+    monkeypatch.setattr(spatial_index, '_scipy_version', lambda: '0.0')
+    rebuilt = []
+    original = SpatialIndex.from_events.__func__
+
+    def from_events(cls, events):
+        rebuilt.append(len(events))
+        return original(cls, events)
+    monkeypatch.setattr(SpatialIndex, 'from_events', classmethod(from_events))
+    ensure_spatial_index(CONTROL_DATA, cache_dir=str(tmp_path))
+    assert rebuilt
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.optimize import minimize
+
+from analysis.synthetic_control import SyntheticControl, _solve, project_to_simplex, solve_simplex_weights
+
+
+def objective(G, c, w):
+    return 0.5 * w @ G @ w - c @ w
+
+
+def slsqp_simplex(G, c, allowed):
+    bounds = [(0, 1 if a else 0) for a in allowed]
+    start = allowed / allowed.sum()
+    result = minimize(lambda w: objective(G, c, w), start, jac=lambda w: G @ w - c, method='SLSQP',
+                      bounds=bounds, constraints=[{'type': 'eq', 'fun': lambda w: w.sum() - 1}],
+                      options={'ftol': 1e-14, 'maxiter': 1000})
+    return result.x
+
+
+def country_frame(seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2021-01-31', periods=48, freq='ME', tz='UTC')
+    donors = {f'D{j}': rng.poisson(10 + 3 * j, len(index)).astype(float) for j in range(6)}
+    frame = pd.DataFrame(donors, index=index)
+    frame.insert(0, 'France', 0.6 * frame['D1'] + 0.4 * frame['D4'])
+    frame.loc[frame.index >= '2023-10-01', 'France'] -= 5
+    return frame
+
+
+def test_projection_lands_on_the_nearest_simplex_point():
+    rng = np.random.default_rng(1)
+    V = rng.normal(0, 1, (50, 7))
+    mask = rng.random((50, 7)) < 0.7
+    mask[:, 0] = True
+    P = project_to_simplex(V, mask)
+    np.testing.assert_allclose(P.sum(axis=1), 1)
+    assert (P >= 0).all() and (P[~mask] == 0).all()
+    for v, m, p in zip(V, mask, P):
+        expected = slsqp_simplex(np.eye(7), v, m.astype(float))
+        np.testing.assert_allclose(p, expected, atol=1e-6)
+
+
+def test_weights_match_a_general_purpose_solver():
+    rng = np.random.default_rng(2)
+    A = rng.poisson(8, (30, 6)).astype(float)
+    Y = rng.poisson(8, (30, 4)).astype(float)
+    G, c = A.T @ A, (A.T @ Y).T
+    mask = np.ones((4, 6), dtype=bool)
+    mask[1, 2] = mask[3, :2] = False
+    W = solve_simplex_weights(G, c, mask)
+    for w, target, m in zip(W, c, mask):
+        best = objective(G, target, slsqp_simplex(G, target, m.astype(float)))
+        assert objective(G, target, w) <= best + 1e-7 * abs(best)
+        assert (w[~m] == 0).all()
+    # each chunk stops on its own convergence check
+    np.testing.assert_allclose(_solve(G, c, mask, processes=2, chunk_size=1), W, atol=1e-6)
+
+
+def test_recovers_an_exact_donor_mix():
+    frame = country_frame()
+    fit = SyntheticControl(frame, 'France', pd.Timestamp('2023-10-01', tz='UTC')).fit()
+    assert fit['weights'].to_dict() == pytest.approx({'D1': 0.6, 'D4': 0.4}, abs=1e-6)
+    assert fit['pre_rmspe'] < 1e-6
+    assert fit['post_effect'] == pytest.approx(-5, abs=1e-5)
+
+
+def test_placebos_and_leave_one_out_cover_every_donor():
+    frame = country_frame()
+    model = SyntheticControl(frame, 'France', pd.Timestamp('2023-10-01', tz='UTC'))
+    table, p_value = model.placebo_in_space()
+    assert sorted(table['unit']) == sorted(frame.columns)
+    assert table.loc[table['is_treated'], 'unit'].item() == 'France'
+    assert 0 < p_value <= 1
+
+    loo = model.leave_one_out()
+    assert loo['dropped_donor'].tolist() == model.donors
+    # dropping a donor the fit does not use leaves it unchanged
+    unused = loo[~loo['dropped_donor'].isin(['D1', 'D4'])]
+    np.testing.assert_allclose(unused['post_effect'], -5, atol=1e-5)